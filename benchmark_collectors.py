@@ -0,0 +1,185 @@
+"""
+Benchmark the collectors against the offline GitHub API simulator
+Reports users/sec and requests per user for each collector mode without
+touching the real API or spending any token budget
+"""
+
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from collectors.github_collector import GitHubCollector
+from collectors.async_github_collector import AsyncGitHubCollector
+from collectors.location_matcher import LocationMatcher
+from collectors.user_index import UserIndex
+from processors.filter_plan import FilterPlan
+from simulator.population import SyntheticPopulation
+from simulator.github_api import GitHubAPISimulator, GITHUB_LIMITS, UNLIMITED_LIMITS
+
+# Collector modes: (asynchronous engine, enrichment)
+MODES = {
+    'rest': (False, 'rest'),
+    'graphql': (False, 'graphql'),
+    'async': (True, 'rest'),
+    'async-graphql': (True, 'graphql'),
+}
+
+BENCHMARK_TOKEN = 'simulator-token'
+
+
+def load_config():
+    """Load wilayas configuration"""
+    config_path = Path(__file__).parent / 'config' / 'wilayas.json'
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+async def _collect_async(collector: AsyncGitHubCollector, wilayas: list) -> int:
+    async with collector:
+        await collector.check_rate_limit()
+        collected = 0
+        for wilaya in wilayas:
+            collected += len(await collector.collect_wilaya_data(wilaya))
+        return collected
+
+
+def run_mode(mode: str, simulator: GitHubAPISimulator, config: dict, wilayas: list,
+             concurrency: int) -> dict:
+    """
+    Collect the given wilayas in one mode against a freshly reset simulator
+    
+    Returns:
+        Result row with users, requests, seconds and the derived rates
+    """
+    use_async, enrichment = MODES[mode]
+    simulator.reset()
+    options = {
+        'tokens': [BENCHMARK_TOKEN],
+        'base_url': simulator.base_url,
+        'enrichment': enrichment,
+        'filter_plan': FilterPlan.from_config(config),
+    }
+    if use_async:
+        collector = AsyncGitHubCollector(concurrency=concurrency, **options)
+    else:
+        collector = GitHubCollector(**options)
+    collector.user_index = UserIndex(LocationMatcher(config['wilayas']))
+    
+    # Budgets are seeded from /rate_limit first; until the first replies
+    # arrive the collectors otherwise assume GitHub's own limits
+    start = time.perf_counter()
+    if use_async:
+        collected = asyncio.run(_collect_async(collector, wilayas))
+    else:
+        collector.check_rate_limit()
+        collected = sum(len(collector.collect_wilaya_data(wilaya)) for wilaya in wilayas)
+        collector.close()
+    seconds = time.perf_counter() - start
+    
+    stats = simulator.stats.snapshot()
+    users = len(collector.user_index.users)
+    return {
+        'mode': mode,
+        'users': users,
+        'saved': collected,
+        'requests': stats['total'],
+        'seconds': round(seconds, 3),
+        'users_per_sec': round(users / seconds, 2) if seconds else 0.0,
+        'requests_per_user': round(stats['total'] / users, 2) if users else 0.0,
+        'by_endpoint': stats['by_endpoint'],
+        'by_status': stats['by_status'],
+        'retries': dict(collector.retry_queue.counts),
+    }
+
+
+def print_results(results: list):
+    """Print the result rows as a table"""
+    print()
+    print(f"{'mode':<15}{'users':>8}{'requests':>10}{'req/user':>10}{'seconds':>10}{'users/sec':>11}")
+    print('-' * 64)
+    for row in results:
+        print(f"{row['mode']:<15}{row['users']:>8}{row['requests']:>10}{row['requests_per_user']:>10.2f}"
+              f"{row['seconds']:>10.2f}{row['users_per_sec']:>11.2f}")
+    print()
+    for row in results:
+        endpoints = ', '.join(f'{name}={count}' for name, count in sorted(row['by_endpoint'].items()))
+        statuses = ', '.join(f'{status}={count}' for status, count in row['by_status'].items())
+        retries = ', '.join(f'{outcome}={count}' for outcome, count in row['retries'].items())
+        print(f"{row['mode']}: {endpoints} | status {statuses} | retries {retries}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark collectors against the offline GitHub API simulator')
+    parser.add_argument('--users', type=int, default=2000,
+                        help='Size of the synthetic population')
+    parser.add_argument('--wilayas', type=str, default='16,31,25',
+                        help='Comma-separated wilaya codes to collect')
+    parser.add_argument('--modes', type=str, default=','.join(MODES),
+                        help=f"Comma-separated collector modes ({', '.join(MODES)})")
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Maximum in-flight requests of the async modes')
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help='Mean simulated latency per request in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Share of requests answered with a 502')
+    parser.add_argument('--secondary-limit-rate', type=float, default=0.0,
+                        help='Share of requests answered with a secondary rate limit')
+    parser.add_argument('--github-limits', action='store_true',
+                        help="Enforce GitHub's real budgets (5000/h core, 30/min search) instead of "
+                             "budgets too large to pace the run")
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the population and of the injected faults')
+    parser.add_argument('--output', type=str,
+                        help='Also write the results as JSON to this file')
+    
+    args = parser.parse_args()
+    
+    # Per-user progress logs would dominate the measured time
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    config = load_config()
+    codes = [code.strip() for code in args.wilayas.split(',') if code.strip()]
+    wilayas = [wilaya for wilaya in config['wilayas'] if wilaya['code'] in codes]
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        print(f"Error: unknown mode(s) {', '.join(unknown)}; choose from {', '.join(MODES)}")
+        return
+    if not wilayas:
+        print(f"Error: no wilaya matches {args.wilayas}")
+        return
+    
+    print(f"Generating {args.users} synthetic users...")
+    population = SyntheticPopulation(args.users, config['wilayas'], seed=args.seed)
+    simulator = GitHubAPISimulator(
+        population,
+        limits=GITHUB_LIMITS if args.github_limits else UNLIMITED_LIMITS,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        secondary_limit_rate=args.secondary_limit_rate,
+        seed=args.seed
+    )
+    
+    results = []
+    with simulator:
+        for mode in modes:
+            print(f"Running {mode} over {', '.join(w['name_en'] for w in wilayas)}...")
+            results.append(run_mode(mode, simulator, config, wilayas, args.concurrency))
+    
+    print_results(results)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,32 +2,64 @@
 Check data collection progress
 """
 
-import json
+import sys
 from pathlib import Path
 
-def check_progress():
-    data_dir = Path("data/raw")
-    
-    if not data_dir.exists():
-        print("❌ No data collected yet")
-        return
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from storage.raw_data import raw_data_files, partial_files, count_raw_users
+from storage.user_store import UserStore
+
+def check_store_progress(store_path):
+    """Progress from the user store: one indexed count per wilaya"""
+    store = UserStore(str(store_path))
+    try:
+        counts = store.counts_by_wilaya()
+    finally:
+        store.close()
     
-    json_files = list(data_dir.glob("wilaya_*.json"))
+    print(f"✅ Data collected for {len(counts)} wilayas")
+    print()
+    for wilaya_code, count in counts.items():
+        print(f"   Wilaya {wilaya_code}: {count} developers")
+    return sum(counts.values())
+
+def check_raw_progress(data_dir):
+    """Progress from the raw data files, reading each one"""
+    data_files = raw_data_files(data_dir)
     
-    if not json_files:
+    if not data_files:
         print("⏳ Collection in progress...")
-        return
+        return None
     
-    print(f"✅ Data collected for {len(json_files)} wilayas")
+    print(f"✅ Data collected for {len(data_files)} wilayas")
     print()
     
     total_users = 0
-    for file in json_files:
-        with open(file, 'r', encoding='utf-8') as f:
-            users = json.load(f)
-            wilaya_code = file.stem.split('_')[1]
-            print(f"   Wilaya {wilaya_code}: {len(users)} developers")
-            total_users += len(users)
+    for file in data_files:
+        count = count_raw_users(file)
+        wilaya_code = file.name.split('.')[0].split('_')[1]
+        print(f"   Wilaya {wilaya_code}: {count} developers")
+        total_users += count
+    
+    for file in partial_files(data_dir):
+        print(f"   ⏳ {file.name}: {count_raw_users(file)} developers written so far")
+    return total_users
+
+def check_progress():
+    data_dir = Path("data/raw")
+    store_path = Path("data/users.sqlite")
+    
+    if store_path.exists():
+        total_users = check_store_progress(store_path)
+    elif not data_dir.exists():
+        print("❌ No data collected yet")
+        return
+    else:
+        total_users = check_raw_progress(data_dir)
+        if total_users is None:
+            return
     
     print()
     print(f"📊 Total developers: {total_users}")
@@ -1,10 +1,11 @@
 """
 Collect Real GitHub Data for Algeria Rankings
-Starts with major wilayas for faster results
+Collects the wilayas that fit the remaining rate budget, most valuable first
 """
 
 import os
 import sys
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -15,11 +16,19 @@ load_dotenv()
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from collectors.github_collector import GitHubCollector
+from collectors.run_stats import RunStats
+from collectors.collection_planner import CollectionPlanner, available_budget
+from storage.raw_data import zstd_available
 from processors.ranking_processor import RankingProcessor
+from processors.filter_plan import FilterPlan
 from generators.markdown_generator import MarkdownGenerator
+from main import load_collected_users, save_collected_wilaya, attach_rank_index, detach_rank_index
 import json
 
-# Priority wilayas (major cities with most developers)
+RUN_STATS_PATH = Path(__file__).parent / 'data' / 'stats' / 'run_stats.json'
+
+# Major cities with most developers: collected first while no earlier run
+# tells the planner what each wilaya costs and yields
 PRIORITY_WILAYAS = [
     "16",  # Algiers
     "31",  # Oran
@@ -39,8 +48,21 @@ def load_config():
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def collect_priority_wilayas():
-    """Collect data for priority wilayas first"""
+def plan_wilayas(collector, config, time_window=None):
+    """
+    Plan the wilayas that fit the rate budget, most valuable per request first
+    
+    Without a time window, the plan uses only the budget left before the
+    current rate-limit window resets.
+    """
+    planner = CollectionPlanner(config['wilayas'], RunStats(str(RUN_STATS_PATH)),
+                                list(load_collected_users()), fallback_order=PRIORITY_WILAYAS)
+    budget = available_budget(collector.token_pool)
+    window = time_window * 3600 if time_window is not None else budget['core']['reset_in']
+    return planner.plan(budget, window)
+
+def collect_priority_wilayas(dry_run=False, time_window=None, compress=False):
+    """Collect data for the wilayas the rate budget allows, most valuable first"""
     print("=" * 60)
     print("COLLECTING REAL GITHUB DATA FOR ALGERIA")
     print("=" * 60)
@@ -60,9 +82,12 @@ def collect_priority_wilayas():
         print()
         return False
     
+    # Load config
+    config = load_config()
+    
     # Initialize collector
     try:
-        collector = GitHubCollector(token)
+        collector = GitHubCollector(token, filter_plan=FilterPlan.from_config(config))
         remaining = collector.check_rate_limit()
         print(f"✅ GitHub API connected")
         print(f"📊 Rate limit remaining: {remaining} requests")
@@ -71,30 +96,32 @@ def collect_priority_wilayas():
         print(f"❌ Error connecting to GitHub API: {e}")
         return False
     
-    # Load config
-    config = load_config()
-    wilayas_dict = {w['code']: w for w in config['wilayas']}
+    plan = plan_wilayas(collector, config, time_window)
+    print(plan.summary())
+    print()
+    if dry_run:
+        return []
     
-    # Collect data for priority wilayas
-    print("🎯 Collecting data for major wilayas (fastest results):")
+    collector.collection_plan = plan
+    collector.run_stats = RunStats(str(RUN_STATS_PATH))
+    # Saved wilayas go through the same path as `src/main.py --collect`
+    attach_rank_index(collector, config)
+    
+    # Collect data for the planned wilayas
+    print("🎯 Collecting data for the most valuable wilayas that fit the budget:")
     print()
     
     all_users = []
     
-    for wilaya_code in PRIORITY_WILAYAS:
-        wilaya = wilayas_dict.get(wilaya_code)
-        if not wilaya:
-            continue
-        
+    for wilaya in plan.wilayas():
         print(f"📍 Collecting: {wilaya['name_en']} ({wilaya['name_ar']})...")
         
         try:
             users = collector.collect_wilaya_data(wilaya)
             
             if users:
-                # Save raw data
-                output_path = Path(__file__).parent / 'data' / 'raw' / f"wilaya_{wilaya_code}.json"
-                collector.save_data(users, str(output_path))
+                # Save to the user store or the wilaya's raw data file
+                save_collected_wilaya(collector, config, wilaya, users, compress)
                 all_users.extend(users)
                 print(f"   ✅ Found {len(users)} developers")
             else:
@@ -106,9 +133,12 @@ def collect_priority_wilayas():
         
         print()
     
+    detach_rank_index(collector)
+    
     print("=" * 60)
     print(f"✅ Data collection complete!")
     print(f"📊 Total developers collected: {len(all_users)}")
+    print(f"🔁 {collector.retry_queue.summary()}")
     print("=" * 60)
     print()
     
@@ -147,10 +177,26 @@ def generate_rankings(users):
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description='Collect real GitHub data for Algeria rankings')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the collection plan with its predicted requests and time, then stop')
+    parser.add_argument('--time-window', type=float, metavar='HOURS',
+                        help='Plan for this many hours of rate budget (default: until the current window resets)')
+    parser.add_argument('--zstd', action='store_true',
+                        help='Compress raw data files with zstd (requires the zstandard package)')
+    args = parser.parse_args()
+    
+    if args.zstd and not zstd_available():
+        print("❌ --zstd requires the zstandard package (pip install zstandard)")
+        return
+    
     print()
     
     # Collect data
-    users = collect_priority_wilayas()
+    users = collect_priority_wilayas(dry_run=args.dry_run, time_window=args.time_window, compress=args.zstd)
+    
+    if args.dry_run:
+        return
     
     if not users:
         print("❌ No data collected. Please check your GitHub token.")
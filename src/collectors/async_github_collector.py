@@ -0,0 +1,595 @@
+"""
+Asynchronous GitHub Data Collector
+Same public API as GitHubCollector, backed by asyncio and a pooled
+aiohttp session so many users are enriched concurrently
+"""
+
+import asyncio
+import math
+from collections import Counter
+from functools import partial
+from typing import List, Dict, Optional, Tuple
+import logging
+
+import aiohttp
+
+from .base_collector import BaseGitHubCollector, DEFAULT_BASE_URL
+from .rate_coordinator import RateCoordinator
+from processors.filter_plan import FilterPlan
+from .rate_limiter import resource_for_path
+from .response_cache import ResponseCache
+from .decoders import ResponseDecoder, SEARCH_PAGE, USER_DETAILS, REPO_PAGE, EVENT_PAGE, PayloadError, decode_json
+from .contribution_ingester import EVENTS_PER_PAGE, MAX_EVENT_PAGES, count_new_events
+from .retry_queue import CircuitOpenError, RETRYABLE_STATUSES, circuit_for_path
+from .search_sharding import SearchShard, SEARCH_RESULT_CAP, SEARCH_PAGE_SIZE
+from .graphql_enrichment import (
+    GRAPHQL_PATH, build_batch_query, build_repos_page_query, parse_batch_response, parse_repos_page
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AsyncGitHubCollector(BaseGitHubCollector):
+    """
+    Collects GitHub user data with bounded concurrency
+    
+    All public methods are coroutines. Connections are kept alive and reused
+    across requests, and at most `concurrency` requests are in flight at once.
+    It is a sibling of GitHubCollector: the request-free steps both run
+    come from BaseGitHubCollector.
+    """
+    
+    REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, PayloadError)
+    
+    def __init__(self, token: Optional[str] = None, base_url: str = DEFAULT_BASE_URL,
+                 concurrency: int = 10, tokens: Optional[List[str]] = None,
+                 cache: Optional[ResponseCache] = None, enrichment: str = 'rest',
+                 graphql_batch_size: int = 25, filter_plan: Optional[FilterPlan] = None,
+                 rate_coordinator: Optional[RateCoordinator] = None):
+        super().__init__(token, base_url, tokens=tokens, cache=cache, enrichment=enrichment,
+                         graphql_batch_size=graphql_batch_size, filter_plan=filter_plan,
+                         rate_coordinator=rate_coordinator)
+        self.concurrency = concurrency
+        self._aio_session = None
+        self._semaphore = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    @property
+    def aio_session(self) -> aiohttp.ClientSession:
+        """Keep-alive aiohttp session, created lazily inside the running loop"""
+        if self._aio_session is None or self._aio_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+            self._aio_session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._aio_session
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+        self._aio_session = None
+    
+    async def _send(self, method: str, path: str, params: Optional[Dict] = None,
+                    payload: Optional[Dict] = None, token: Optional[str] = None,
+                    headers: Optional[Dict] = None):
+        """
+        Issue a request and read the raw reply
+        
+        Waiting for rate budget happens outside the concurrency semaphore,
+        so paced requests never hold a connection slot. A 304 reply is not
+        charged by GitHub, so its reservation is refunded. Transport errors
+        and 5xx replies count against the endpoint's circuit breaker.
+        
+        Args:
+            method: HTTP method
+            path: API path relative to base_url
+            params: Query string parameters
+            payload: JSON request body
+            token: Token for endpoints outside any rate budget
+            headers: Extra request headers
+        
+        Returns:
+            Tuple of (status, body bytes, response headers)
+        
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open (nothing is sent)
+            aiohttp.ClientError: On transport errors or non-2xx/304 status
+        """
+        session = self.aio_session
+        resource = resource_for_path(path)
+        endpoint = circuit_for_path(path)
+        self.circuit_breaker.check(endpoint)
+        
+        for attempt in range(self.max_rate_limit_retries + 1):
+            if resource:
+                token, wait = self.token_pool.acquire(resource)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            else:
+                token = token or self.token
+            
+            request_headers = {'Authorization': f'token {token}', **(headers or {})}
+            async with self._semaphore:
+                try:
+                    async with session.request(method, f'{self.base_url}{path}', params=params,
+                                               json=payload, headers=request_headers) as response:
+                        if resource:
+                            self.request_counts[resource] += 1
+                        body = await response.read() if response.status in (403, 429) else b''
+                        if resource and self.token_pool.update(token, resource, response.headers,
+                                                               response.status, body):
+                            continue
+                        
+                        if response.status >= 500:
+                            self.circuit_breaker.record_failure(endpoint)
+                        else:
+                            self.circuit_breaker.record_success(endpoint)
+                        
+                        if response.status == 304:
+                            if resource:
+                                self.token_pool.refund(token, resource)
+                                self.request_counts[resource] -= 1
+                            return response.status, b'', response.headers
+                        
+                        response.raise_for_status()
+                        return response.status, await response.read(), response.headers
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                    self.circuit_breaker.record_failure(endpoint)
+                    raise
+        
+        self.circuit_breaker.record_success(endpoint)
+        response.raise_for_status()
+    
+    async def _get_json(self, path: str, params: Optional[Dict] = None, token: Optional[str] = None,
+                        decoder: Optional[ResponseDecoder] = None):
+        """
+        Fetch and decode a JSON resource, going through the response cache
+        
+        Cached responses are reused while fresh and revalidated with
+        If-None-Match/If-Modified-Since once stale.
+        
+        Args:
+            path: API path relative to base_url
+            params: Query string parameters
+            token: Token for endpoints outside any rate budget
+            decoder: Typed decoder keeping only the fields the caller reads
+                (the whole document is decoded without one)
+        
+        Returns:
+            Decoded JSON payload
+        
+        Raises:
+            aiohttp.ClientError: On transport errors or non-2xx status
+            PayloadError: If the body does not decode
+        """
+        decode = decoder.decode if decoder else decode_json
+        entry = self.cache.lookup(path, params) if self.cache else None
+        if entry and entry.fresh:
+            return decode(entry.body)
+        
+        status, body, headers = await self._send(
+            'GET', path, params, token=token, headers=entry.conditional_headers() if entry else None
+        )
+        if entry and status == 304:
+            self.cache.revalidated(entry)
+            return decode(entry.body)
+        
+        if self.cache:
+            self.cache.store(path, params, body, headers)
+        return decode(body)
+    
+    async def _post_json(self, path: str, payload: Dict):
+        """POST a JSON body and decode the JSON reply (never cached)"""
+        status, body, headers = await self._send('POST', path, payload=payload)
+        return decode_json(body)
+    
+    async def check_rate_limit(self):
+        """Check GitHub API rate limit for every pooled token"""
+        for token in self.token_pool.tokens:
+            _, body, _ = await self._send('GET', '/rate_limit', token=token)
+            data = decode_json(body)
+            self.token_pool.load(token, data.get('resources', {'core': data['rate']}))
+        logger.info(f"Rate limit remaining: {self.rate_limit_remaining}")
+        return self.rate_limit_remaining
+    
+    async def search_users_by_location(self, location: str, min_followers: Optional[int] = None) -> List[Dict]:
+        """
+        Search GitHub users by location
+        
+        Locations over the 1000-result cap are split into followers/created
+        shards, which are collected in parallel.
+        
+        Args:
+            location: Location search term
+            min_followers: Minimum number of followers (defaults to the
+                filter plan's threshold, or DEFAULT_MIN_FOLLOWERS without one)
+        
+        Returns:
+            List of user data dictionaries
+        """
+        users = await self.search_shard(self._location_shard(location, min_followers))
+        logger.info(f"Collected {len(users)} users for location: {location}")
+        return users
+    
+    async def _search_page(self, shard: SearchShard, page: int, per_page: int) -> Dict:
+        """Fetch one result page of a shard, reusing it from the journal when recorded"""
+        query = shard.query()
+        data = self.journal.search_page(query, page) if self.journal else None
+        if data is None:
+            data = await self._get_json('/search/users', shard.params(page, per_page), decoder=SEARCH_PAGE)
+            if self.journal:
+                self.journal.record_search_page(query, page, data)
+        return data
+    
+    async def search_shard(self, shard: SearchShard) -> List[Dict]:
+        """
+        Collect every result of a search shard, subdividing it while over the cap
+        
+        Child shards, and the pages of a shard that fits, are fetched
+        concurrently. Pages that fail are retried with backoff before returning.
+        
+        Args:
+            shard: Search shard to collect
+        
+        Returns:
+            List of user data dictionaries
+        """
+        users = []
+        await self._search_into(shard, users)
+        await self._drain_retries()
+        return users
+    
+    async def _search_into(self, shard: SearchShard, users: List[Dict]):
+        """Append the results of a search shard to `users`, deferring failed pages (see GitHubCollector)"""
+        try:
+            await self._search_first(shard, users)
+        except self.REQUEST_ERRORS as e:
+            self._retry_later(f"search {shard.query()}", e, partial(self._search_first, shard, users))
+    
+    async def _search_first(self, shard: SearchShard, users: List[Dict]):
+        """Fetch the first page of a shard, then subdivide it or page through it"""
+        per_page = SEARCH_PAGE_SIZE
+        data = await self._search_page(shard, 1, per_page)
+        
+        total = data.get('total_count', 0)
+        if total > SEARCH_RESULT_CAP:
+            children = shard.split()
+            if children:
+                logger.info(f"Splitting {shard.query()} ({total} results)")
+                results = [[] for _ in children]
+                await asyncio.gather(*(self._search_into(child, found) for child, found in zip(children, results)))
+                for found in results:
+                    users.extend(found)
+                return
+            logger.warning(f"{shard.query()} has {total} results, only {SEARCH_RESULT_CAP} are reachable")
+        
+        if not self._owns_search(shard):
+            return
+        
+        users.extend(data.get('items', []))
+        last_page = math.ceil(min(total, SEARCH_RESULT_CAP) / per_page)
+        pages = await asyncio.gather(
+            *(self._search_page_or_defer(shard, page, per_page, users) for page in range(2, last_page + 1))
+        )
+        for data in pages:
+            if data:
+                users.extend(data.get('items', []))
+    
+    async def _search_page_or_defer(self, shard: SearchShard, page: int, per_page: int,
+                                    users: List[Dict]) -> Optional[Dict]:
+        """Fetch a later page of a shard, or defer it (its items then go to `users` once retried)"""
+        try:
+            return await self._search_page(shard, page, per_page)
+        except self.REQUEST_ERRORS as e:
+            self._retry_later(f"search {shard.query()} page {page}", e,
+                              partial(self._search_page, shard, page, per_page),
+                              lambda data: users.extend(data.get('items', [])))
+            return None
+    
+    async def get_user_details(self, username: str) -> Optional[Dict]:
+        """
+        Get detailed information for a specific user
+        
+        Args:
+            username: GitHub username
+        
+        Returns:
+            User details dictionary, or None if it cannot be fetched
+        
+        Raises:
+            Retryable request errors (see GitHubCollector.get_user_details)
+        """
+        try:
+            return await self._get_json(f'/users/{username}', decoder=USER_DETAILS)
+        except self.REQUEST_ERRORS as e:
+            if self._is_retryable(e):
+                raise
+            logger.error(f"Error fetching details for {username}: {e}")
+            return None
+    
+    async def get_user_repos(self, username: str) -> List[Dict]:
+        """
+        Get user's public repositories
+        
+        Args:
+            username: GitHub username
+        
+        Returns:
+            List of repository dictionaries
+        
+        Raises:
+            Retryable request errors, rather than returning a truncated list
+        """
+        repos = []
+        page = 1
+        per_page = 100
+        
+        while True:
+            try:
+                data = await self._get_json(
+                    f'/users/{username}/repos',
+                    {'per_page': per_page, 'page': page, 'sort': 'updated'},
+                    decoder=REPO_PAGE
+                )
+            except self.REQUEST_ERRORS as e:
+                if self._is_retryable(e):
+                    raise
+                logger.error(f"Error fetching repos for {username}: {e}")
+                break
+            
+            if not data:
+                break
+            
+            repos.extend(data)
+            
+            if len(data) < per_page:
+                break
+            
+            page += 1
+        
+        return repos
+    
+    async def get_user_contributions(self, username: str) -> int:
+        """
+        Estimate user contributions from events
+        
+        Args:
+            username: GitHub username
+        
+        Returns:
+            Estimated contribution count
+        """
+        try:
+            events = await self._get_json(f'/users/{username}/events/public', {'per_page': 100}, decoder=EVENT_PAGE)
+        except self.REQUEST_ERRORS as e:
+            logger.error(f"Error fetching contributions for {username}: {e}")
+            return 0
+        
+        return self._count_contributions(events)
+    
+    async def poll_contributions(self, login: str) -> Optional[int]:
+        """
+        Count a user's new public contributions into the contribution store
+        (see GitHubCollector.poll_contributions)
+        
+        Args:
+            login: GitHub username
+        
+        Returns:
+            New contributions counted, or None if the feed was unchanged
+        
+        Raises:
+            aiohttp.ClientError: On transport errors or non-2xx status
+        """
+        store = self.contribution_store
+        etag, last_event_id = store.cursor(login) or (None, 0)
+        path = f'/users/{login}/events/public'
+        days = Counter()
+        newest = last_event_id
+        first_etag = None
+        
+        for page in range(1, MAX_EVENT_PAGES + 1):
+            try:
+                status, body, headers = await self._send(
+                    'GET', path, {'per_page': EVENTS_PER_PAGE, 'page': page},
+                    headers={'If-None-Match': etag} if etag and page == 1 else None
+                )
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
+                logger.info(f"Skipping events of {login}: user not found")
+                # Polled with nothing to count, so the user is ranked at 0 rather than left unpolled
+                store.record(login, None, last_event_id, {})
+                return 0
+            if status == 304:
+                store.touch(login)
+                return None
+            if page == 1:
+                first_etag = headers.get('ETag')
+            
+            events = EVENT_PAGE.decode(body)
+            page_days, page_newest, reached = count_new_events(events, last_event_id)
+            days.update(page_days)
+            newest = max(newest, page_newest)
+            if reached or len(events) < EVENTS_PER_PAGE:
+                break
+        
+        store.record(login, first_etag, newest, days)
+        return sum(days.values())
+    
+    async def ingest_contributions(self, logins: List[str]) -> Dict[str, int]:
+        """
+        Poll the public events of every user concurrently into the contribution store
+        
+        Args:
+            logins: GitHub usernames
+        
+        Returns:
+            Counts of users 'polled', feeds 'unchanged' and 'contributions' counted
+        """
+        results = []
+        await asyncio.gather(
+            *(self._or_defer(f"events of {login}", partial(self.poll_contributions, login), results)
+              for login in logins)
+        )
+        await self._drain_retries()
+        return self._contribution_counts(results)
+    
+    async def _enrich_user(self, login: str, wilaya: Dict) -> Optional[Dict]:
+        """Fetch details and repositories for one user and build its record"""
+        details = await self.get_user_details(login)
+        if not details:
+            self._record_missing_user(wilaya, login)
+            return None
+        if not self._passes_filter(login, details):
+            return None
+        
+        totals = self._sum_repos(await self.get_user_repos(login))
+        
+        logger.info(f"Collected data for {login}")
+        enriched_user = self._build_enriched_user(login, details, *totals, wilaya)
+        self._record_user(enriched_user)
+        return enriched_user
+    
+    async def _sum_remaining_repos(self, login: str, cursor: Optional[str]) -> Tuple[int, int]:
+        """Page through the repositories left after the first GraphQL page"""
+        total_stars = total_forks = 0
+        while cursor:
+            query, variables = build_repos_page_query(login, cursor)
+            payload = await self._post_json(GRAPHQL_PATH, {'query': query, 'variables': variables})
+            stars, forks, cursor = parse_repos_page(payload)
+            total_stars += stars
+            total_forks += forks
+        return total_stars, total_forks
+    
+    async def _enrich_batch_graphql(self, batch: List[str], wilaya: Dict) -> List[Dict]:
+        """Enrich one batch of users with a single GraphQL query"""
+        query, variables = build_batch_query(batch)
+        results = parse_batch_response(
+            await self._post_json(GRAPHQL_PATH, {'query': query, 'variables': variables}), batch
+        )
+        users = []
+        for login in batch:
+            if login not in results:
+                self._record_missing_user(wilaya, login)
+                continue
+            result = results[login]
+            if not self._passes_filter(login, result['details']):
+                continue
+            extra_stars, extra_forks = await self._sum_remaining_repos(login, result['cursor'])
+            enriched_user = self._build_enriched_user(
+                login, result['details'],
+                result['total_stars'] + extra_stars,
+                result['total_forks'] + extra_forks,
+                wilaya
+            )
+            self._record_user(enriched_user)
+            users.append(enriched_user)
+        logger.info(f"Collected data for {len(results)} users via GraphQL")
+        return users
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether a failed request is worth another attempt (transport errors, 5xx/429, open circuit)"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUSES
+        return isinstance(error, (CircuitOpenError, aiohttp.ClientConnectionError,
+                                  aiohttp.ClientPayloadError, asyncio.TimeoutError))
+    
+    async def _drain_retries(self):
+        """Retry the deferred coroutines concurrently until the retry queue is empty"""
+        await self.retry_queue.drain_async(self._is_retryable)
+    
+    async def _or_defer(self, name: str, task, results: List):
+        """Await a task and append its result to `results`, or defer it to the retry queue"""
+        try:
+            results.append(await task())
+        except self.REQUEST_ERRORS as e:
+            self._retry_later(name, e, task, results.append)
+    
+    async def enrich_users_graphql(self, logins: List[str], wilaya: Dict) -> List[Dict]:
+        """
+        Enrich users through batched GraphQL queries, batches running concurrently
+        
+        Failed batches are retried with backoff before returning.
+        
+        Args:
+            logins: GitHub usernames
+            wilaya: Wilaya configuration dictionary
+        
+        Returns:
+            List of enriched user data, in the order of `logins` (retried batches last)
+        """
+        batches = [
+            logins[start:start + self.graphql_batch_size]
+            for start in range(0, len(logins), self.graphql_batch_size)
+        ]
+        results = []
+        await asyncio.gather(*(
+            self._or_defer(f"GraphQL batch starting at {batch[0]}", partial(self._enrich_batch_graphql, batch, wilaya),
+                           results)
+            for batch in batches
+        ))
+        await self._drain_retries()
+        return [user for users in results for user in users]
+    
+    async def collect_wilaya_data(self, wilaya: Dict) -> List[Dict]:
+        """
+        Collect all user data for a specific wilaya
+        
+        Search terms are queried concurrently, then every unique user is
+        enriched concurrently (within the collection plan's allowance, if
+        any). Output order matches GitHubCollector. Failed searches and
+        users are retried with backoff once the other requests are done.
+        
+        Args:
+            wilaya: Wilaya configuration dictionary
+        
+        Returns:
+            List of enriched user data
+        """
+        logger.info(f"Collecting data for {wilaya['name_en']} ({wilaya['code']})")
+        started = self._start_run_stats()
+        failed_before = self.retry_queue.counts['failed']
+        
+        results = [[] for _ in wilaya['search_terms']]
+        await asyncio.gather(
+            *(self._search_into(self._location_shard(term), users)
+              for term, users in zip(wilaya['search_terms'], results))
+        )
+        await self._drain_retries()
+        term_results = dict(zip(wilaya['search_terms'], results))
+        term_users = {term: len(users) for term, users in term_results.items()}
+        logins = self._unique_logins(term_results)
+        
+        self._register_search_results(logins, wilaya)
+        pending, reused = self._apply_refresh_plan(self._pending_logins(logins, wilaya), wilaya)
+        pending, deferred = self._apply_collection_plan(pending, wilaya)
+        reused += deferred
+        
+        if self.enrichment == 'graphql':
+            enriched = await self.enrich_users_graphql(pending, wilaya)
+        else:
+            results = []
+            await asyncio.gather(
+                *(self._or_defer(f"user {login}", partial(self._enrich_user, login, wilaya), results)
+                  for login in pending)
+            )
+            await self._drain_retries()
+            enriched = [user for user in results if user]
+        
+        self._note_failures(wilaya, failed_before)
+        all_users = self._in_search_order(logins, wilaya, enriched + reused)
+        self._record_run_stats(wilaya, started, term_users, len(logins), len(pending), len(reused))
+        
+        logger.info(f"Total users collected for {wilaya['name_en']}: {len(all_users)}")
+        return all_users
@@ -0,0 +1,320 @@
+"""
+Shared GitHub Collector Logic
+State and request-free steps common to the blocking and asyncio
+collectors: rate budgets, search shards, collection and refresh plans,
+journaling, retries and building the stored user records
+"""
+
+import time
+from collections import Counter
+from typing import List, Dict, Iterable, Optional, Tuple, Callable
+from datetime import datetime
+import logging
+
+from .token_pool import TokenPool, load_tokens
+from .rate_coordinator import RateCoordinator
+from .response_cache import ResponseCache
+from .contribution_ingester import CONTRIBUTION_EVENTS
+from .retry_queue import RetryQueue, CircuitBreaker
+from .search_sharding import SearchShard
+from .incremental_refresh import FRESH
+from processors.filter_plan import FilterPlan
+from storage.raw_data import write_raw_users
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BASE_URL = 'https://api.github.com'
+
+# Followers lower bound of location searches when no filter plan is given
+DEFAULT_MIN_FOLLOWERS = 5
+
+
+class BaseGitHubCollector:
+    """
+    What GitHubCollector and AsyncGitHubCollector share
+    
+    Everything here runs without sending a request. The subclasses add the
+    transport (a requests session or an aiohttp session) and the methods
+    that go through it, blocking or as coroutines, together with the
+    REQUEST_ERRORS they raise and which of those are retryable.
+    """
+    
+    # Errors of a failed request or of its undecodable payload
+    REQUEST_ERRORS: Tuple[type, ...] = ()
+    
+    def __init__(self, token: Optional[str] = None, base_url: str = DEFAULT_BASE_URL,
+                 tokens: Optional[List[str]] = None, cache: Optional[ResponseCache] = None,
+                 enrichment: str = 'rest', graphql_batch_size: int = 25,
+                 filter_plan: Optional[FilterPlan] = None,
+                 rate_coordinator: Optional[RateCoordinator] = None):
+        if enrichment not in ('rest', 'graphql'):
+            raise ValueError(f"Unknown enrichment mode: {enrichment}")
+        
+        # A coordinator shares the rate budgets with other collector processes
+        self.token_pool = TokenPool(tokens or load_tokens(token),
+                                    limiter_factory=rate_coordinator.limiter_for if rate_coordinator else None)
+        self.token = self.token_pool.tokens[0]
+        
+        self.headers = {
+            'Authorization': f'token {self.token}',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+        self.base_url = base_url.rstrip('/')
+        self.max_rate_limit_retries = 3
+        self.cache = cache
+        self.enrichment = enrichment
+        self.graphql_batch_size = graphql_batch_size
+        self.filter_plan = filter_plan
+        self.journal = None
+        self.refresh_planner = None
+        self.user_index = None
+        self.node_shard = None
+        self.run_stats = None
+        self.collection_plan = None
+        self.contribution_store = None
+        self.rank_index = None
+        # Requests charged against each rate budget since the collector was created
+        self.request_counts = Counter()
+        # Failed requests are retried later, and failing endpoints paused
+        self.retry_queue = RetryQueue()
+        self.circuit_breaker = CircuitBreaker()
+        # Wilayas left incomplete by requests that failed for good
+        self.failed_wilayas = set()
+    
+    @property
+    def rate_limit_remaining(self) -> int:
+        """Core API requests left in the current window across all tokens"""
+        return self.token_pool.remaining('core')
+    
+    def _location_shard(self, location: str, min_followers: Optional[int] = None) -> SearchShard:
+        """Root search shard of a location, with the filter plan pushed down"""
+        plan = self.filter_plan
+        if min_followers is None:
+            min_followers = plan.min_followers if plan else DEFAULT_MIN_FOLLOWERS
+        return SearchShard(location, min_followers, qualifiers=plan.search_qualifiers() if plan else '')
+    
+    def _owns_search(self, shard: SearchShard) -> bool:
+        """
+        Whether this node collects a search shard that fits under the cap
+        
+        Every node probes the same shards to take the same splitting
+        decisions; only the owner of a final shard pages through it.
+        """
+        return self.node_shard is None or self.node_shard.owns_search(shard.query())
+    
+    @staticmethod
+    def _unique_logins(term_results: Dict[str, List[Dict]]) -> List[str]:
+        """Logins of every search term's results, once each in order of first appearance"""
+        logins = {}
+        for term, users in term_results.items():
+            logger.info(f"Collected {len(users)} users for location: {term}")
+            for user in users:
+                logins.setdefault(user['login'])
+        return list(logins)
+    
+    def _register_search_results(self, logins: List[str], wilaya: Dict):
+        """Make a wilaya a candidate for every user its searches returned"""
+        if self.user_index:
+            self.user_index.add_candidates(logins, wilaya['code'])
+    
+    def _pending_logins(self, logins: List[str], wilaya: Dict) -> List[str]:
+        """Logins that still need enrichment (not yet collected in this run or recorded in the journal)"""
+        if self.user_index:
+            logins = [login for login in logins if not self.user_index.is_known(login)]
+        if not self.journal:
+            return logins
+        return [login for login in logins if not self.journal.is_user_done(wilaya['code'], login)]
+    
+    def _apply_refresh_plan(self, logins: List[str], wilaya: Dict) -> Tuple[List[str], List[Dict]]:
+        """
+        Split logins by the refresh planner, when one is attached
+        
+        Returns:
+            Tuple of (logins to enrich, stored users reused without requests)
+        """
+        if not self.refresh_planner:
+            return logins, []
+        
+        pending, reused = [], []
+        for login in logins:
+            if self.refresh_planner.classify(login) == FRESH:
+                stored = self.refresh_planner.stored(login)
+                reused.append(dict(stored, wilaya_code=wilaya['code'], wilaya_name=wilaya['name_en']))
+            else:
+                pending.append(login)
+        return pending, reused
+    
+    def _apply_collection_plan(self, logins: List[str], wilaya: Dict) -> Tuple[List[str], List[Dict]]:
+        """
+        Order logins by the collection plan and cut them to the wilaya's allowance, when a plan is attached
+        
+        Deferred users that have a stored record are reused as stored; the
+        others are left for a later run.
+        
+        Returns:
+            Tuple of (logins to enrich, most valuable first; stored users reused without requests)
+        """
+        if not self.collection_plan:
+            return logins, []
+        
+        selected, deferred = self.collection_plan.select_users(wilaya['code'], logins)
+        reused = []
+        for login in deferred:
+            stored = self.collection_plan.planner.snapshot.stored(login)
+            if stored:
+                reused.append(dict(stored, wilaya_code=wilaya['code'], wilaya_name=wilaya['name_en']))
+        if deferred:
+            logger.info(f"Deferred {len(deferred)} users of {wilaya['name_en']} to a later run "
+                        f"({len(reused)} kept from stored data)")
+        return selected, reused
+    
+    def _passes_filter(self, login: str, details: Dict) -> bool:
+        """
+        Whether fetched details still meet the filter plan
+        
+        Search results can lag behind the profile, so a user may have dropped
+        below the thresholds; such users are skipped before their
+        repositories are requested.
+        """
+        if self.filter_plan and not self.filter_plan.matches(details):
+            logger.info(f"Skipping {login}: below minimum thresholds")
+            return False
+        return True
+    
+    @staticmethod
+    def _sum_repos(repos: List[Dict]) -> Tuple[int, int]:
+        """Total stars and forks over a list of repositories"""
+        total_stars = sum(repo.get('stargazers_count', 0) for repo in repos)
+        total_forks = sum(repo.get('forks_count', 0) for repo in repos)
+        return total_stars, total_forks
+    
+    @staticmethod
+    def _build_enriched_user(login: str, details: Dict, total_stars: int, total_forks: int,
+                             wilaya: Dict) -> Dict:
+        """
+        Build the stored user record from profile details and repository totals
+        
+        Args:
+            login: GitHub username
+            details: /users/{login} payload (or its GraphQL equivalent)
+            total_stars: Stars summed over the user's public repositories
+            total_forks: Forks summed over the user's public repositories
+            wilaya: Wilaya configuration dictionary
+            
+        Returns:
+            Enriched user dictionary
+        """
+        return {
+            'username': login,
+            'name': details.get('name'),
+            'avatar_url': details.get('avatar_url'),
+            'bio': details.get('bio'),
+            'company': details.get('company'),
+            'location': details.get('location'),
+            'email': details.get('email'),
+            'blog': details.get('blog'),
+            'twitter_username': details.get('twitter_username'),
+            'followers': details.get('followers', 0),
+            'following': details.get('following', 0),
+            'public_repos': details.get('public_repos', 0),
+            'public_gists': details.get('public_gists', 0),
+            'total_stars': total_stars,
+            'total_forks': total_forks,
+            'created_at': details.get('created_at'),
+            'updated_at': details.get('updated_at'),
+            'wilaya_code': wilaya['code'],
+            'wilaya_name': wilaya['name_en'],
+            'collected_at': datetime.utcnow().isoformat()
+        }
+    
+    @staticmethod
+    def _count_contributions(events: List[Dict]) -> int:
+        """Count contribution-type events in a public events page"""
+        return sum(1 for event in events if event['type'] in CONTRIBUTION_EVENTS)
+    
+    @staticmethod
+    def _contribution_counts(results: List[Optional[int]]) -> Dict[str, int]:
+        """Summarize poll_contributions results"""
+        return {
+            'polled': len(results),
+            'unchanged': sum(1 for result in results if result is None),
+            'contributions': sum(result for result in results if result),
+        }
+    
+    def _record_user(self, user: Dict):
+        """Journal an enriched user when a journal is attached"""
+        if self.journal:
+            self.journal.record_user(user)
+    
+    def _record_missing_user(self, wilaya: Dict, login: str):
+        """Journal a user whose details could not be fetched"""
+        if self.user_index:
+            self.user_index.mark_missing(login)
+        if self.journal:
+            self.journal.record_missing_user(wilaya['code'], login)
+    
+    def _in_search_order(self, logins: List[str], wilaya: Dict, users: List[Dict]) -> List[Dict]:
+        """
+        Order collected users by search order, filling in journaled ones
+        
+        With a user index attached, the result is instead every user the
+        index resolves to this wilaya, including users enriched earlier in
+        the run for another wilaya.
+        """
+        by_login = {user['username']: user for user in users}
+        ordered = []
+        for login in logins:
+            user = by_login.get(login)
+            if user is None and self.journal:
+                user = self.journal.user(wilaya['code'], login)
+            if user:
+                ordered.append(user)
+        
+        if self.user_index:
+            for user in ordered:
+                self.user_index.add(user)
+            return self.user_index.users_for(wilaya['code'])
+        return ordered
+    
+    def _start_run_stats(self) -> Tuple[float, Counter]:
+        """Starting point of a wilaya's run statistics"""
+        return time.time(), Counter(self.request_counts)
+    
+    def _record_run_stats(self, wilaya: Dict, started: Tuple[float, Counter], term_users: Dict[str, int],
+                          found: int, enriched: int, reused: int):
+        """Record what collecting a wilaya cost, when run statistics are attached"""
+        if not self.run_stats:
+            return
+        start_time, counts_before = started
+        self.run_stats.record_wilaya(wilaya['code'], dict(self.request_counts - counts_before), term_users,
+                                     found, enriched, reused, time.time() - start_time)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether a failed request is worth another attempt (defined by each transport)"""
+        raise NotImplementedError
+    
+    def _retry_later(self, name: str, error: Exception, task: Callable, on_done: Optional[Callable] = None):
+        """Defer a failed operation to the retry queue, or give it up if its error is permanent"""
+        if self._is_retryable(error):
+            logger.warning(f"{name} failed ({error}); retrying later")
+            self.retry_queue.defer(name, error, task, on_done)
+        else:
+            self.retry_queue.fail(name, error)
+    
+    def _note_failures(self, wilaya: Dict, failed_before: int):
+        """Remember a wilaya as incomplete if any of its requests failed for good"""
+        if self.retry_queue.counts['failed'] > failed_before:
+            self.failed_wilayas.add(wilaya['code'])
+    
+    def save_data(self, data: Iterable[Dict], filepath: str):
+        """
+        Stream collected data to an NDJSON file, zstd-compressed if it ends in .zst
+        
+        Args:
+            data: Users to save, possibly a generator
+            filepath: Destination; replaces the wilaya's file in any other format
+        """
+        count = write_raw_users(filepath, data)
+        logger.info(f"Saved {count} users to {filepath}")
@@ -0,0 +1,380 @@
+"""
+Collection Planner
+Estimates the API requests a collection needs from past run statistics and
+the stored users, and fits wilayas and users into the remaining rate budget
+by expected ranking value and staleness
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import List, Dict, Iterable, Optional, Tuple
+import logging
+
+from .run_stats import RunStats
+from .incremental_refresh import RefreshPlanner
+from .search_sharding import SEARCH_PAGE_SIZE
+from .token_pool import TokenPool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+RESOURCES = ['search', 'core', 'graphql']
+
+# Estimates for wilayas that were never collected
+DEFAULT_USERS_PER_TERM = 30
+DEFAULT_SEARCH_PAGES_PER_TERM = 1
+DEFAULT_REPO_PAGES_PER_USER = 1.0
+
+# Seconds per request of one connection when no run was ever timed
+DEFAULT_SECONDS_PER_REQUEST = 0.3
+
+# A user never collected is as urgent as a stored one three deadlines overdue
+MAX_URGENCY = 3.0
+
+# Repositories per page of /users/{login}/repos and of the GraphQL connection
+REPOS_PER_PAGE = 100
+
+
+def available_budget(token_pool: TokenPool, now: Optional[float] = None) -> Dict[str, Dict]:
+    """
+    Rate budget of every resource, summed over the pooled tokens
+    
+    Returns:
+        Mapping of resource to 'remaining', 'limit', 'burst', 'window' and
+        'reset_in' (seconds until the earliest window resets)
+    """
+    now = now or time.time()
+    budget = {}
+    for resource in RESOURCES:
+        buckets = [limiter.bucket(resource) for limiter in token_pool.limiters.values()]
+        budget[resource] = {
+            'remaining': sum(bucket.remaining for bucket in buckets),
+            'limit': sum(bucket.limit for bucket in buckets),
+            'burst': sum(bucket.burst for bucket in buckets),
+            'window': buckets[0].window,
+            'reset_in': max(min(bucket.reset_at for bucket in buckets) - now, 0.0),
+        }
+    return budget
+
+
+def _capacity(budget: Dict, seconds: float) -> float:
+    """Requests a resource allows within `seconds`, counting the windows that reset meanwhile"""
+    if seconds < budget['reset_in']:
+        return budget['remaining']
+    resets = 1 + math.floor((seconds - budget['reset_in']) / budget['window'])
+    return budget['remaining'] + resets * budget['limit']
+
+
+def _paced_seconds(requests: float, budget: Dict) -> float:
+    """Time the rate limiter needs to send `requests` (it spreads the remaining budget over the window)"""
+    if requests <= budget['burst']:
+        return 0.0
+    if requests <= budget['remaining']:
+        return (requests - budget['burst']) * budget['reset_in'] / max(budget['remaining'], 1)
+    return budget['reset_in'] + (requests - budget['remaining']) * budget['window'] / max(budget['limit'], 1)
+
+
+class CollectionPlan:
+    """
+    Ordered wilayas to collect within a budget, with per-wilaya user allowances
+    
+    Each entry holds the wilaya, its estimate, the requests planned per
+    resource and its allowance: the number of users that may be enriched
+    (None for all of them). Wilayas that did not fit are listed in `skipped`.
+    """
+    
+    def __init__(self, planner: 'CollectionPlanner', entries: List[Dict], skipped: List[Dict],
+                 budget: Dict[str, Dict], seconds: float, window_seconds: Optional[float]):
+        self.planner = planner
+        self.entries = entries
+        self.skipped = skipped
+        self.budget = budget
+        self.seconds = seconds
+        self.window_seconds = window_seconds
+        self._allowances = {entry['wilaya']['code']: entry['allowance'] for entry in entries}
+    
+    @property
+    def requests(self) -> Dict[str, int]:
+        """Planned requests per resource"""
+        return {resource: sum(entry['requests'][resource] for entry in self.entries) for resource in RESOURCES}
+    
+    @property
+    def complete(self) -> bool:
+        """Whether every wilaya is collected in full"""
+        return not self.skipped and all(entry['allowance'] is None for entry in self.entries)
+    
+    def is_partial(self, wilaya_code: str) -> bool:
+        """Whether some users of a wilaya are deferred to a later run"""
+        return self._allowances.get(wilaya_code) is not None
+    
+    def wilayas(self) -> List[Dict]:
+        """Wilayas to collect, most valuable per request first"""
+        return [entry['wilaya'] for entry in self.entries]
+    
+    def select_users(self, wilaya_code: str, logins: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Order a wilaya's pending logins and cut them to its allowance
+        
+        Returns:
+            Tuple of (logins to enrich, most valuable first; deferred logins)
+        """
+        ordered = self.planner.order_users(wilaya_code, logins)
+        allowance = self._allowances.get(wilaya_code)
+        if allowance is None:
+            return ordered, []
+        return ordered[:allowance], ordered[allowance:]
+    
+    def summary(self) -> str:
+        """Human-readable plan: order, allowances, predicted requests and time"""
+        lines = [f"Collection plan: {len(self.entries)} wilayas"
+                 + (f", {len(self.skipped)} deferred" if self.skipped else '')]
+        for position, entry in enumerate(self.entries, 1):
+            estimate = entry['estimate']
+            users = (f"{entry['allowance']}/{estimate['enrich']} users" if entry['allowance'] is not None
+                     else f"{estimate['enrich']} users")
+            requests = ', '.join(f"{resource} {count}" for resource, count in entry['requests'].items() if count)
+            lines.append(f"  {position:>2}. {entry['wilaya']['name_en']} ({entry['wilaya']['code']}): "
+                         f"{users}, {requests}")
+        if self.skipped:
+            lines.append(f"  Deferred: {', '.join(entry['wilaya']['name_en'] for entry in self.skipped)}")
+        
+        requests = self.requests
+        lines.append(f"Predicted requests: {sum(requests.values())} "
+                     f"({', '.join(f'{resource} {count}' for resource, count in requests.items())})")
+        for resource in RESOURCES:
+            budget = self.budget[resource]
+            lines.append(f"  {resource}: {budget['remaining']}/{budget['limit']} remaining, "
+                         f"resets in {budget['reset_in'] / 60:.0f} min")
+        lines.append(f"Predicted wall-clock time: {_format_duration(self.seconds)}"
+                     + (f" (window {_format_duration(self.window_seconds)})" if self.window_seconds is not None else ''))
+        return '\n'.join(lines)
+
+
+def _format_duration(seconds: float) -> str:
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class CollectionPlanner:
+    """
+    Cost model and budget fitting for a collection run
+    
+    The cost of a wilaya is estimated from its last recorded run (search
+    pages, users per term) and from its stored users (repository pages per
+    user), falling back to defaults for wilayas never collected. A user's
+    expected ranking value is 1 / its best stored rank (see RefreshPlanner)
+    and its urgency is its age over its staleness deadline; users never
+    collected get the wilaya's mean value and MAX_URGENCY. Wilayas are
+    taken by value per request until the budget or the time window runs
+    out; the last wilaya that fits only partly gets a user allowance, and
+    its most valuable, stalest users are enriched first.
+    
+    Args:
+        wilayas: Wilaya configurations
+        stats: Statistics of previous runs
+        users: Stored users (the previous snapshot)
+        enrichment: 'rest' or 'graphql', as for the collector
+        graphql_batch_size: Users per GraphQL query
+        refresh: Whether fresh stored users are reused without requests
+        fallback_order: Wilaya codes collected first when nothing is known
+            about any wilaya (e.g. the largest cities)
+        concurrency: In-flight requests, for the time estimate without history
+    """
+    
+    def __init__(self, wilayas: List[Dict], stats: RunStats, users: Iterable[Dict] = (),
+                 enrichment: str = 'rest', graphql_batch_size: int = 25, refresh: bool = False,
+                 fallback_order: Optional[List[str]] = None, concurrency: int = 1,
+                 now: Optional[datetime] = None):
+        self.wilayas = wilayas
+        self.stats = stats
+        self.enrichment = enrichment
+        self.graphql_batch_size = graphql_batch_size
+        self.refresh = refresh
+        self.fallback_order = fallback_order or []
+        self.concurrency = concurrency
+        self.now = now or datetime.utcnow()
+        
+        self.snapshot = RefreshPlanner(users, now=self.now)
+        self.stored_by_wilaya = {}
+        for user in self.snapshot.users.values():
+            self.stored_by_wilaya.setdefault(user.get('wilaya_code'), []).append(user)
+        values = [self.value(login) for login in self.snapshot.users]
+        self.mean_value = sum(values) / len(values) if values else 0.0
+        # Mean value of each wilaya's stored users, the expected value of its new users
+        self.wilaya_mean_values = {
+            code: sum(self.value(user['username']) for user in stored) / len(stored)
+            for code, stored in self.stored_by_wilaya.items()
+        }
+    
+    # Value and urgency of single users
+    
+    def value(self, login: str) -> float:
+        """Expected ranking value of a stored user"""
+        rank = self.snapshot.best_rank.get(login)
+        return 1.0 / rank if rank else 0.0
+    
+    def urgency(self, login: str) -> float:
+        """How overdue a stored user is, relative to its staleness deadline (MAX_URGENCY if never collected)"""
+        stored = self.snapshot.stored(login)
+        if stored is None:
+            return MAX_URGENCY
+        try:
+            age = self.now - datetime.fromisoformat(stored['collected_at'])
+        except (KeyError, TypeError, ValueError):
+            return MAX_URGENCY
+        return min(age / self.snapshot.deadline(login), MAX_URGENCY)
+    
+    def _wilaya_mean_value(self, wilaya_code: str) -> float:
+        return self.wilaya_mean_values.get(wilaya_code, self.mean_value)
+    
+    def priority(self, login: str, wilaya_code: str) -> float:
+        """Expected value of enriching a user now"""
+        if self.snapshot.stored(login) is None:
+            return self._wilaya_mean_value(wilaya_code) * MAX_URGENCY
+        return self.value(login) * self.urgency(login)
+    
+    def order_users(self, wilaya_code: str, logins: List[str]) -> List[str]:
+        """Logins by priority, keeping search order between equals"""
+        return sorted(logins, key=lambda login: -self.priority(login, wilaya_code))
+    
+    # Cost and value of whole wilayas
+    
+    def _repo_pages(self, stored: List[Dict], history: Optional[Dict]) -> Tuple[float, float]:
+        """Mean repository pages per user over REST, and extra GraphQL pages per user"""
+        if stored:
+            pages = [max(1, math.ceil((user.get('public_repos') or 0) / REPOS_PER_PAGE)) for user in stored]
+            return sum(pages) / len(pages), sum(page - 1 for page in pages) / len(pages)
+        if history and history.get('enriched') and 'core' in history['requests']:
+            per_user = history['requests']['core'] / history['enriched'] - 1
+            return max(per_user, DEFAULT_REPO_PAGES_PER_USER), max(per_user - 1, 0.0)
+        return DEFAULT_REPO_PAGES_PER_USER, 0.0
+    
+    def estimate(self, wilaya: Dict) -> Dict:
+        """
+        Expected cost of collecting a wilaya in full
+        
+        Returns:
+            Dict with 'search' requests, 'found' users (by the searches),
+            'new' users (not stored yet), 'enrich' users and the 'per_user'
+            requests per resource
+        """
+        history = self.stats.get(wilaya['code'])
+        stored = self.stored_by_wilaya.get(wilaya['code'], [])
+        terms = wilaya['search_terms']
+        
+        if history:
+            term_users = history.get('term_users', {})
+            if set(term_users) == set(terms):
+                found = history['found']
+            else:
+                found = sum(term_users.get(term, DEFAULT_USERS_PER_TERM) for term in terms)
+            recorded_terms = max(len(term_users), 1)
+            search = math.ceil(history['requests'].get('search', 0) * len(terms) / recorded_terms)
+        else:
+            found = len(stored) or len(terms) * DEFAULT_USERS_PER_TERM
+            search = sum(max(DEFAULT_SEARCH_PAGES_PER_TERM, math.ceil(found / len(terms) / SEARCH_PAGE_SIZE))
+                         for _ in terms)
+        
+        # Users also found by an earlier wilaya of the run are enriched only once
+        unique = min(found, history['enriched'] + history['reused']) if history else found
+        new = max(unique - len(stored), 0)
+        if self.refresh:
+            enrich = new + sum(1 for user in stored if self.urgency(user['username']) >= 1)
+        else:
+            enrich = unique
+        
+        repo_pages, extra_pages = self._repo_pages(stored, history)
+        if self.enrichment == 'graphql':
+            per_user = {'core': 0.0, 'graphql': 1 / self.graphql_batch_size + extra_pages}
+        else:
+            per_user = {'core': 1 + repo_pages, 'graphql': 0.0}
+        return {'search': search, 'found': found, 'new': new, 'enrich': enrich, 'per_user': per_user}
+    
+    def _requests(self, estimate: Dict, users: int) -> Dict[str, int]:
+        return {
+            'search': estimate['search'],
+            'core': math.ceil(users * estimate['per_user']['core']),
+            'graphql': math.ceil(users * estimate['per_user']['graphql']),
+        }
+    
+    def _value(self, wilaya: Dict, estimate: Dict) -> float:
+        """Expected ranking value of collecting a wilaya"""
+        code = wilaya['code']
+        stored = self.stored_by_wilaya.get(code, [])
+        value = sum(self.value(user['username']) * self.urgency(user['username']) for user in stored
+                    if not self.refresh or self.urgency(user['username']) >= 1)
+        return value + estimate['new'] * self._wilaya_mean_value(code) * MAX_URGENCY
+    
+    def seconds_per_request(self) -> float:
+        """Observed seconds per request over the recorded runs"""
+        seconds = sum(entry.get('seconds', 0) for entry in self.stats.wilayas.values())
+        requests = sum(sum(entry['requests'].values()) for entry in self.stats.wilayas.values())
+        if seconds and requests:
+            return seconds / requests
+        return DEFAULT_SECONDS_PER_REQUEST / self.concurrency
+    
+    def predict_seconds(self, requests: Dict[str, int], budget: Dict[str, Dict]) -> float:
+        """Wall-clock time of a number of requests: rate pacing or throughput, whichever is slower"""
+        paced = max(_paced_seconds(requests[resource], budget[resource]) for resource in RESOURCES)
+        return max(paced, sum(requests.values()) * self.seconds_per_request())
+    
+    def _fits(self, requests: Dict[str, int], budget: Dict[str, Dict], window_seconds: Optional[float]) -> bool:
+        if window_seconds is None:
+            return True
+        if any(requests[resource] > _capacity(budget[resource], window_seconds) for resource in RESOURCES):
+            return False
+        return self.predict_seconds(requests, budget) <= window_seconds
+    
+    def plan(self, budget: Dict[str, Dict], window_seconds: Optional[float] = None,
+             wilayas: Optional[List[Dict]] = None) -> CollectionPlan:
+        """
+        Fit wilayas into a budget
+        
+        Args:
+            budget: Available budget per resource (see available_budget)
+            window_seconds: Time the collection may take; None plans every
+                wilaya in full and only orders them
+            wilayas: Wilayas to consider (defaults to all)
+        
+        Returns:
+            CollectionPlan
+        """
+        candidates = []
+        for position, wilaya in enumerate(wilayas if wilayas is not None else self.wilayas):
+            estimate = self.estimate(wilaya)
+            cost = max(sum(self._requests(estimate, estimate['enrich']).values()), 1)
+            fallback = (self.fallback_order.index(wilaya['code']) if wilaya['code'] in self.fallback_order
+                        else len(self.fallback_order) + position)
+            candidates.append((-self._value(wilaya, estimate) / cost, fallback, wilaya, estimate))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        
+        entries, skipped = [], []
+        planned = dict.fromkeys(RESOURCES, 0)
+        for _, _, wilaya, estimate in candidates:
+            allowance = None
+            requests = self._requests(estimate, estimate['enrich'])
+            if not self._fits({r: planned[r] + requests[r] for r in RESOURCES}, budget, window_seconds):
+                # Largest number of users that still fits after the searches
+                low, high = 0, estimate['enrich']
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    trial = self._requests(estimate, middle)
+                    if self._fits({r: planned[r] + trial[r] for r in RESOURCES}, budget, window_seconds):
+                        low = middle
+                    else:
+                        high = middle - 1
+                requests = self._requests(estimate, low)
+                if low == 0 or not self._fits({r: planned[r] + requests[r] for r in RESOURCES},
+                                              budget, window_seconds):
+                    skipped.append({'wilaya': wilaya, 'estimate': estimate})
+                    continue
+                allowance = low
+            
+            for resource in RESOURCES:
+                planned[resource] += requests[resource]
+            entries.append({'wilaya': wilaya, 'estimate': estimate, 'requests': requests, 'allowance': allowance})
+        
+        return CollectionPlan(self, entries, skipped, budget, self.predict_seconds(planned, budget), window_seconds)
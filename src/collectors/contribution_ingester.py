@@ -0,0 +1,46 @@
+"""
+Contribution Ingester
+Counts contribution events from a user's public events feed, resuming at
+the newest event counted by the previous poll
+"""
+
+from collections import Counter
+from typing import List, Dict, Tuple
+
+
+# Event types counted as contributions
+CONTRIBUTION_EVENTS = {
+    'PushEvent', 'PullRequestEvent', 'IssuesEvent',
+    'IssueCommentEvent', 'PullRequestReviewEvent'
+}
+
+# GitHub serves at most 3 pages of 100 public events per user
+EVENTS_PER_PAGE = 100
+MAX_EVENT_PAGES = 3
+
+
+def count_new_events(events: List[Dict], last_event_id: int) -> Tuple[Counter, int, bool]:
+    """
+    Count the contribution events of a page that are newer than a cursor
+    
+    Event ids grow over time and pages are newest first, so the first
+    event at or below the cursor ends the new events.
+    
+    Args:
+        events: One page of /users/{login}/events/public
+        last_event_id: Newest event id counted by the previous poll (0 if none)
+    
+    Returns:
+        Tuple of (new contributions per day, newest event id of the page or
+        last_event_id, whether the cursor was reached)
+    """
+    days = Counter()
+    newest = last_event_id
+    for event in events:
+        event_id = int(event['id'])
+        if event_id <= last_event_id:
+            return days, newest, True
+        newest = max(newest, event_id)
+        if event['type'] in CONTRIBUTION_EVENTS:
+            days[event['created_at'][:10]] += 1
+    return days, newest, False
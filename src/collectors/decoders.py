@@ -0,0 +1,165 @@
+"""
+Response Decoders for the GitHub API
+Typed decoders that keep only the fields the pipeline reads from search,
+user, repository and event payloads. With msgspec installed unused fields
+are never materialized as Python objects; without it the whole document is
+parsed and then validated and projected, which saves no decoding work
+"""
+
+import json
+from typing import List, Optional, Callable, Any, TypedDict, get_args, get_origin, get_type_hints, is_typeddict
+import logging
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PayloadError(ValueError):
+    """A response body that is not JSON of the expected shape"""
+
+
+class SearchItem(TypedDict):
+    login: str
+
+
+class SearchPage(TypedDict, total=False):
+    total_count: int
+    incomplete_results: bool
+    items: List[SearchItem]
+
+
+class UserDetails(TypedDict, total=False):
+    """The /users/{login} fields used by filtering and the stored user record"""
+    login: str
+    name: Optional[str]
+    avatar_url: Optional[str]
+    bio: Optional[str]
+    company: Optional[str]
+    location: Optional[str]
+    email: Optional[str]
+    blog: Optional[str]
+    twitter_username: Optional[str]
+    followers: int
+    following: int
+    public_repos: int
+    public_gists: int
+    created_at: Optional[str]
+    updated_at: Optional[str]
+
+
+class Repo(TypedDict, total=False):
+    stargazers_count: int
+    forks_count: int
+
+
+class Event(TypedDict, total=False):
+    id: str
+    type: str
+    created_at: str
+
+
+def decode_json(body: bytes) -> Any:
+    """
+    Decode a whole JSON document (orjson when installed)
+    
+    Raises:
+        PayloadError: If the body is not valid JSON
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+    except ValueError as e:
+        raise PayloadError(f"Invalid JSON payload: {e}") from e
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _projector(response_type: Any) -> Callable[[Any], Any]:
+    """
+    Build a function cutting a decoded document down to the fields of a type
+    
+    TypedDicts keep their declared keys (recursively), lists project their
+    items, and every other type is returned as is.
+    """
+    if is_typeddict(response_type):
+        fields = {name: _projector(hint) for name, hint in get_type_hints(response_type).items()}
+        if all(project is _identity for project in fields.values()):
+            names = tuple(fields)
+            return lambda value: {name: value[name] for name in names if name in value} \
+                if isinstance(value, dict) else value
+        return lambda value: {name: project(value[name]) for name, project in fields.items() if name in value} \
+            if isinstance(value, dict) else value
+    
+    if get_origin(response_type) in (list, List):
+        project = _projector(get_args(response_type)[0])
+        if project is _identity:
+            return _identity
+        return lambda value: [project(item) for item in value] if isinstance(value, list) else value
+    
+    return _identity
+
+
+class ResponseDecoder:
+    """
+    Decoder of one response type
+    
+    With msgspec installed, the body is decoded straight into the declared
+    TypedDict (unknown fields are skipped by the parser and field types are
+    validated). Otherwise it is parsed whole with orjson or json, checked
+    to be the declared object or array, and projected onto the same fields:
+    the fallback only validates the document type and drops undeclared
+    fields, it neither checks field types nor decodes any less.
+    Either way the result is a plain dict or list, and a payload of the
+    wrong shape raises PayloadError.
+    """
+    
+    def __init__(self, response_type: Any):
+        self.response_type = response_type
+        self.name = getattr(response_type, '__name__', str(response_type))
+        self._decoder = msgspec.json.Decoder(response_type) if msgspec is not None else None
+        self._project = _projector(response_type)
+        # The document type the fallback path checks, as msgspec would
+        self._container = dict if is_typeddict(response_type) else \
+            list if get_origin(response_type) in (list, List) else object
+    
+    def decode(self, body: bytes) -> Any:
+        """
+        Decode a response body
+        
+        Args:
+            body: Raw JSON response body
+        
+        Returns:
+            Decoded payload holding only the declared fields
+        
+        Raises:
+            PayloadError: If the body is not valid JSON of the declared shape
+        """
+        if self._decoder is not None:
+            try:
+                return self._decoder.decode(body)
+            except msgspec.DecodeError as e:
+                raise PayloadError(f"Invalid {self.name} payload: {e}") from e
+        payload = decode_json(body)
+        if not isinstance(payload, self._container):
+            raise PayloadError(f"Invalid {self.name} payload: expected a JSON {self._container.__name__}")
+        return self._project(payload)
+
+
+SEARCH_PAGE = ResponseDecoder(SearchPage)
+USER_DETAILS = ResponseDecoder(UserDetails)
+REPO_PAGE = ResponseDecoder(List[Repo])
+EVENT_PAGE = ResponseDecoder(List[Event])
@@ -3,98 +3,289 @@ GitHub Data Collector for Algeria Rankings
 Collects user data from GitHub API for all 69 Algerian wilayas
 """
 
-import os
-import json
+import math
 import time
+from collections import Counter
+from functools import partial
 import requests
-from typing import List, Dict, Optional
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional, Tuple
 import logging
 
+from .base_collector import BaseGitHubCollector, DEFAULT_BASE_URL
+from .rate_limiter import resource_for_path
+from .rate_coordinator import RateCoordinator
+from .response_cache import ResponseCache
+from .decoders import ResponseDecoder, SEARCH_PAGE, USER_DETAILS, REPO_PAGE, EVENT_PAGE, PayloadError, decode_json
+from .contribution_ingester import EVENTS_PER_PAGE, MAX_EVENT_PAGES, count_new_events
+from .retry_queue import CircuitOpenError, RETRYABLE_STATUSES, circuit_for_path
+from .search_sharding import SearchShard, SEARCH_RESULT_CAP, SEARCH_PAGE_SIZE
+from .graphql_enrichment import (
+    GRAPHQL_PATH, build_batch_query, build_repos_page_query, parse_batch_response, parse_repos_page
+)
+from processors.filter_plan import FilterPlan
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class GitHubCollector:
+class GitHubCollector(BaseGitHubCollector):
     """Collects GitHub user data using GitHub API"""
     
-    def __init__(self, token: Optional[str] = None):
-        self.token = token or os.getenv('GITHUB_TOKEN')
-        if not self.token:
-            raise ValueError("GitHub token required. Set GITHUB_TOKEN environment variable.")
-        
-        self.headers = {
-            'Authorization': f'token {self.token}',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-        self.base_url = 'https://api.github.com'
-        self.rate_limit_remaining = 5000
+    # Errors of a failed request or of its undecodable payload
+    REQUEST_ERRORS = (requests.exceptions.RequestException, CircuitOpenError, PayloadError)
+    
+    def __init__(self, token: Optional[str] = None, base_url: str = DEFAULT_BASE_URL,
+                 pool_size: int = 10, tokens: Optional[List[str]] = None,
+                 cache: Optional[ResponseCache] = None, enrichment: str = 'rest',
+                 graphql_batch_size: int = 25, filter_plan: Optional[FilterPlan] = None,
+                 rate_coordinator: Optional[RateCoordinator] = None):
+        super().__init__(token, base_url, tokens=tokens, cache=cache, enrichment=enrichment,
+                         graphql_batch_size=graphql_batch_size, filter_plan=filter_plan,
+                         rate_coordinator=rate_coordinator)
+        self.pool_size = pool_size
+        self._session = None
+    
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive HTTP session shared by every request of this collector"""
+        if self._session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+    
+    def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def _request(self, method: str, path: str, params: Optional[Dict] = None,
+                 payload: Optional[Dict] = None, token: Optional[str] = None,
+                 headers: Optional[Dict] = None) -> requests.Response:
+        """
+        Issue a request against the API over the pooled session
+        
+        The request is sent with the pooled token that has the most budget
+        left for its resource and paced by that token's rate limiter.
+        Responses rejected by a rate limit are retried, on another token
+        when one is available. A 304 reply is not charged by GitHub, so its
+        reservation is refunded. Transport errors and 5xx replies count
+        against the endpoint's circuit breaker.
+        
+        Args:
+            method: HTTP method
+            path: API path relative to base_url (e.g. '/users/octocat')
+            params: Query string parameters
+            payload: JSON request body
+            token: Token for endpoints outside any rate budget (defaults to the first)
+            headers: Extra request headers
+            
+        Returns:
+            Response object (status not checked)
+            
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open (nothing is sent)
+            requests.exceptions.RequestException: On transport errors
+        """
+        resource = resource_for_path(path)
+        endpoint = circuit_for_path(path)
+        self.circuit_breaker.check(endpoint)
+        
+        for attempt in range(self.max_rate_limit_retries + 1):
+            if resource:
+                token, wait = self.token_pool.acquire(resource)
+                if wait > 0:
+                    logger.debug(f"Waiting {wait:.2f}s for {resource} budget")
+                    time.sleep(wait)
+            else:
+                token = token or self.token
+            
+            try:
+                response = self.session.request(
+                    method,
+                    f'{self.base_url}{path}',
+                    params=params,
+                    json=payload,
+                    headers={'Authorization': f'token {token}', **(headers or {})}
+                )
+            except requests.exceptions.RequestException:
+                self.circuit_breaker.record_failure(endpoint)
+                raise
+            if resource:
+                self.request_counts[resource] += 1
+            
+            body = response.content if response.status_code in (403, 429) else b''
+            if not resource or not self.token_pool.update(token, resource, response.headers,
+                                                          response.status_code, body):
+                break
+        
+        if resource and response.status_code == 304:
+            self.token_pool.refund(token, resource)
+            self.request_counts[resource] -= 1
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure(endpoint)
+        else:
+            self.circuit_breaker.record_success(endpoint)
+        return response
+    
+    def _get(self, path: str, params: Optional[Dict] = None, token: Optional[str] = None,
+             headers: Optional[Dict] = None) -> requests.Response:
+        """Issue a GET request (see _request)"""
+        return self._request('GET', path, params=params, token=token, headers=headers)
+    
+    def _post_json(self, path: str, payload: Dict):
+        """
+        POST a JSON body and decode the JSON reply (never cached)
+        
+        Raises:
+            requests.exceptions.RequestException: On transport errors or non-2xx status
+            PayloadError: If the body does not decode
+        """
+        response = self._request('POST', path, payload=payload)
+        response.raise_for_status()
+        return decode_json(response.content)
+    
+    def _get_json(self, path: str, params: Optional[Dict] = None, decoder: Optional[ResponseDecoder] = None):
+        """
+        Fetch and decode a JSON resource, going through the response cache
+        
+        Fresh cache entries are returned without a request. Stale ones are
+        revalidated with If-None-Match/If-Modified-Since and reused on 304.
+        
+        Args:
+            path: API path relative to base_url
+            params: Query string parameters
+            decoder: Typed decoder keeping only the fields the caller reads
+                (the whole document is decoded without one)
+            
+        Returns:
+            Decoded JSON payload
+            
+        Raises:
+            requests.exceptions.RequestException: On transport errors or non-2xx status
+            PayloadError: If the body does not decode
+        """
+        decode = decoder.decode if decoder else decode_json
+        entry = self.cache.lookup(path, params) if self.cache else None
+        if entry and entry.fresh:
+            return decode(entry.body)
+        
+        response = self._get(path, params, headers=entry.conditional_headers() if entry else None)
+        if entry and response.status_code == 304:
+            self.cache.revalidated(entry)
+            return decode(entry.body)
+        
+        response.raise_for_status()
+        if self.cache:
+            self.cache.store(path, params, response.content, response.headers)
+        return decode(response.content)
         
     def check_rate_limit(self):
-        """Check GitHub API rate limit"""
-        response = requests.get(
-            f'{self.base_url}/rate_limit',
-            headers=self.headers
-        )
-        data = response.json()
-        self.rate_limit_remaining = data['rate']['remaining']
+        """Check GitHub API rate limit for every pooled token"""
+        for token in self.token_pool.tokens:
+            response = self._get('/rate_limit', token=token)
+            data = decode_json(response.content)
+            self.token_pool.load(token, data.get('resources', {'core': data['rate']}))
         logger.info(f"Rate limit remaining: {self.rate_limit_remaining}")
         return self.rate_limit_remaining
     
-    def search_users_by_location(self, location: str, min_followers: int = 5) -> List[Dict]:
+    def search_users_by_location(self, location: str, min_followers: Optional[int] = None) -> List[Dict]:
         """
         Search GitHub users by location
         
+        Locations with more matches than the search API returns (1000) are
+        split into followers/created-date shards until every shard fits.
+        
         Args:
             location: Location search term
-            min_followers: Minimum number of followers
+            min_followers: Minimum number of followers (defaults to the
+                filter plan's threshold, or DEFAULT_MIN_FOLLOWERS without one)
             
         Returns:
             List of user data dictionaries
         """
-        users = []
-        page = 1
-        per_page = 100
+        users = self.search_shard(self._location_shard(location, min_followers))
+        logger.info(f"Collected {len(users)} users for location: {location}")
+        return users
+    
+    def _search_page(self, shard: SearchShard, page: int, per_page: int) -> Dict:
+        """Fetch one result page of a shard, reusing it from the journal when recorded"""
+        query = shard.query()
+        data = self.journal.search_page(query, page) if self.journal else None
+        if data is None:
+            data = self._get_json('/search/users', shard.params(page, per_page), decoder=SEARCH_PAGE)
+            if self.journal:
+                self.journal.record_search_page(query, page, data)
+        return data
+    
+    def search_shard(self, shard: SearchShard) -> List[Dict]:
+        """
+        Collect every result of a search shard, subdividing it while over the cap
         
-        while True:
-            if self.rate_limit_remaining < 10:
-                logger.warning("Rate limit low, waiting 60 seconds...")
-                time.sleep(60)
-                self.check_rate_limit()
-            
-            query = f'location:{location} followers:>={min_followers}'
-            url = f'{self.base_url}/search/users'
-            params = {
-                'q': query,
-                'per_page': per_page,
-                'page': page,
-                'sort': 'followers',
-                'order': 'desc'
-            }
+        Pages that fail are retried with backoff before returning.
+        
+        Args:
+            shard: Search shard to collect
             
+        Returns:
+            List of user data dictionaries
+        """
+        users = []
+        self._search_into(shard, users)
+        self._drain_retries()
+        return users
+    
+    def _search_into(self, shard: SearchShard, users: List[Dict]):
+        """
+        Append the results of a search shard to `users`
+        
+        A page that fails with a retryable error is deferred to the retry
+        queue and its results are appended once it succeeds, so the other
+        pages and shards are not held up.
+        """
+        try:
+            self._search_first(shard, users)
+        except self.REQUEST_ERRORS as e:
+            self._retry_later(f"search {shard.query()}", e, partial(self._search_first, shard, users))
+    
+    def _search_first(self, shard: SearchShard, users: List[Dict]):
+        """Fetch the first page of a shard, then subdivide it or page through it (see _search_into)"""
+        per_page = SEARCH_PAGE_SIZE
+        data = self._search_page(shard, 1, per_page)
+        
+        total = data.get('total_count', 0)
+        if total > SEARCH_RESULT_CAP:
+            children = shard.split()
+            if children:
+                logger.info(f"Splitting {shard.query()} ({total} results)")
+                for child in children:
+                    self._search_into(child, users)
+                return
+            logger.warning(f"{shard.query()} has {total} results, only {SEARCH_RESULT_CAP} are reachable")
+        
+        if not self._owns_search(shard):
+            return
+        
+        users.extend(data.get('items', []))
+        last_page = math.ceil(min(total, SEARCH_RESULT_CAP) / per_page)
+        
+        for page in range(2, last_page + 1):
             try:
-                response = requests.get(url, headers=self.headers, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if 'items' not in data or len(data['items']) == 0:
-                    break
-                
-                users.extend(data['items'])
-                logger.info(f"Collected {len(users)} users for location: {location}")
-                
-                # Check if there are more pages
-                if len(data['items']) < per_page:
-                    break
-                    
-                page += 1
-                time.sleep(2)  # Rate limiting
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error fetching users for {location}: {e}")
+                data = self._search_page(shard, page, per_page)
+            except self.REQUEST_ERRORS as e:
+                self._retry_later(f"search {shard.query()} page {page}", e,
+                                  partial(self._search_page, shard, page, per_page),
+                                  lambda data: users.extend(data.get('items', [])))
+                continue
+            
+            if not data.get('items'):
                 break
-        
-        return users
+            users.extend(data['items'])
     
     def get_user_details(self, username: str) -> Optional[Dict]:
         """
@@ -104,21 +295,17 @@ class GitHubCollector:
             username: GitHub username
             
         Returns:
-            User details dictionary or None
+            User details dictionary, or None if it cannot be fetched
+            
+        Raises:
+            Retryable request errors (transport errors, 5xx replies, open
+            circuit), so the caller can retry later instead of losing the user
         """
-        if self.rate_limit_remaining < 10:
-            logger.warning("Rate limit low, waiting 60 seconds...")
-            time.sleep(60)
-            self.check_rate_limit()
-        
         try:
-            response = requests.get(
-                f'{self.base_url}/users/{username}',
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self._get_json(f'/users/{username}', decoder=USER_DETAILS)
+        except self.REQUEST_ERRORS as e:
+            if self._is_retryable(e):
+                raise
             logger.error(f"Error fetching details for {username}: {e}")
             return None
     
@@ -131,24 +318,21 @@ class GitHubCollector:
             
         Returns:
             List of repository dictionaries
+            
+        Raises:
+            Retryable request errors, rather than returning a truncated list
         """
         repos = []
         page = 1
         per_page = 100
         
         while True:
-            if self.rate_limit_remaining < 10:
-                time.sleep(60)
-                self.check_rate_limit()
-            
             try:
-                response = requests.get(
-                    f'{self.base_url}/users/{username}/repos',
-                    headers=self.headers,
-                    params={'per_page': per_page, 'page': page, 'sort': 'updated'}
+                data = self._get_json(
+                    f'/users/{username}/repos',
+                    {'per_page': per_page, 'page': page, 'sort': 'updated'},
+                    decoder=REPO_PAGE
                 )
-                response.raise_for_status()
-                data = response.json()
                 
                 if not data:
                     break
@@ -159,9 +343,10 @@ class GitHubCollector:
                     break
                     
                 page += 1
-                time.sleep(1)
                 
-            except requests.exceptions.RequestException as e:
+            except self.REQUEST_ERRORS as e:
+                if self._is_retryable(e):
+                    raise
                 logger.error(f"Error fetching repos for {username}: {e}")
                 break
         
@@ -179,31 +364,190 @@ class GitHubCollector:
             Estimated contribution count
         """
         try:
-            response = requests.get(
-                f'{self.base_url}/users/{username}/events/public',
-                headers=self.headers,
-                params={'per_page': 100}
-            )
-            response.raise_for_status()
-            events = response.json()
-            
-            # Count different event types as contributions
-            contribution_events = [
-                'PushEvent', 'PullRequestEvent', 'IssuesEvent',
-                'IssueCommentEvent', 'PullRequestReviewEvent'
-            ]
+            events = self._get_json(f'/users/{username}/events/public', {'per_page': 100}, decoder=EVENT_PAGE)
             
-            contributions = sum(1 for event in events if event['type'] in contribution_events)
-            return contributions
+            return self._count_contributions(events)
             
-        except requests.exceptions.RequestException as e:
+        except self.REQUEST_ERRORS as e:
             logger.error(f"Error fetching contributions for {username}: {e}")
             return 0
     
+    def poll_contributions(self, login: str) -> Optional[int]:
+        """
+        Count a user's new public contributions into the contribution store
+        
+        The first events page is requested with the ETag of the previous
+        poll, so an unchanged feed costs a free 304. Otherwise pages are
+        read until the newest event counted last time.
+        
+        Args:
+            login: GitHub username
+            
+        Returns:
+            New contributions counted, or None if the feed was unchanged
+            
+        Raises:
+            requests.exceptions.RequestException: On transport errors or non-2xx status
+        """
+        store = self.contribution_store
+        etag, last_event_id = store.cursor(login) or (None, 0)
+        path = f'/users/{login}/events/public'
+        days = Counter()
+        newest = last_event_id
+        first_etag = None
+        
+        for page in range(1, MAX_EVENT_PAGES + 1):
+            response = self._get(path, {'per_page': EVENTS_PER_PAGE, 'page': page},
+                                 headers={'If-None-Match': etag} if etag and page == 1 else None)
+            if response.status_code == 304:
+                store.touch(login)
+                return None
+            if response.status_code == 404:
+                logger.info(f"Skipping events of {login}: user not found")
+                # Polled with nothing to count, so the user is ranked at 0 rather than left unpolled
+                store.record(login, None, last_event_id, {})
+                return 0
+            response.raise_for_status()
+            if page == 1:
+                first_etag = response.headers.get('ETag')
+            
+            events = EVENT_PAGE.decode(response.content)
+            page_days, page_newest, reached = count_new_events(events, last_event_id)
+            days.update(page_days)
+            newest = max(newest, page_newest)
+            if reached or len(events) < EVENTS_PER_PAGE:
+                break
+        
+        store.record(login, first_etag, newest, days)
+        return sum(days.values())
+    
+    def ingest_contributions(self, logins: List[str]) -> Dict[str, int]:
+        """
+        Poll the public events of every user into the contribution store
+        
+        Failed polls are retried with backoff before returning.
+        
+        Args:
+            logins: GitHub usernames
+            
+        Returns:
+            Counts of users 'polled', feeds 'unchanged' and 'contributions' counted
+        """
+        results = []
+        for login in logins:
+            try:
+                results.append(self.poll_contributions(login))
+            except self.REQUEST_ERRORS as e:
+                self._retry_later(f"events of {login}", e, partial(self.poll_contributions, login), results.append)
+        self._drain_retries()
+        return self._contribution_counts(results)
+    
+    def _sum_remaining_repos(self, login: str, cursor: Optional[str]) -> Tuple[int, int]:
+        """Page through the repositories left after the first GraphQL page"""
+        total_stars = total_forks = 0
+        while cursor:
+            query, variables = build_repos_page_query(login, cursor)
+            payload = self._post_json(GRAPHQL_PATH, {'query': query, 'variables': variables})
+            stars, forks, cursor = parse_repos_page(payload)
+            total_stars += stars
+            total_forks += forks
+        return total_stars, total_forks
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether a failed request is worth another attempt (transport errors, 5xx/429, open circuit)"""
+        if isinstance(error, (CircuitOpenError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return (isinstance(error, requests.exceptions.HTTPError) and response is not None and
+                response.status_code in RETRYABLE_STATUSES)
+    
+    def _drain_retries(self):
+        """Run the deferred operations until the retry queue is empty"""
+        self.retry_queue.drain(self._is_retryable)
+    
+    def _enrich_user(self, login: str, wilaya: Dict) -> Optional[Dict]:
+        """Fetch details and repositories for one user and build its record"""
+        details = self.get_user_details(login)
+        if not details:
+            self._record_missing_user(wilaya, login)
+            return None
+        if not self._passes_filter(login, details):
+            return None
+        
+        totals = self._sum_repos(self.get_user_repos(login))
+        enriched_user = self._build_enriched_user(login, details, *totals, wilaya)
+        self._record_user(enriched_user)
+        logger.info(f"Collected data for {login}")
+        return enriched_user
+    
+    def _enrich_batch_graphql(self, batch: List[str], wilaya: Dict) -> List[Dict]:
+        """Enrich one batch of users with a single GraphQL query"""
+        query, variables = build_batch_query(batch)
+        results = parse_batch_response(
+            self._post_json(GRAPHQL_PATH, {'query': query, 'variables': variables}), batch
+        )
+        users = []
+        for login in batch:
+            if login not in results:
+                self._record_missing_user(wilaya, login)
+                continue
+            result = results[login]
+            if not self._passes_filter(login, result['details']):
+                continue
+            extra_stars, extra_forks = self._sum_remaining_repos(login, result['cursor'])
+            enriched_user = self._build_enriched_user(
+                login, result['details'],
+                result['total_stars'] + extra_stars,
+                result['total_forks'] + extra_forks,
+                wilaya
+            )
+            self._record_user(enriched_user)
+            users.append(enriched_user)
+        logger.info(f"Collected data for {len(results)} users via GraphQL")
+        return users
+    
+    def enrich_users_graphql(self, logins: List[str], wilaya: Dict) -> List[Dict]:
+        """
+        Enrich users through batched GraphQL queries
+        
+        One query returns the profile fields and the first page of star/fork
+        counters for `graphql_batch_size` users; only users owning more than
+        100 repositories need follow-up pages. The records match the REST path.
+        Failed batches are retried with backoff before returning.
+        
+        Args:
+            logins: GitHub usernames
+            wilaya: Wilaya configuration dictionary
+            
+        Returns:
+            List of enriched user data, in the order of `logins` (retried batches last)
+        """
+        all_users = []
+        
+        for start in range(0, len(logins), self.graphql_batch_size):
+            batch = logins[start:start + self.graphql_batch_size]
+            try:
+                all_users.extend(self._enrich_batch_graphql(batch, wilaya))
+            except self.REQUEST_ERRORS as e:
+                self._retry_later(f"GraphQL batch starting at {batch[0]}", e,
+                                  partial(self._enrich_batch_graphql, batch, wilaya), all_users.extend)
+        
+        self._drain_retries()
+        return all_users
+    
     def collect_wilaya_data(self, wilaya: Dict) -> List[Dict]:
         """
         Collect all user data for a specific wilaya
         
+        Users are enriched per user over REST, or in batches over GraphQL
+        when the collector was created with enrichment='graphql'. With a
+        collection plan attached, the most valuable users are enriched first
+        and only up to the wilaya's allowance.
+        
+        A failed search page or user is deferred to the retry queue while
+        the rest of the wilaya is collected, then retried with backoff. If
+        it still fails, the wilaya is added to `failed_wilayas`.
+        
         Args:
             wilaya: Wilaya configuration dictionary
             
@@ -211,65 +555,41 @@ class GitHubCollector:
             List of enriched user data
         """
         logger.info(f"Collecting data for {wilaya['name_en']} ({wilaya['code']})")
-        
-        all_users = []
-        seen_usernames = set()
+        started = self._start_run_stats()
+        failed_before = self.retry_queue.counts['failed']
         
         # Search by all search terms
+        results = {}
         for term in wilaya['search_terms']:
-            users = self.search_users_by_location(term)
-            
-            for user in users:
-                if user['login'] not in seen_usernames:
-                    seen_usernames.add(user['login'])
-                    
-                    # Get detailed user info
-                    details = self.get_user_details(user['login'])
-                    if details:
-                        # Get repositories
-                        repos = self.get_user_repos(user['login'])
-                        
-                        # Calculate stats
-                        total_stars = sum(repo.get('stargazers_count', 0) for repo in repos)
-                        total_forks = sum(repo.get('forks_count', 0) for repo in repos)
-                        
-                        enriched_user = {
-                            'username': user['login'],
-                            'name': details.get('name'),
-                            'avatar_url': details.get('avatar_url'),
-                            'bio': details.get('bio'),
-                            'company': details.get('company'),
-                            'location': details.get('location'),
-                            'email': details.get('email'),
-                            'blog': details.get('blog'),
-                            'twitter_username': details.get('twitter_username'),
-                            'followers': details.get('followers', 0),
-                            'following': details.get('following', 0),
-                            'public_repos': details.get('public_repos', 0),
-                            'public_gists': details.get('public_gists', 0),
-                            'total_stars': total_stars,
-                            'total_forks': total_forks,
-                            'created_at': details.get('created_at'),
-                            'updated_at': details.get('updated_at'),
-                            'wilaya_code': wilaya['code'],
-                            'wilaya_name': wilaya['name_en'],
-                            'collected_at': datetime.utcnow().isoformat()
-                        }
-                        
-                        all_users.append(enriched_user)
-                        logger.info(f"Collected data for {user['login']}")
-                        
-                        time.sleep(1)  # Rate limiting
+            results[term] = []
+            self._search_into(self._location_shard(term), results[term])
+        self._drain_retries()
         
+        term_users = {term: len(users) for term, users in results.items()}
+        logins = self._unique_logins(results)
+        
+        self._register_search_results(logins, wilaya)
+        pending, reused = self._apply_refresh_plan(self._pending_logins(logins, wilaya), wilaya)
+        pending, deferred = self._apply_collection_plan(pending, wilaya)
+        reused += deferred
+        
+        if self.enrichment == 'graphql':
+            enriched = self.enrich_users_graphql(pending, wilaya)
+        else:
+            enriched = []
+            for login in pending:
+                try:
+                    enriched.append(self._enrich_user(login, wilaya))
+                except self.REQUEST_ERRORS as e:
+                    self._retry_later(f"user {login}", e, partial(self._enrich_user, login, wilaya), enriched.append)
+            self._drain_retries()
+            enriched = [user for user in enriched if user]
+        
+        self._note_failures(wilaya, failed_before)
+        all_users = self._in_search_order(logins, wilaya, enriched + reused)
+        self._record_run_stats(wilaya, started, term_users, len(logins), len(pending), len(reused))
         logger.info(f"Total users collected for {wilaya['name_en']}: {len(all_users)}")
         return all_users
-    
-    def save_data(self, data: List[Dict], filepath: str):
-        """Save collected data to JSON file"""
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Data saved to {filepath}")
 
 
 if __name__ == '__main__':
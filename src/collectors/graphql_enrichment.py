@@ -0,0 +1,164 @@
+"""
+GraphQL Enrichment Queries
+Builds batched GitHub GraphQL queries that fetch profile fields and
+star/fork aggregates for many users at once, and maps the results back
+to the REST shapes the collector already understands
+"""
+
+from typing import List, Dict, Optional, Tuple
+
+from .decoders import PayloadError
+
+
+GRAPHQL_PATH = '/graphql'
+
+# Repository nodes requested per page; only the two counters are selected
+REPOS_PAGE_SIZE = 100
+
+REPOSITORIES_CONNECTION = (
+    f'repositories(first: {REPOS_PAGE_SIZE}, after: $cursor, ownerAffiliations: OWNER, privacy: PUBLIC) {{\n'
+    '    totalCount\n'
+    '    pageInfo { hasNextPage endCursor }\n'
+    '    nodes { stargazerCount forkCount }\n'
+    '  }'
+)
+
+USER_FIELDS = (
+    'fragment UserFields on User {\n'
+    '  login name avatarUrl bio company location email websiteUrl twitterUsername\n'
+    '  createdAt updatedAt\n'
+    '  followers { totalCount }\n'
+    '  following { totalCount }\n'
+    '  gists(privacy: PUBLIC) { totalCount }\n'
+    f'  {REPOSITORIES_CONNECTION.replace("after: $cursor, ", "")}\n'
+    '}\n'
+)
+
+
+def build_batch_query(logins: List[str]) -> Tuple[str, Dict]:
+    """
+    Build one query enriching several users through aliased `user` fields
+    
+    Args:
+        logins: GitHub usernames
+    
+    Returns:
+        Tuple of (query document, variables)
+    """
+    declarations = ', '.join(f'$l{i}: String!' for i in range(len(logins)))
+    selections = '\n'.join(f'  u{i}: user(login: $l{i}) {{ ...UserFields }}' for i in range(len(logins)))
+    query = f'query({declarations}) {{\n{selections}\n}}\n{USER_FIELDS}'
+    variables = {f'l{i}': login for i, login in enumerate(logins)}
+    return query, variables
+
+
+def build_repos_page_query(login: str, cursor: str) -> Tuple[str, Dict]:
+    """Build the follow-up query for users owning more than one page of repositories"""
+    query = (
+        'query($login: String!, $cursor: String) {\n'
+        '  user(login: $login) {\n'
+        f'  {REPOSITORIES_CONNECTION}\n'
+        '  }\n'
+        '}\n'
+    )
+    return query, {'login': login, 'cursor': cursor}
+
+
+def sum_repo_page(connection: Dict) -> Tuple[int, int, Optional[str]]:
+    """
+    Sum stars and forks over one page of repository nodes
+    
+    Returns:
+        Tuple of (stars, forks, cursor of the next page or None)
+    """
+    stars = sum(node['stargazerCount'] for node in connection['nodes'])
+    forks = sum(node['forkCount'] for node in connection['nodes'])
+    page_info = connection['pageInfo']
+    return stars, forks, page_info['endCursor'] if page_info['hasNextPage'] else None
+
+
+def parse_repos_page(payload: Dict) -> Tuple[int, int, Optional[str]]:
+    """
+    Sum one page of a build_repos_page_query response
+    
+    Returns:
+        Tuple of (stars, forks, cursor of the next page or None)
+    
+    Raises:
+        PayloadError: If the response does not hold the user's repositories
+    """
+    try:
+        return sum_repo_page(payload['data']['user']['repositories'])
+    except (KeyError, TypeError) as e:
+        raise PayloadError(f"Invalid GraphQL repositories page: {payload.get('errors') or repr(e)}") from e
+
+
+def to_rest_details(node: Dict) -> Dict:
+    """
+    Map a GraphQL user node onto the /users/{login} REST field names
+    
+    Args:
+        node: GraphQL `User` object selected with UserFields
+    
+    Returns:
+        Details dictionary accepted by GitHubCollector._build_enriched_user
+    """
+    return {
+        'login': node['login'],
+        'name': node.get('name'),
+        'avatar_url': node.get('avatarUrl'),
+        'bio': node.get('bio'),
+        'company': node.get('company'),
+        'location': node.get('location'),
+        # GraphQL returns '' for hidden emails where REST returns null
+        'email': node.get('email') or None,
+        'blog': node.get('websiteUrl') or '',
+        'twitter_username': node.get('twitterUsername'),
+        'followers': node['followers']['totalCount'],
+        'following': node['following']['totalCount'],
+        'public_repos': node['repositories']['totalCount'],
+        'public_gists': node['gists']['totalCount'],
+        'created_at': node.get('createdAt'),
+        'updated_at': node.get('updatedAt'),
+    }
+
+
+def parse_batch_response(payload: Dict, logins: List[str]) -> Dict[str, Dict]:
+    """
+    Extract per-user results from a batch query response
+    
+    Users that no longer exist come back as null and are left out.
+    
+    Args:
+        payload: Decoded GraphQL response
+        logins: Logins in the order passed to build_batch_query
+    
+    Returns:
+        Mapping of login to a dict with 'details', 'total_stars',
+        'total_forks' and 'cursor' (non-None when more repositories remain)
+    
+    Raises:
+        PayloadError: If the response carries no data at all or a user node
+            lacks a selected field
+    """
+    data = payload.get('data')
+    if data is None:
+        raise PayloadError(f"GraphQL query failed: {payload.get('errors')}")
+    
+    results = {}
+    for i, login in enumerate(logins):
+        node = data.get(f'u{i}')
+        if not node:
+            continue
+        try:
+            stars, forks, cursor = sum_repo_page(node['repositories'])
+            details = to_rest_details(node)
+        except (KeyError, TypeError) as e:
+            raise PayloadError(f"Invalid GraphQL node of {login}: {e!r}") from e
+        results[login] = {
+            'details': details,
+            'total_stars': stars,
+            'total_forks': forks,
+            'cursor': cursor,
+        }
+    return results
@@ -0,0 +1,94 @@
+"""
+Incremental Refresh Planning
+Decides, per search hit, whether a stored user record can be reused as is,
+needs a cheap revalidation, or must be enriched from scratch
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterable, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Staleness deadline by rank tier: users whose best rank is within the first
+# bound are refreshed after the paired age; the last tier covers everyone else.
+STALENESS_TIERS = [
+    (100, timedelta(days=1)),
+    (1000, timedelta(days=3)),
+    (None, timedelta(days=14)),
+]
+
+# Stored fields ranked to find a user's tier (best rank across them wins)
+TIER_FIELDS = ['followers', 'total_stars', 'public_repos']
+
+NEW, STALE, FRESH = 'new', 'stale', 'fresh'
+
+
+class RefreshPlanner:
+    """
+    Classifies users against the previous snapshot
+    
+    A user missing from the snapshot is NEW. A stored user older than the
+    deadline of its tier is STALE: its details and repository pages are
+    fetched again through the conditional-request cache, so unchanged
+    pages cost nothing. Repositories are always re-read because a
+    profile's `updated_at` does not move when others star or fork its
+    repositories. Everyone else is FRESH and reused without any request.
+    """
+    
+    def __init__(self, users: Iterable[Dict], tiers: Optional[List[Tuple[Optional[int], timedelta]]] = None,
+                 now: Optional[datetime] = None):
+        self.users = {user['username']: user for user in users}
+        self.tiers = tiers or STALENESS_TIERS
+        self.now = now or datetime.utcnow()
+        self.best_rank = self._best_ranks()
+        self.counts = {NEW: 0, STALE: 0, FRESH: 0}
+    
+    def _best_ranks(self) -> Dict[str, int]:
+        """Best rank of every stored user over TIER_FIELDS"""
+        best = {}
+        for field in TIER_FIELDS:
+            ordered = sorted(self.users.values(), key=lambda u: u.get(field) or 0, reverse=True)
+            for rank, user in enumerate(ordered, 1):
+                login = user['username']
+                best[login] = min(best.get(login, rank), rank)
+        return best
+    
+    def deadline(self, login: str) -> timedelta:
+        """Maximum age of a stored record before it is revalidated"""
+        rank = self.best_rank.get(login)
+        for bound, max_age in self.tiers:
+            if bound is None or (rank is not None and rank <= bound):
+                return max_age
+        return self.tiers[-1][1]
+    
+    def classify(self, login: str) -> str:
+        """
+        Decide how a search hit is refreshed
+        
+        Returns:
+            NEW, STALE or FRESH
+        """
+        stored = self.users.get(login)
+        if stored is None:
+            state = NEW
+        else:
+            try:
+                collected_at = datetime.fromisoformat(stored['collected_at'])
+            except (KeyError, TypeError, ValueError):
+                collected_at = datetime.min
+            state = STALE if self.now - collected_at > self.deadline(login) else FRESH
+        
+        self.counts[state] += 1
+        return state
+    
+    def stored(self, login: str) -> Optional[Dict]:
+        """Snapshot record of a user"""
+        return self.users.get(login)
+    
+    def summary(self) -> str:
+        """One-line summary of the decisions taken so far"""
+        return (f"Refresh plan: {self.counts[NEW]} new, {self.counts[STALE]} stale, "
+                f"{self.counts[FRESH]} reused without requests")
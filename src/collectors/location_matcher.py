@@ -0,0 +1,165 @@
+"""
+Location Matching
+Scores free-text GitHub profile locations against the names, cities and
+search terms of each wilaya
+"""
+
+import re
+import unicodedata
+from collections import deque, defaultdict
+from typing import List, Dict, Iterable, Optional
+
+
+# Wilaya code of users whose location names no wilaya
+UNCLASSIFIED_CODE = '00'
+UNCLASSIFIED_NAME = 'Unclassified'
+
+
+def normalize_location(text: str) -> str:
+    """
+    Normalize a location for matching
+    
+    Accents are stripped, case is folded and punctuation becomes spaces, so
+    "Béjaïa, Algérie" and "bejaia algerie" compare equal.
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    words = re.sub(r'[^\w]+', ' ', stripped.casefold())
+    return ' '.join(words.split())
+
+
+class LocationMatcher:
+    """
+    Whole-word matcher from location strings to wilaya codes
+    
+    A wilaya matches when one of its terms (English, French and Arabic names,
+    cities and search terms) appears in the location as whole words. Its
+    score is the length of the longest such term, so "Sidi Bel Abbes" beats
+    a bare "Sidi" and more specific places win over shorter names.
+    
+    The terms of all wilayas are compiled into a single Aho-Corasick
+    automaton, so a location is scanned once whatever the number of terms.
+    """
+    
+    def __init__(self, wilayas: List[Dict]):
+        self.names = {wilaya['code']: wilaya['name_en'] for wilaya in wilayas}
+        
+        # Automaton states: goto transitions, failure links and the terms
+        # (as (length, wilaya codes)) recognized on reaching each state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        
+        codes_by_term = {}
+        for wilaya in wilayas:
+            for term in self._terms(wilaya):
+                term = normalize_location(term)
+                if term:
+                    codes_by_term.setdefault(term, set()).add(wilaya['code'])
+        
+        for term, codes in codes_by_term.items():
+            self._add_term(term, frozenset(codes))
+        self._link()
+    
+    def _add_term(self, term: str, codes: frozenset):
+        state = 0
+        for ch in term:
+            if ch not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][ch] = len(self.goto) - 1
+            state = self.goto[state][ch]
+        self.output[state].append((len(term), codes))
+    
+    def _link(self):
+        """Compute failure links breadth-first and merge inherited outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+                queue.append(child)
+    
+    @staticmethod
+    def _terms(wilaya: Dict) -> Iterable[str]:
+        yield wilaya['name_en']
+        yield wilaya.get('name_fr', '')
+        yield wilaya.get('name_ar', '')
+        yield from wilaya.get('cities', [])
+        yield from wilaya.get('search_terms', [])
+    
+    def scores(self, location: Optional[str]) -> Dict[str, int]:
+        """
+        Score every wilaya matching a location
+        
+        Returns:
+            Mapping of wilaya code to the length of its longest matching term
+        """
+        text = normalize_location(location)
+        scores = {}
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            
+            for length, codes in self.output[state]:
+                start = end - length + 1
+                # Normalized text separates words with single spaces
+                if (start == 0 or text[start - 1] == ' ') and (end + 1 == len(text) or text[end + 1] == ' '):
+                    for code in codes:
+                        scores[code] = max(scores.get(code, 0), length)
+        return scores
+    
+    def classify(self, location: Optional[str]) -> Optional[str]:
+        """
+        Assign a location to the best matching wilaya, without candidates
+        
+        Returns:
+            Wilaya code, or None if no wilaya term appears in the location
+        """
+        scores = self.scores(location)
+        if not scores:
+            return None
+        return min(scores, key=lambda code: (-scores[code], code))
+    
+    def best(self, location: Optional[str], candidates: Iterable[str]) -> str:
+        """
+        Pick one wilaya among candidates for a location
+        
+        The highest score wins; ties, and locations that match none of the
+        candidates, go to the lowest wilaya code so the choice never depends
+        on collection order.
+        
+        Args:
+            location: Profile location
+            candidates: Wilaya codes whose searches returned the user
+        
+        Returns:
+            Chosen wilaya code
+        """
+        scores = self.scores(location)
+        return min(candidates, key=lambda code: (-scores.get(code, 0), code))
+    
+    def assign(self, users: Iterable[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Group users by the wilaya their location names
+        
+        Args:
+            users: Enriched users, e.g. from a national sweep
+        
+        Returns:
+            Mapping of wilaya code to users carrying that wilaya's code and
+            name; unmatched users are grouped under UNCLASSIFIED_CODE
+        """
+        by_code = defaultdict(list)
+        for user in users:
+            code = self.classify(user.get('location')) or UNCLASSIFIED_CODE
+            by_code[code].append(dict(user, wilaya_code=code,
+                                      wilaya_name=self.names.get(code, UNCLASSIFIED_NAME)))
+        return by_code
@@ -0,0 +1,76 @@
+"""
+Node Sharding
+Deterministically partitions a crawl (wilayas or search shards) across
+several machines with a consistent-hash ring
+"""
+
+import bisect
+import hashlib
+from typing import List, Tuple
+
+
+# Ring points per node; more points give a more even split
+DEFAULT_VNODES = 128
+
+
+def _ring_hash(key: str) -> int:
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class NodeShard:
+    """
+    One node's share of a crawl split over `count` nodes
+    
+    Keys are placed on a hash ring where every node owns DEFAULT_VNODES
+    points; a key belongs to the node of the first point after it. Every
+    node computes the same ring, so no coordination is needed, and changing
+    the number of nodes only moves the keys of the nodes added or removed.
+    """
+    
+    def __init__(self, index: int, count: int, vnodes: int = DEFAULT_VNODES):
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}: expected 1 <= i <= N")
+        self.index = index
+        self.count = count
+        
+        ring: List[Tuple[int, int]] = sorted(
+            (_ring_hash(f'node-{node}#{point}'), node)
+            for node in range(1, count + 1)
+            for point in range(vnodes)
+        )
+        self.points = [point for point, _ in ring]
+        self.nodes = [node for _, node in ring]
+    
+    def __str__(self) -> str:
+        return f'{self.index}/{self.count}'
+    
+    @classmethod
+    def parse(cls, spec: str) -> 'NodeShard':
+        """
+        Parse an `i/N` shard specification (1-based)
+        
+        Raises:
+            ValueError: If the specification is malformed or out of range
+        """
+        try:
+            index, count = (int(part) for part in spec.split('/'))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{spec}': expected i/N, e.g. 1/3")
+        return cls(index, count)
+    
+    def owner(self, key: str) -> int:
+        """Node (1-based) that owns a key"""
+        position = bisect.bisect(self.points, _ring_hash(key)) % len(self.points)
+        return self.nodes[position]
+    
+    def owns(self, key: str) -> bool:
+        """Whether this node owns a key"""
+        return self.owner(key) == self.index
+    
+    def owns_wilaya(self, wilaya_code: str) -> bool:
+        """Whether this node collects a wilaya"""
+        return self.owns(f'wilaya:{wilaya_code}')
+    
+    def owns_search(self, query: str) -> bool:
+        """Whether this node collects the results of a search shard"""
+        return self.owns(f'search:{query}')
@@ -0,0 +1,152 @@
+"""
+Progress Journal
+Append-only, fsync'ed record of a collection run (search pages, enriched
+users, finished wilayas) so an interrupted run can resume where it died
+"""
+
+import os
+import json
+from typing import List, Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Enriched-user records written between two fsyncs
+USER_SYNC_BATCH = 100
+
+
+class ProgressJournal:
+    """
+    Journal of completed collection work
+    
+    Every record is one JSON line, flushed to the OS before the call
+    returns, so it survives the process crashing. Search pages and finished
+    wilayas are fsync'ed at once; user records are fsync'ed in groups of
+    USER_SYNC_BATCH (or with the next page, wilaya or close). When opened
+    with resume=True the existing journal is replayed; a torn final line
+    from a crash is ignored. Otherwise it starts empty.
+    """
+    
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.search_pages = {}
+        self.users = {}
+        self.missing_users = set()
+        self.finished_wilayas = {}
+        self.unsynced = 0
+        
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        if resume and os.path.exists(path):
+            self._replay()
+            logger.info(f"Resuming from journal: {len(self.finished_wilayas)} wilayas finished, "
+                        f"{len(self.users)} users and {len(self.search_pages)} search pages recorded")
+        
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self.file.tell() > 0 and not self._ends_with_newline():
+            # Terminate a torn final line so the next record starts cleanly
+            self.file.write('\n')
+    
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+    
+    def _replay(self):
+        """Rebuild in-memory state from the journal file"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring unreadable journal line {line_number}")
+                    continue
+                self._apply(record)
+    
+    def _apply(self, record: Dict):
+        """Apply one journal record to the in-memory state"""
+        kind = record['type']
+        if kind == 'search_page':
+            self.search_pages[(record['query'], record['page'])] = record['data']
+        elif kind == 'user':
+            user = record['user']
+            self.users[(user['wilaya_code'], user['username'])] = user
+        elif kind == 'user_missing':
+            self.missing_users.add((record['wilaya_code'], record['login']))
+        elif kind == 'wilaya_done':
+            self.finished_wilayas[record['code']] = record['users']
+    
+    def _append(self, record: Dict, sync: bool = True):
+        """
+        Append one record
+        
+        Args:
+            record: Journal record
+            sync: fsync now; otherwise once USER_SYNC_BATCH records are pending
+        """
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.unsynced += 1
+        if sync or self.unsynced >= USER_SYNC_BATCH:
+            self.sync()
+        self._apply(record)
+    
+    def sync(self):
+        """fsync every record written so far"""
+        if self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+    
+    def record_search_page(self, query: str, page: int, data: Dict):
+        """
+        Record a fetched search page
+        
+        Only total_count and the logins are kept; that is all the collector reads.
+        """
+        compact = {
+            'total_count': data.get('total_count', 0),
+            'items': [{'login': item['login']} for item in data.get('items', [])]
+        }
+        self._append({'type': 'search_page', 'query': query, 'page': page, 'data': compact})
+    
+    def search_page(self, query: str, page: int) -> Optional[Dict]:
+        """Previously recorded search page, if any"""
+        return self.search_pages.get((query, page))
+    
+    def record_user(self, user: Dict):
+        """Record an enriched user"""
+        self._append({'type': 'user', 'user': user}, sync=False)
+    
+    def record_missing_user(self, wilaya_code: str, login: str):
+        """Record a user whose details could not be fetched (deleted or renamed)"""
+        self._append({'type': 'user_missing', 'wilaya_code': wilaya_code, 'login': login}, sync=False)
+    
+    def user(self, wilaya_code: str, login: str) -> Optional[Dict]:
+        """Previously enriched user of a wilaya, if any"""
+        return self.users.get((wilaya_code, login))
+    
+    def is_user_done(self, wilaya_code: str, login: str) -> bool:
+        """Whether a user needs no further requests in this wilaya"""
+        return (wilaya_code, login) in self.users or (wilaya_code, login) in self.missing_users
+    
+    def finish_wilaya(self, code: str, user_count: int):
+        """Record that a wilaya's output has been written"""
+        self._append({'type': 'wilaya_done', 'code': code, 'users': user_count})
+    
+    def is_finished(self, code: str) -> bool:
+        """Whether a wilaya was completed by this run or the one being resumed"""
+        return code in self.finished_wilayas
+    
+    def close(self):
+        """Close the journal, keeping it on disk for a later resume"""
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+    
+    def complete(self):
+        """Close and delete the journal once the whole run has succeeded"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
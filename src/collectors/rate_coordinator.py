@@ -0,0 +1,180 @@
+"""
+Shared Rate Budget Coordinator
+SQLite lease table through which several collector processes draw from the
+same per-token rate budgets, so together they never exceed GitHub's limits
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Callable
+import logging
+
+from .rate_limiter import RateLimiter, TokenBucket, RESOURCE_LIMITS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Bucket attributes persisted in the lease table
+BUCKET_FIELDS = ['limit', 'window', 'burst', 'remaining', 'reset_at', 'blocked_until', 'tokens', 'updated']
+
+
+class RateCoordinator:
+    """
+    Lease table shared by every process of a collection run
+    
+    Each row holds the token-bucket state of one (token, resource) pair.
+    A process takes a request slot inside an IMMEDIATE transaction, so
+    reservations from different processes are serialized by SQLite and the
+    combined request rate follows a single bucket. Tokens are stored as
+    hashes only.
+    """
+    
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            ' key TEXT PRIMARY KEY,'
+            ' "limit" INTEGER NOT NULL,'
+            ' window REAL NOT NULL,'
+            ' burst INTEGER NOT NULL,'
+            ' remaining INTEGER NOT NULL,'
+            ' reset_at REAL NOT NULL,'
+            ' blocked_until REAL NOT NULL,'
+            ' tokens REAL NOT NULL,'
+            ' updated REAL NOT NULL)'
+        )
+    
+    @staticmethod
+    def bucket_key(token: str, resource: str) -> str:
+        """Lease row key of a token's resource budget"""
+        return f"{hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]}:{resource}"
+    
+    @contextmanager
+    def transaction(self):
+        """Exclusive write transaction across threads and processes"""
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+    
+    def read(self, key: str) -> Dict:
+        """Current state of a lease row, or an empty dict if it does not exist"""
+        with self._lock:
+            return self.read_in(self.conn, key)
+    
+    def read_in(self, conn: sqlite3.Connection, key: str) -> Dict:
+        """Read a lease row inside an open transaction"""
+        row = conn.execute(
+            f'SELECT {", ".join(_quoted(BUCKET_FIELDS))} FROM leases WHERE key = ?', (key,)
+        ).fetchone()
+        return dict(zip(BUCKET_FIELDS, row)) if row else {}
+    
+    def write(self, conn: sqlite3.Connection, key: str, state: Dict):
+        """Store a lease row inside an open transaction"""
+        conn.execute(
+            f'INSERT OR REPLACE INTO leases (key, {", ".join(_quoted(BUCKET_FIELDS))}) '
+            f'VALUES (?, {", ".join("?" for _ in BUCKET_FIELDS)})',
+            (key, *(state[field] for field in BUCKET_FIELDS))
+        )
+    
+    def reset(self):
+        """Forget every budget, e.g. at the start of a new run"""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM leases')
+    
+    def limiter_for(self, token: str) -> 'SharedRateLimiter':
+        """Rate limiter of one token backed by the lease table (a TokenPool limiter factory)"""
+        return SharedRateLimiter(self, token)
+    
+    def close(self):
+        """Close the underlying database"""
+        self.conn.close()
+
+
+def _quoted(fields):
+    return [f'"{field}"' for field in fields]
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket whose state lives in the coordinator's lease table
+    
+    Every mutation loads the row, applies the regular TokenBucket logic and
+    writes it back in one transaction. Reads through RateLimiter.bucket()
+    refresh the local copy, so token selection sees what other processes
+    have consumed.
+    """
+    
+    def __init__(self, coordinator: RateCoordinator, key: str, limit: int, window: float, burst: int):
+        super().__init__(limit, window, burst, coordinator.clock)
+        self.coordinator = coordinator
+        self.key = key
+        with coordinator.transaction() as conn:
+            if not coordinator.read_in(conn, key):
+                coordinator.write(conn, key, self._state())
+    
+    def _state(self) -> Dict:
+        return {field: getattr(self, field) for field in BUCKET_FIELDS}
+    
+    def sync(self):
+        """Refresh the local copy from the lease table"""
+        self.__dict__.update(self.coordinator.read(self.key))
+    
+    @contextmanager
+    def _leased(self):
+        with self.coordinator.transaction() as conn:
+            self.__dict__.update(self.coordinator.read_in(conn, self.key))
+            yield
+            self.coordinator.write(conn, self.key, self._state())
+    
+    def reserve(self) -> float:
+        with self._leased():
+            return super().reserve()
+    
+    def refund(self):
+        with self._leased():
+            super().refund()
+    
+    def update(self, remaining, reset_at, limit=None):
+        with self._leased():
+            super().update(remaining, reset_at, limit)
+    
+    def block(self, until: float):
+        with self._leased():
+            super().block(until)
+
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter of one token whose buckets are shared through a RateCoordinator"""
+    
+    def __init__(self, coordinator: RateCoordinator, token: str):
+        self.coordinator = coordinator
+        self.token = token
+        super().__init__(coordinator.clock)
+    
+    def _new_bucket(self, resource: str) -> SharedTokenBucket:
+        limit, window, burst = RESOURCE_LIMITS.get(resource, RESOURCE_LIMITS['core'])
+        return SharedTokenBucket(self.coordinator, self.coordinator.bucket_key(self.token, resource),
+                                 limit, window, burst)
+    
+    def bucket(self, resource: str) -> SharedTokenBucket:
+        """Get the bucket of a resource, refreshed from the lease table"""
+        bucket = super().bucket(resource)
+        bucket.sync()
+        return bucket
@@ -0,0 +1,228 @@
+"""
+Rate Limiter for the GitHub API
+Header-driven token buckets, one per API resource (core, search, graphql)
+"""
+
+import time
+from typing import Dict, Optional, Callable, Mapping
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Documented budgets per resource: (requests per window, window in seconds, burst)
+RESOURCE_LIMITS = {
+    'core': (5000, 3600, 500),
+    'search': (30, 60, 10),
+    'graphql': (5000, 3600, 250),
+}
+
+# GitHub asks clients to wait at least a minute after a secondary rate limit
+SECONDARY_LIMIT_BACKOFF = 60
+
+# Lower-cased marker of a secondary rate limit in a 403 body
+SECONDARY_LIMIT_MESSAGE = b'secondary rate limit'
+
+
+def resource_for_path(path: str) -> Optional[str]:
+    """
+    Map an API path to the rate-limit resource it is charged against
+    
+    Args:
+        path: API path relative to the base URL
+    
+    Returns:
+        Resource name, or None for endpoints that are not rate limited
+    """
+    if path.startswith('/rate_limit'):
+        return None
+    if path.startswith('/search/'):
+        return 'search'
+    if path.startswith('/graphql'):
+        return 'graphql'
+    return 'core'
+
+
+class TokenBucket:
+    """
+    Token bucket paced to the server-reported reset time
+    
+    Tokens refill at `remaining / seconds_until_reset`, so the remaining
+    budget is spread evenly over the window while still allowing short
+    bursts of up to `burst` requests. Reservations may drive the bucket
+    negative; each caller is told how long to wait for its own slot.
+    """
+    
+    def __init__(self, limit: int, window: float, burst: int, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        now = clock()
+        self.limit = limit
+        self.window = window
+        self.burst = burst
+        self.remaining = limit
+        self.reset_at = now + window
+        self.blocked_until = 0.0
+        self.tokens = float(burst)
+        self.updated = now
+    
+    @property
+    def rate(self) -> float:
+        """Refill rate in tokens per second"""
+        seconds_left = max(self.reset_at - self.updated, 1.0)
+        return max(self.remaining, 1) / seconds_left
+    
+    def _refill(self, now: float):
+        """Roll the window over if it has expired and add accrued tokens"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        rate = self.rate
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * rate)
+        self.updated = now
+    
+    def reserve(self) -> float:
+        """
+        Take one request slot
+        
+        Returns:
+            Seconds to wait before sending the request
+        """
+        now = self.clock()
+        self._refill(now)
+        self.tokens -= 1
+        
+        if self.remaining > 0:
+            self.remaining -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        else:
+            # Budget exhausted: nothing can be sent before the window resets
+            wait = self.reset_at - now
+        
+        return max(wait, self.blocked_until - now, 0.0)
+    
+    def refund(self):
+        """Give back a slot for a request that was not charged (e.g. 304)"""
+        self.remaining = min(self.limit, self.remaining + 1)
+        self.tokens = min(float(self.burst), self.tokens + 1)
+    
+    def update(self, remaining: Optional[int], reset_at: Optional[float], limit: Optional[int] = None):
+        """Synchronize with values reported by the server"""
+        if limit is not None:
+            self.limit = limit
+        if reset_at is not None and reset_at != self.reset_at:
+            # A new window (or our first sighting of it): trust the server outright
+            self.reset_at = reset_at
+            if remaining is not None:
+                self.remaining = remaining
+        elif remaining is not None:
+            # Same window: requests still in flight are not reflected server-side yet
+            self.remaining = min(self.remaining, remaining)
+    
+    def block(self, until: float):
+        """Refuse to hand out slots before `until`"""
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class RateLimiter:
+    """Schedules requests against separate core, search and graphql budgets"""
+    
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.buckets = {resource: self._new_bucket(resource) for resource in RESOURCE_LIMITS}
+    
+    def _new_bucket(self, resource: str) -> TokenBucket:
+        """Create the bucket of a resource, core-sized if the resource is unknown"""
+        limit, window, burst = RESOURCE_LIMITS.get(resource, RESOURCE_LIMITS['core'])
+        return TokenBucket(limit, window, burst, self.clock)
+    
+    def bucket(self, resource: str) -> TokenBucket:
+        """Get the bucket of a resource, creating it on first use"""
+        if resource not in self.buckets:
+            self.buckets[resource] = self._new_bucket(resource)
+        return self.buckets[resource]
+    
+    def remaining(self, resource: str = 'core') -> int:
+        """Requests left in the current window for a resource"""
+        return self.bucket(resource).remaining
+    
+    def reserve(self, resource: str) -> float:
+        """
+        Reserve one request against a resource
+        
+        Args:
+            resource: Resource name from resource_for_path
+        
+        Returns:
+            Seconds the caller must wait before sending
+        """
+        return self.bucket(resource).reserve()
+    
+    def refund(self, resource: str):
+        """Return a reserved slot that GitHub did not charge"""
+        self.bucket(resource).refund()
+    
+    def update(self, resource: str, headers: Mapping[str, str], status: int, body: bytes = b'') -> bool:
+        """
+        Update budgets from the rate-limit headers of a response
+        
+        Every API response carries rate-limit headers, so a 403 is only
+        treated as a rate limit when the budget is spent, a Retry-After is
+        given, or the body names a secondary rate limit; other 403s
+        (forbidden resources, blocked users, SSO) are not retried.
+        
+        Args:
+            resource: Resource the request was reserved against
+            headers: Response headers
+            status: HTTP status code
+            body: Response body (read for 403 and 429 only)
+        
+        Returns:
+            True if the response was rejected by a rate limit and must be retried
+        """
+        now = self.clock()
+        resource = headers.get('X-RateLimit-Resource', resource)
+        bucket = self.bucket(resource)
+        
+        remaining = _int_header(headers, 'X-RateLimit-Remaining')
+        reset_at = _int_header(headers, 'X-RateLimit-Reset')
+        limit = _int_header(headers, 'X-RateLimit-Limit')
+        bucket.update(remaining, float(reset_at) if reset_at is not None else None, limit)
+        
+        retry_after = _int_header(headers, 'Retry-After')
+        if retry_after is not None:
+            bucket.block(now + retry_after)
+        
+        if status not in (403, 429):
+            return False
+        
+        if retry_after is not None:
+            logger.warning(f"Rate limited on {resource}, retry after {retry_after}s")
+        elif remaining == 0:
+            bucket.block(bucket.reset_at)
+            logger.warning(f"{resource} budget exhausted, paused until reset in "
+                           f"{max(bucket.reset_at - now, 0):.0f}s")
+        elif status == 429 or SECONDARY_LIMIT_MESSAGE in body.lower():
+            bucket.block(now + SECONDARY_LIMIT_BACKOFF)
+            logger.warning(f"Secondary rate limit on {resource}, backing off")
+        else:
+            return False
+        return True
+    
+    def load(self, resources: Dict[str, Dict]):
+        """Seed budgets from the `resources` section of /rate_limit"""
+        for resource, data in resources.items():
+            self.bucket(resource).update(
+                data.get('remaining'),
+                float(data['reset']) if 'reset' in data else None,
+                data.get('limit')
+            )
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    """Parse an integer header, ignoring missing or malformed values"""
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,236 @@
+"""
+HTTP Response Cache for the GitHub API
+Persistent SQLite store of response bodies with their ETag/Last-Modified
+validators, used to issue conditional requests that GitHub answers with a
+free 304 when nothing changed
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+from urllib.parse import urlencode
+from typing import Dict, Optional, Callable, Mapping
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Seconds a cached response is served without contacting GitHub at all.
+# Past the TTL the entry is revalidated with a conditional request.
+DEFAULT_TTLS = {
+    'search': 6 * 3600,
+    'user': 12 * 3600,
+    'repos': 12 * 3600,
+    'events': 0,
+    'default': 0,
+}
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Cache hits only move an entry's LRU timestamp, so they are kept in memory
+# and written with the next store (or once this many are pending)
+ACCESS_FLUSH_BATCH = 500
+
+
+def endpoint_for_path(path: str) -> str:
+    """
+    Classify an API path into a cache TTL class
+    
+    Args:
+        path: API path relative to the base URL
+    
+    Returns:
+        One of 'search', 'user', 'repos', 'events' or 'default'
+    """
+    parts = path.strip('/').split('/')
+    if parts[0] == 'search':
+        return 'search'
+    if parts[0] == 'users' and len(parts) == 2:
+        return 'user'
+    if parts[0] == 'users' and len(parts) >= 3 and parts[2] in ('repos', 'events'):
+        return parts[2]
+    return 'default'
+
+
+class CacheEntry:
+    """A cached response body and its validators"""
+    
+    def __init__(self, key: str, body: bytes, etag: Optional[str],
+                 last_modified: Optional[str], stored_at: float, fresh: bool):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.fresh = fresh
+    
+    def conditional_headers(self) -> Dict[str, str]:
+        """Request headers that revalidate this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Size-bounded, TTL-aware on-disk cache of API responses"""
+    
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Optional[Dict[str, float]] = None, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.clock = clock
+        # key -> accessed_at of hits not yet written to the database
+        self.pending_access = {}
+        
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' endpoint TEXT NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' body BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' stored_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        self.conn.commit()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+    
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict] = None) -> str:
+        """Cache key for a request: the path plus its sorted query string"""
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha256(f'{path}?{query}'.encode('utf-8')).hexdigest()
+    
+    def lookup(self, path: str, params: Optional[Dict] = None) -> Optional[CacheEntry]:
+        """
+        Find the cached response for a request
+        
+        The hit's LRU timestamp is recorded in memory; no write happens on
+        the read path until ACCESS_FLUSH_BATCH hits are pending.
+        
+        Args:
+            path: API path
+            params: Query string parameters
+        
+        Returns:
+            CacheEntry (with `fresh` set when still inside its TTL) or None
+        """
+        key = self.make_key(path, params)
+        row = self.conn.execute(
+            'SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        body, etag, last_modified, stored_at = row
+        now = self.clock()
+        fresh = now - stored_at < self.ttls.get(endpoint_for_path(path), self.ttls['default'])
+        if not fresh and not etag and not last_modified:
+            # Expired and cannot be revalidated
+            return None
+        
+        self.pending_access[key] = now
+        if len(self.pending_access) >= ACCESS_FLUSH_BATCH:
+            self.flush_access()
+        return CacheEntry(key, body, etag, last_modified, stored_at, fresh)
+    
+    def store(self, path: str, params: Optional[Dict], body: bytes, headers: Mapping[str, str]):
+        """
+        Store a 200 response
+        
+        Args:
+            path: API path
+            params: Query string parameters
+            body: Raw response body
+            headers: Response headers (ETag/Last-Modified are kept)
+        """
+        endpoint = endpoint_for_path(path)
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified and self.ttls.get(endpoint, 0) <= 0:
+            return
+        if len(body) > self.max_bytes:
+            return
+        
+        key = self.make_key(path, params)
+        now = self.clock()
+        self._write_access()
+        previous = self.conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO responses '
+            '(key, endpoint, etag, last_modified, body, size, stored_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, endpoint, etag, last_modified, body, len(body), now, now)
+        )
+        self.conn.commit()
+        self.total_bytes += len(body) - (previous[0] if previous else 0)
+        
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+    
+    def revalidated(self, entry: CacheEntry):
+        """Restart the TTL of an entry GitHub confirmed unchanged (304)"""
+        now = self.clock()
+        self.pending_access.pop(entry.key, None)
+        self._write_access()
+        self.conn.execute(
+            'UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, entry.key)
+        )
+        self.conn.commit()
+    
+    def _write_access(self):
+        """Write pending hit timestamps inside the caller's transaction"""
+        if self.pending_access:
+            self.conn.executemany(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?',
+                [(accessed_at, key) for key, accessed_at in self.pending_access.items()]
+            )
+            self.pending_access.clear()
+    
+    def flush_access(self):
+        """Write pending hit timestamps to the database"""
+        if self.pending_access:
+            self._write_access()
+            self.conn.commit()
+    
+    def evict(self):
+        """Drop least recently used entries until the cache fits in 90% of max_bytes"""
+        target = self.max_bytes * 0.9
+        self._write_access()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        evicted = 0
+        
+        rows = self.conn.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall()
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.total_bytes -= size
+            evicted += 1
+        
+        self.conn.commit()
+        logger.info(f"Evicted {evicted} cached responses ({self.total_bytes} bytes kept)")
+    
+    def clear(self):
+        """Remove every cached response"""
+        self.pending_access.clear()
+        self.conn.execute('DELETE FROM responses')
+        self.conn.commit()
+        self.total_bytes = 0
+    
+    def close(self):
+        """Write pending hit timestamps and close the underlying database"""
+        self.flush_access()
+        self.conn.close()
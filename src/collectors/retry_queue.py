@@ -0,0 +1,281 @@
+"""
+Retry Queue and Circuit Breaker
+Failed requests are deferred to a queue and retried with jittered
+exponential backoff once the rest of the work is done, while a
+per-endpoint circuit breaker stops requests to an endpoint that keeps failing
+"""
+
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from typing import Dict, Optional, Callable, Any
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# HTTP statuses worth retrying: server errors and explicit throttling
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Attempts per operation, counting the one that first failed
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Backoff before retry n is drawn uniformly from [0, min(MAX, BASE * 2^(n-1))] seconds
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# Consecutive failures that open an endpoint's circuit, and seconds it stays open
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def circuit_for_path(path: str) -> str:
+    """
+    Circuit of an API path: the endpoint the circuit breaker tracks
+    
+    Args:
+        path: API path relative to the base URL
+    
+    Returns:
+        Endpoint name ('search', 'users', 'users/repos', 'users/events', 'graphql', ...)
+    """
+    parts = path.strip('/').split('/')
+    if parts[0] == 'users' and len(parts) > 2:
+        return f'users/{parts[2]}'
+    return parts[0]
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to an endpoint whose circuit is open
+    
+    `trial_pending` is set when the circuit is half-open and its trial
+    request has not answered yet.
+    """
+    
+    def __init__(self, endpoint: str, retry_at: float, trial_pending: bool = False):
+        super().__init__(f"Circuit open for {endpoint}")
+        self.endpoint = endpoint
+        self.retry_at = retry_at
+        self.trial_pending = trial_pending
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker
+    
+    After `failure_threshold` consecutive failures an endpoint's circuit
+    opens: requests to it fail fast with CircuitOpenError, spending no rate
+    budget. After `reset_timeout` seconds one trial request is let through
+    (half-open); its success closes the circuit and its failure opens it again.
+    """
+    
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.states = {}
+        self.trips = {}
+    
+    def _state(self, endpoint: str) -> Dict:
+        if endpoint not in self.states:
+            self.states[endpoint] = {'state': CLOSED, 'failures': 0, 'opened_at': 0.0}
+        return self.states[endpoint]
+    
+    def check(self, endpoint: str):
+        """
+        Let a request to an endpoint through, or refuse it
+        
+        Raises:
+            CircuitOpenError: While the circuit is open, or while the
+                half-open trial request is in flight
+        """
+        state = self._state(endpoint)
+        if state['state'] == CLOSED:
+            return
+        
+        now = self.clock()
+        if state['state'] == OPEN and now >= state['opened_at'] + self.reset_timeout:
+            state['state'] = HALF_OPEN
+            logger.info(f"Circuit for {endpoint} half-open, sending a trial request")
+            return
+        if state['state'] == OPEN:
+            raise CircuitOpenError(endpoint, state['opened_at'] + self.reset_timeout)
+        raise CircuitOpenError(endpoint, now, trial_pending=True)
+    
+    def record_success(self, endpoint: str):
+        """Close an endpoint's circuit after a successful request"""
+        state = self._state(endpoint)
+        if state['state'] != CLOSED:
+            logger.info(f"Circuit for {endpoint} closed")
+        state['state'] = CLOSED
+        state['failures'] = 0
+    
+    def record_failure(self, endpoint: str):
+        """Count a failed request, opening the circuit past the threshold or after a failed trial"""
+        state = self._state(endpoint)
+        state['failures'] += 1
+        if state['state'] == HALF_OPEN or (state['state'] == CLOSED and
+                                           state['failures'] >= self.failure_threshold):
+            state['state'] = OPEN
+            state['opened_at'] = self.clock()
+            self.trips[endpoint] = self.trips.get(endpoint, 0) + 1
+            logger.warning(f"Circuit for {endpoint} opened after {state['failures']} failures; "
+                           f"pausing it for {self.reset_timeout:.0f}s")
+    
+    def summary(self) -> str:
+        """One-line summary of the circuits opened so far"""
+        if not self.trips:
+            return "Circuit breaker: no endpoint opened"
+        opened = ', '.join(f"{endpoint} x{count}" for endpoint, count in sorted(self.trips.items()))
+        return f"Circuit breaker opened: {opened}"
+
+
+class _Retry:
+    """A deferred operation and its callbacks"""
+    
+    def __init__(self, name: str, task: Callable[[], Any], on_done: Optional[Callable[[Any], None]]):
+        self.name = name
+        self.task = task
+        self.on_done = on_done
+        self.failures = 1
+
+
+class RetryQueue:
+    """
+    Deferred retries with jittered exponential backoff
+    
+    A failed operation is queued with `defer` and the caller moves on to
+    other work. `drain` (or `drain_async`) later runs every queued operation
+    once its backoff has elapsed, passing results to its `on_done` callback.
+    An operation whose error is not retryable, or that failed
+    `max_attempts` times, is given up and counted as failed.
+    """
+    
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY, seed: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._heap = []
+        self._sequence = itertools.count()
+        self.counts = {'deferred': 0, 'retried': 0, 'recovered': 0, 'failed': 0}
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def backoff(self, failures: int) -> float:
+        """Full-jitter exponential delay before the retry following `failures` failed attempts"""
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (failures - 1)))
+    
+    def _due(self, retry: _Retry, error: Exception) -> float:
+        due = self.clock() + self.backoff(retry.failures)
+        if isinstance(error, CircuitOpenError):
+            due = max(due, error.retry_at)
+        return due
+    
+    def defer(self, name: str, error: Exception, task: Callable[[], Any],
+              on_done: Optional[Callable[[Any], None]] = None):
+        """
+        Queue an operation whose first attempt just failed
+        
+        Args:
+            name: Description used in log messages
+            error: Error of the failed attempt
+            task: Callable repeating the operation (a coroutine function for drain_async)
+            on_done: Called with the task's result once it succeeds
+        """
+        self.counts['deferred'] += 1
+        retry = _Retry(name, task, on_done)
+        heapq.heappush(self._heap, (self._due(retry, error), next(self._sequence), retry))
+    
+    def fail(self, name: str, error: Exception):
+        """Give up on an operation"""
+        self.counts['failed'] += 1
+        logger.error(f"Giving up on {name}: {error}")
+    
+    def _failed_again(self, retry: _Retry, error: Exception, is_retryable: Callable[[Exception], bool]) -> Optional[float]:
+        """
+        Time of the next attempt after a failed retry, or None once given up
+        
+        Waiting on a half-open circuit's trial request does not use up an attempt.
+        """
+        if isinstance(error, CircuitOpenError) and error.trial_pending:
+            return self._due(retry, error)
+        retry.failures += 1
+        if is_retryable(error) and retry.failures < self.max_attempts:
+            return self._due(retry, error)
+        self.fail(f"{retry.name} after {retry.failures} attempts", error)
+        return None
+    
+    def _succeeded(self, retry: _Retry, result: Any):
+        self.counts['recovered'] += 1
+        if retry.on_done:
+            retry.on_done(result)
+    
+    def drain(self, is_retryable: Callable[[Exception], bool]):
+        """
+        Run queued operations as they come due until the queue is empty
+        
+        Sleeps only while no queued operation is due. Operations deferred
+        by a running task are picked up too.
+        
+        Args:
+            is_retryable: Whether an error is worth another attempt
+        """
+        while self._heap:
+            due, _, retry = heapq.heappop(self._heap)
+            wait = due - self.clock()
+            if wait > 0:
+                time.sleep(wait)
+            
+            self.counts['retried'] += 1
+            try:
+                result = retry.task()
+            except Exception as e:
+                due = self._failed_again(retry, e, is_retryable)
+                if due is not None:
+                    heapq.heappush(self._heap, (due, next(self._sequence), retry))
+                continue
+            self._succeeded(retry, result)
+    
+    async def _retry_async(self, due: float, retry: _Retry, is_retryable: Callable[[Exception], bool]):
+        while due is not None:
+            await asyncio.sleep(max(due - self.clock(), 0))
+            self.counts['retried'] += 1
+            try:
+                result = await retry.task()
+            except Exception as e:
+                due = self._failed_again(retry, e, is_retryable)
+                continue
+            self._succeeded(retry, result)
+            return
+    
+    async def drain_async(self, is_retryable: Callable[[Exception], bool]):
+        """
+        Retry every queued coroutine concurrently, each after its own backoff
+        
+        Args:
+            is_retryable: Whether an error is worth another attempt
+        """
+        while self._heap:
+            queued, self._heap = self._heap, []
+            await asyncio.gather(*(self._retry_async(due, retry, is_retryable) for due, _, retry in queued))
+    
+    def summary(self) -> str:
+        """One-line summary of the retries so far"""
+        return (f"Retries: {self.counts['deferred']} failed operations deferred, "
+                f"{self.counts['retried']} retried, {self.counts['recovered']} recovered, "
+                f"{self.counts['failed']} failed")
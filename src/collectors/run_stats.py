@@ -0,0 +1,79 @@
+"""
+Collection Run Statistics
+Per-wilaya record of what the last collection of each wilaya cost (search
+pages, enrichment requests, users found per term, time), kept across runs
+so later collections can be planned against the rate budget
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RunStats:
+    """
+    Statistics of the latest collection of every wilaya, stored as JSON
+    
+    Each wilaya entry holds the requests charged per resource ('search',
+    'core', 'graphql'), the users found per search term, the number of
+    users found, enriched and reused, and the elapsed seconds. Recording a
+    wilaya replaces its previous entry and rewrites the file atomically.
+    Without a path the statistics are only kept in memory (e.g. in --workers
+    processes, which hand them to the parent).
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.wilayas = {}
+        
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.wilayas = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable run statistics {path}: {e}")
+    
+    def get(self, wilaya_code: str) -> Optional[Dict]:
+        """Latest statistics of a wilaya, if it was ever collected"""
+        return self.wilayas.get(wilaya_code)
+    
+    def record_wilaya(self, wilaya_code: str, requests: Dict[str, int], term_users: Dict[str, int],
+                      found: int, enriched: int, reused: int, seconds: float):
+        """
+        Store the statistics of a finished wilaya
+        
+        Args:
+            wilaya_code: Wilaya code
+            requests: Charged requests per resource
+            term_users: Users returned by each search term
+            found: Unique users returned by the searches
+            enriched: Users enriched with API requests
+            reused: Users reused without requests (journal, refresh plan, collection plan)
+            seconds: Elapsed collection time
+        """
+        self.wilayas[wilaya_code] = {
+            'requests': {resource: count for resource, count in requests.items() if count},
+            'term_users': term_users,
+            'found': found,
+            'enriched': enriched,
+            'reused': reused,
+            'seconds': round(seconds, 3),
+            'recorded_at': datetime.utcnow().isoformat(),
+        }
+        self.save()
+    
+    def save(self):
+        """Write the statistics file"""
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.wilayas, f, ensure_ascii=False, indent=2)
+        os.replace(temporary, self.path)
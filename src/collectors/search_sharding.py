@@ -0,0 +1,114 @@
+"""
+Search Sharding
+Splits a location search into disjoint followers:/created: ranges so that
+every shard stays under GitHub's 1000-result search cap
+"""
+
+from datetime import date, timedelta
+from typing import List, Dict, Optional
+
+
+# GitHub returns at most this many results for any search query
+SEARCH_RESULT_CAP = 1000
+
+# Results per page of /search/users (the most the API returns)
+SEARCH_PAGE_SIZE = 100
+
+# No GitHub account was created before the service launched
+GITHUB_LAUNCH_DATE = date(2008, 1, 1)
+
+
+class SearchShard:
+    """
+    One slice of a location search
+    
+    A shard covers followers in [followers_min, followers_max] (unbounded
+    above when followers_max is None) and accounts created between
+    created_from and created_to inclusive (unrestricted when both are None).
+    Extra qualifiers (e.g. `repos:>=1`) are kept by every child shard.
+    """
+    
+    def __init__(self, location: str, followers_min: int = 0, followers_max: Optional[int] = None,
+                 created_from: Optional[date] = None, created_to: Optional[date] = None,
+                 qualifiers: str = ''):
+        self.location = location
+        self.followers_min = followers_min
+        self.followers_max = followers_max
+        self.created_from = created_from
+        self.created_to = created_to
+        self.qualifiers = qualifiers
+    
+    def __repr__(self) -> str:
+        return f"SearchShard({self.query()!r})"
+    
+    def query(self) -> str:
+        """Search query string for this shard"""
+        location = f'"{self.location}"' if ' ' in self.location else self.location
+        if self.followers_max is None:
+            followers = f'>={self.followers_min}'
+        elif self.followers_max == self.followers_min:
+            followers = str(self.followers_min)
+        else:
+            followers = f'{self.followers_min}..{self.followers_max}'
+        
+        parts = [f'location:{location}', f'followers:{followers}']
+        if self.created_from or self.created_to:
+            created_from = self.created_from or GITHUB_LAUNCH_DATE
+            created_to = self.created_to or date.today()
+            parts.append(f'created:{created_from.isoformat()}..{created_to.isoformat()}')
+        if self.qualifiers:
+            parts.append(self.qualifiers)
+        return ' '.join(parts)
+    
+    def params(self, page: int, per_page: int = 100) -> Dict:
+        """/search/users query parameters for one result page of this shard"""
+        return {
+            'q': self.query(),
+            'per_page': per_page,
+            'page': page,
+            'sort': 'followers',
+            'order': 'desc'
+        }
+    
+    def _derive(self, **changes) -> 'SearchShard':
+        fields = {
+            'location': self.location,
+            'followers_min': self.followers_min,
+            'followers_max': self.followers_max,
+            'created_from': self.created_from,
+            'created_to': self.created_to,
+            'qualifiers': self.qualifiers,
+        }
+        fields.update(changes)
+        return SearchShard(**fields)
+    
+    def split(self) -> List['SearchShard']:
+        """
+        Split into two disjoint shards covering the same users
+        
+        The followers range is halved first (doubling the lower bound when it
+        is open-ended, since follower counts are heavy-tailed). Once it is a
+        single value, the creation-date range is bisected instead.
+        
+        Returns:
+            Child shards, higher follower ranges first; empty if indivisible
+        """
+        lo, hi = self.followers_min, self.followers_max
+        
+        if hi is None:
+            pivot = max(lo * 2, lo + 1)
+            return [self._derive(followers_min=pivot + 1, followers_max=None),
+                    self._derive(followers_min=lo, followers_max=pivot)]
+        
+        if hi > lo:
+            mid = (lo + hi) // 2
+            return [self._derive(followers_min=mid + 1), self._derive(followers_max=mid)]
+        
+        created_from = self.created_from or GITHUB_LAUNCH_DATE
+        created_to = self.created_to or date.today()
+        if created_to <= created_from:
+            return []
+        
+        mid = created_from + timedelta(days=(created_to - created_from).days // 2)
+        return [self._derive(created_from=mid + timedelta(days=1), created_to=created_to),
+                self._derive(created_from=created_from, created_to=mid)]
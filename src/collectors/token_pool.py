@@ -0,0 +1,126 @@
+"""
+Token Pool for the GitHub API
+Spreads requests over several personal access tokens, each with its own
+rate budgets, and rotates exhausted tokens out until their reset time
+"""
+
+import os
+import time
+from typing import List, Dict, Optional, Callable, Mapping, Tuple
+import logging
+
+from .rate_limiter import RateLimiter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_tokens(token: Optional[str] = None, tokens_file: Optional[str] = None) -> List[str]:
+    """
+    Gather GitHub tokens from arguments and environment
+    
+    Sources, in order: the explicit token, `tokens_file` (or GITHUB_TOKENS_FILE),
+    GITHUB_TOKENS (comma or whitespace separated) and GITHUB_TOKEN.
+    Token files hold one token per line; blank lines and '#' comments are ignored.
+    
+    Args:
+        token: Single token passed by the caller
+        tokens_file: Path to a file of tokens
+    
+    Returns:
+        Unique tokens in discovery order
+    """
+    tokens = []
+    if token:
+        tokens.append(token)
+    
+    tokens_file = tokens_file or os.getenv('GITHUB_TOKENS_FILE')
+    if tokens_file:
+        with open(tokens_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    tokens.append(line)
+    
+    tokens.extend(os.getenv('GITHUB_TOKENS', '').replace(',', ' ').split())
+    
+    if os.getenv('GITHUB_TOKEN'):
+        tokens.append(os.getenv('GITHUB_TOKEN'))
+    
+    return list(dict.fromkeys(tokens))
+
+
+class TokenPool:
+    """Routes each request to the token with the most remaining budget"""
+    
+    def __init__(self, tokens: List[str], clock: Callable[[], float] = time.time,
+                 limiter_factory: Optional[Callable[[str], RateLimiter]] = None):
+        if not tokens:
+            raise ValueError("GitHub token required. Set GITHUB_TOKEN environment variable.")
+        
+        self.clock = clock
+        self.tokens = list(dict.fromkeys(tokens))
+        # Budgets are private to this pool unless a factory shares them (see RateCoordinator)
+        limiter_factory = limiter_factory or (lambda token: RateLimiter(clock))
+        self.limiters = {token: limiter_factory(token) for token in self.tokens}
+    
+    def __len__(self) -> int:
+        return len(self.tokens)
+    
+    def _available_at(self, token: str, resource: str) -> float:
+        """Time at which a token can next send a request for a resource"""
+        bucket = self.limiters[token].bucket(resource)
+        available_at = bucket.blocked_until
+        if bucket.remaining <= 0:
+            available_at = max(available_at, bucket.reset_at)
+        return available_at
+    
+    def select(self, resource: str) -> str:
+        """
+        Pick the token for the next request
+        
+        Tokens that are exhausted or blocked stay out of rotation until their
+        reset time. Among the usable ones, the token with the most remaining
+        budget wins; if none is usable, the one that reopens first is used.
+        
+        Args:
+            resource: Rate-limit resource of the request
+        
+        Returns:
+            Selected token
+        """
+        now = self.clock()
+        usable = [t for t in self.tokens if self._available_at(t, resource) <= now]
+        if usable:
+            return max(usable, key=lambda t: self.limiters[t].remaining(resource))
+        return min(self.tokens, key=lambda t: self._available_at(t, resource))
+    
+    def acquire(self, resource: str) -> Tuple[str, float]:
+        """
+        Select a token and reserve one request on it
+        
+        Returns:
+            Tuple of (token, seconds to wait before sending)
+        """
+        token = self.select(resource)
+        return token, self.limiters[token].reserve(resource)
+    
+    def update(self, token: str, resource: str, headers: Mapping[str, str], status: int,
+               body: bytes = b'') -> bool:
+        """Feed a response's headers (and body, for 403/429) back to the token's limiter; True means retry"""
+        limited = self.limiters[token].update(resource, headers, status, body)
+        if limited and len(self.tokens) > 1:
+            logger.info(f"Token ...{token[-4:]} rotated out for {resource}")
+        return limited
+    
+    def refund(self, token: str, resource: str):
+        """Return an uncharged request to the token's budget"""
+        self.limiters[token].refund(resource)
+    
+    def remaining(self, resource: str = 'core') -> int:
+        """Requests left for a resource across the whole pool"""
+        return sum(limiter.remaining(resource) for limiter in self.limiters.values())
+    
+    def load(self, token: str, resources: Dict[str, Dict]):
+        """Seed a token's budgets from the /rate_limit payload"""
+        self.limiters[token].load(resources)
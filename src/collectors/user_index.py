@@ -0,0 +1,126 @@
+"""
+Global User Index
+Run-wide registry of collected users, so a login returned by the searches
+of several wilayas is enriched once and ranked in exactly one wilaya
+"""
+
+from typing import List, Dict, Iterable, Optional, Set
+import logging
+
+from .location_matcher import LocationMatcher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UserIndex:
+    """
+    Users collected so far in a run, with the wilayas that found them
+    
+    Every wilaya whose search returns a login becomes a candidate for it;
+    the user is resolved to the candidate that best matches the profile
+    location (see LocationMatcher.best). When a later wilaya wins a user
+    that an earlier wilaya already saved, the earlier wilaya is reported by
+    `stale_wilayas` so its output can be rewritten.
+    """
+    
+    def __init__(self, matcher: LocationMatcher):
+        self.matcher = matcher
+        self.users = {}
+        self.missing = set()
+        self.candidates = {}
+        # wilaya code -> its logins in search order (a dict used as an ordered set)
+        self.search_order = {}
+        self.assigned = {}
+        self.stale_wilayas = set()
+    
+    def is_known(self, login: str) -> bool:
+        """Whether a login needs no further requests in this run"""
+        return login in self.users or login in self.missing
+    
+    def add_candidates(self, logins: List[str], wilaya_code: str):
+        """
+        Register the search results of a wilaya
+        
+        Args:
+            logins: Logins in search order
+            wilaya_code: Wilaya whose searches returned them
+        """
+        self.search_order[wilaya_code] = dict.fromkeys(logins)
+        for login in logins:
+            codes = self.candidates.setdefault(login, [])
+            if wilaya_code not in codes:
+                codes.append(wilaya_code)
+            self._reassign(login)
+    
+    def add(self, user: Dict):
+        """Store an enriched user; the first record of a login is kept"""
+        self.users.setdefault(user['username'], user)
+    
+    def mark_missing(self, login: str):
+        """Remember a login whose details could not be fetched"""
+        self.missing.add(login)
+    
+    def resolve(self, login: str) -> Optional[str]:
+        """Wilaya a collected user belongs to, or None if not collected"""
+        user = self.users.get(login)
+        if user is None:
+            return None
+        return self.matcher.best(user.get('location'), self.candidates[login])
+    
+    def _reassign(self, login: str):
+        """Flag the previously assigned wilaya when a user changes wilaya"""
+        previous = self.assigned.get(login)
+        if previous is not None and self.resolve(login) != previous:
+            self.stale_wilayas.add(previous)
+    
+    def _resolved_record(self, login: str, wilaya_code: str) -> Dict:
+        return dict(self.users[login], wilaya_code=wilaya_code,
+                    wilaya_name=self.matcher.names.get(wilaya_code, self.users[login].get('wilaya_name')))
+    
+    def users_for(self, wilaya_code: str) -> List[Dict]:
+        """
+        Users resolved to a wilaya, in its search order
+        
+        The returned users are considered saved under that wilaya; a later
+        change of wilaya marks it stale.
+        """
+        users = []
+        for login in self.search_order.get(wilaya_code, {}):
+            if self.resolve(login) == wilaya_code:
+                self.assigned[login] = wilaya_code
+                users.append(self._resolved_record(login, wilaya_code))
+        self.stale_wilayas.discard(wilaya_code)
+        return users
+    
+    def seed(self, users: Iterable[Dict]):
+        """
+        Load previously saved users
+        
+        Each record counts as a search result of its stored wilaya. When a
+        login appears more than once, the most recently collected record is
+        kept and every stored wilaya becomes a candidate.
+        """
+        for user in users:
+            login, code = user['username'], user['wilaya_code']
+            stored = self.users.get(login)
+            if stored is None or (user.get('collected_at') or '') > (stored.get('collected_at') or ''):
+                self.users[login] = user
+            
+            codes = self.candidates.setdefault(login, [])
+            if code not in codes:
+                codes.append(code)
+            self.search_order.setdefault(code, {})[login] = None
+            self.assigned.setdefault(login, code)
+        
+        for login in self.users:
+            self._reassign(login)
+    
+    def resolved_users(self) -> List[Dict]:
+        """Every collected user once, under its resolved wilaya"""
+        return [self._resolved_record(login, self.resolve(login)) for login in self.users]
+    
+    def take_stale_wilayas(self) -> Set[str]:
+        """Wilayas whose saved output lost users to another wilaya since it was written"""
+        stale, self.stale_wilayas = self.stale_wilayas, set()
+        return stale
@@ -3,11 +3,13 @@ Markdown Generator
 Generates markdown files for rankings following HCI principles
 """
 
-from typing import List, Dict
+from typing import Dict
 from pathlib import Path
 from datetime import datetime
 import logging
 
+from processors.rank_table import RankTable
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -46,12 +48,12 @@ class MarkdownGenerator:
 """
         return nav
     
-    def generate_user_table(self, users: List[Dict], category: str) -> str:
+    def generate_user_table(self, users: RankTable, category: str) -> str:
         """
         Generate markdown table for users
         
         Args:
-            users: List of ranked users
+            users: RankTable of the ranked users (already cut to the leaderboard size)
             category: Ranking category
             
         Returns:
@@ -66,15 +68,13 @@ class MarkdownGenerator:
 """
         
         # Table rows
-        for user in users[:100]:  # Top 100
-            rank = user.get('rank', '-')
+        for rank, score, user in users:
             username = user.get('username', 'Unknown')
             name = user.get('name') or username
             location = user.get('location', '-')
             followers = user.get('followers', 0)
             repos = user.get('public_repos', 0)
             stars = user.get('total_stars', 0)
-            score = user.get('score', 0)
             
             # Truncate long names
             if len(name) > 20:
@@ -100,10 +100,10 @@ class MarkdownGenerator:
             
             # Get users for this wilaya (from any category)
             users = wilaya_rankings.get(code, [])
-            user_count = len(users)
+            user_count = users.total if users else 0
             
             if users:
-                top_user = users[0]
+                top_user = users.user(0)
                 top_username = top_user.get('username', '-')
                 top_followers = top_user.get('followers', 0)
                 summary += f"| {code} | {name} | {user_count} | [@{top_username}](https://github.com/{top_username}) | {top_followers} |\n"
@@ -127,7 +127,8 @@ class MarkdownGenerator:
             category_config['description']
         )
         content += self.generate_navigation(category)
-        content += f"\n## Top 100 Users - {category_config['name']}\n\n"
+        top = rankings.get('limits', {}).get('national') or len(national_users)
+        content += f"\n## Top {top} Users - {category_config['name']}\n\n"
         content += self.generate_user_table(national_users, category)
         
         # Save file
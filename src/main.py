@@ -3,19 +3,82 @@ Main entry point for Algeria GitHub Rankings
 """
 
 import argparse
+import asyncio
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import sys
 import os
+from collections import defaultdict
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from collectors.base_collector import BaseGitHubCollector
 from collectors.github_collector import GitHubCollector
-from processors.ranking_processor import RankingProcessor
+from collectors.async_github_collector import AsyncGitHubCollector
+from collectors.token_pool import load_tokens
+from collectors.response_cache import ResponseCache
+from collectors.progress_journal import ProgressJournal
+from collectors.rate_coordinator import RateCoordinator
+from collectors.node_sharding import NodeShard
+from collectors.incremental_refresh import RefreshPlanner
+from collectors.run_stats import RunStats
+from collectors.collection_planner import CollectionPlanner, available_budget
+from collectors.location_matcher import LocationMatcher, UNCLASSIFIED_CODE, UNCLASSIFIED_NAME
+from collectors.user_index import UserIndex
+from storage.raw_data import (
+    raw_data_path, find_raw_file, raw_data_files, iter_raw_users, iter_all_raw_users,
+    write_raw_users, zstd_available
+)
+from storage.contribution_store import ContributionStore
+from storage.user_store import UserStore
+from storage.columnar_snapshot import ColumnarSnapshot, write_snapshot, MANIFEST_NAME
+from processors.ranking_processor import RankingProcessor, NATIONAL_TOP, WILAYA_TOP
+from processors.rank_index import RankIndex
+from processors.filter_plan import FilterPlan
 from generators.markdown_generator import MarkdownGenerator
 
 
+RAW_DATA_DIR = Path(__file__).parent.parent / 'data' / 'raw'
+CACHE_PATH = Path(__file__).parent.parent / 'data' / 'cache' / 'http_cache.sqlite'
+JOURNAL_PATH = Path(__file__).parent.parent / 'data' / 'journal' / 'collect_all.jsonl'
+RATE_LEASES_PATH = Path(__file__).parent.parent / 'data' / 'cache' / 'rate_leases.sqlite'
+RUN_STATS_PATH = Path(__file__).parent.parent / 'data' / 'stats' / 'run_stats.json'
+CONTRIBUTIONS_PATH = Path(__file__).parent.parent / 'data' / 'contributions' / 'contributions.sqlite'
+# Once created by --migrate-users, the user store replaces the raw data files
+USER_STORE_PATH = Path(__file__).parent.parent / 'data' / 'users.sqlite'
+# Columnar copy of the deduplicated users, memory-mapped by the ranking stage
+SNAPSHOT_DIR = Path(__file__).parent.parent / 'data' / 'snapshot'
+# Once built by --rank-index, kept in step with every save to the user store
+RANK_INDEX_PATH = Path(__file__).parent.parent / 'data' / 'rank_index.sqlite'
+
+# Used when config/wilayas.json has no national_search_terms
+NATIONAL_SEARCH_TERMS = ['Algeria', 'Algérie', 'الجزائر']
+
+
+def use_data_dir(data_dir: Path):
+    """
+    Keep the data files under another directory (e.g. one per node)
+    
+    Moves the raw data, the journal, run statistics, contributions, the
+    user store, the snapshot, the rank index and the rate lease table.
+    
+    Args:
+        data_dir: Directory taking the place of data/
+    """
+    global RAW_DATA_DIR, JOURNAL_PATH, RUN_STATS_PATH, CONTRIBUTIONS_PATH, USER_STORE_PATH, SNAPSHOT_DIR, \
+        RANK_INDEX_PATH, RATE_LEASES_PATH
+    RAW_DATA_DIR = Path(data_dir) / 'raw'
+    JOURNAL_PATH = Path(data_dir) / 'journal' / 'collect_all.jsonl'
+    RUN_STATS_PATH = Path(data_dir) / 'stats' / 'run_stats.json'
+    CONTRIBUTIONS_PATH = Path(data_dir) / 'contributions' / 'contributions.sqlite'
+    USER_STORE_PATH = Path(data_dir) / 'users.sqlite'
+    SNAPSHOT_DIR = Path(data_dir) / 'snapshot'
+    RANK_INDEX_PATH = Path(data_dir) / 'rank_index.sqlite'
+    RATE_LEASES_PATH = Path(data_dir) / 'cache' / 'rate_leases.sqlite'
+
+
 def load_wilayas_config():
     """Load wilayas configuration"""
     config_path = Path(__file__).parent.parent / 'config' / 'wilayas.json'
@@ -23,27 +86,719 @@ def load_wilayas_config():
         return json.load(f)
 
 
-def collect_all_data(collector: GitHubCollector, config: dict):
-    """Collect data for all wilayas"""
+def wilaya_output_path(wilaya: dict, compress: bool = False) -> Path:
+    """Raw data file for a wilaya (NDJSON, zstd-compressed when compress=True)"""
+    return raw_data_path(RAW_DATA_DIR, wilaya['code'], compress)
+
+
+def iter_stored_users(store_path: Path, wilaya_code: str = None):
+    """Lazily iterate over the users of a user store, closing it once read"""
+    store = UserStore(str(store_path))
+    try:
+        yield from store.iter_users(wilaya_code)
+    finally:
+        store.close()
+
+
+def load_collected_users():
+    """Lazily iterate over every collected user (user store, or else the raw data files)"""
+    if USER_STORE_PATH.exists():
+        return iter_stored_users(USER_STORE_PATH)
+    return iter_all_raw_users(RAW_DATA_DIR)
+
+
+def load_wilaya_users(wilaya: dict):
+    """Lazily iterate over the saved users of one wilaya (empty if not collected yet)"""
+    if USER_STORE_PATH.exists():
+        return iter_stored_users(USER_STORE_PATH, wilaya['code'])
+    path = find_raw_file(RAW_DATA_DIR, wilaya['code'])
+    return iter_raw_users(path) if path else iter(())
+
+
+def save_wilaya(collector: BaseGitHubCollector, wilaya: dict, users, compress: bool = False):
+    """
+    Save the users of a wilaya
+    
+    With a user store, the wilaya's rows are upserted and users no longer
+    in it are deleted, and the same delta is applied to the collector's
+    rank index; otherwise its raw data file is rewritten.
+    """
+    if not USER_STORE_PATH.exists():
+        collector.save_data(users, str(wilaya_output_path(wilaya, compress)))
+        return
+    if collector.rank_index:
+        users = list(users)
+    store = UserStore(str(USER_STORE_PATH))
+    try:
+        store.replace_wilaya(wilaya['code'], users)
+    finally:
+        store.close()
+    if collector.rank_index:
+        collector.rank_index.replace_wilaya(wilaya['code'], users)
+
+
+def claim_wilaya_users(config: dict, wilaya: dict, users: list) -> tuple:
+    """
+    Split the users of a single collected wilaya by where the user store should file them
+    
+    Without a run-wide UserIndex, a user the wilaya's search found may
+    already be stored under another wilaya. It moves only if its location
+    matches this wilaya at least as well (LocationMatcher.best over both).
+    
+    Returns:
+        Tuple of (users of this wilaya, users kept under their stored wilaya)
+    """
+    matcher = LocationMatcher(config['wilayas'])
+    store = UserStore(str(USER_STORE_PATH))
+    claimed, elsewhere = [], []
+    try:
+        for user in users:
+            stored = store.get(user['username'])
+            code = stored.get('wilaya_code') if stored else None
+            if code and code != wilaya['code'] and matcher.best(user.get('location'), [code, wilaya['code']]) == code:
+                elsewhere.append(dict(user, wilaya_code=code,
+                                      wilaya_name=matcher.names.get(code, stored.get('wilaya_name'))))
+            else:
+                claimed.append(user)
+    finally:
+        store.close()
+    return claimed, elsewhere
+
+
+def save_collected_wilaya(collector: BaseGitHubCollector, config: dict, wilaya: dict, users: list,
+                          compress: bool = False):
+    """
+    Save the users found by collecting a single wilaya
+    
+    With a user store, users whose location matches their stored wilaya
+    better stay there (see claim_wilaya_users) and the rest replace the
+    wilaya's rows; otherwise its raw data file is rewritten.
+    """
+    if USER_STORE_PATH.exists():
+        users, elsewhere = claim_wilaya_users(config, wilaya, users)
+        if elsewhere:
+            update_stored_users(collector, elsewhere)
+            print(f"Kept {len(elsewhere)} users under the wilaya their location matches better")
+    save_wilaya(collector, wilaya, users, compress)
+
+
+def update_stored_users(collector: BaseGitHubCollector, users: list):
+    """Upsert users under their own wilaya, in the user store and the collector's rank index"""
+    store = UserStore(str(USER_STORE_PATH))
+    try:
+        store.upsert(users)
+    finally:
+        store.close()
+    if collector.rank_index:
+        collector.rank_index.apply(users)
+
+
+def write_ranking_snapshot(config: dict):
+    """Write the deduplicated collected users as the columnar snapshot read by generate_rankings"""
+    count = write_snapshot(SNAPSHOT_DIR, deduplicate_users(load_collected_users(), config))
+    print(f"Wrote a ranking snapshot of {count} users to {SNAPSHOT_DIR}")
+
+
+def refresh_ranking_snapshot(collector: BaseGitHubCollector, config: dict):
+    """
+    Rewrite the ranking snapshot after a full collection
+    
+    Skipped when the collection kept the rank index up to date, since
+    generate_rankings reads the index first; the snapshot is then left to
+    the staleness check in load_ranking_snapshot.
+    """
+    if collector.rank_index is None:
+        write_ranking_snapshot(config)
+
+
+def load_ranking_snapshot():
+    """
+    The columnar snapshot, if one was written after the last change to the collected users
+    
+    Returns:
+        ColumnarSnapshot, or None when missing or older than the raw data or user store
+    """
+    manifest = SNAPSHOT_DIR / MANIFEST_NAME
+    if not manifest.exists():
+        return None
+    sources = [USER_STORE_PATH, Path(f'{USER_STORE_PATH}-wal')] + raw_data_files(RAW_DATA_DIR)
+    newest = max((path.stat().st_mtime for path in sources if path.exists()), default=0)
+    if manifest.stat().st_mtime < newest:
+        print("Ranking snapshot is older than the collected data; rebuild it with --snapshot")
+        return None
+    return ColumnarSnapshot.open(SNAPSHOT_DIR)
+
+
+def open_rank_index(config: dict) -> RankIndex:
+    """The rank index at RANK_INDEX_PATH, scoring with the current contribution counts"""
+    return RankIndex(str(RANK_INDEX_PATH), RankingProcessor(config, contributions=load_contributions()))
+
+
+def build_rank_index(config: dict):
+    """Build the rank index from the ranking snapshot, replacing any previous one"""
+    if not USER_STORE_PATH.exists():
+        print("Error: the rank index follows the user store; run --migrate-users first")
+        return
+    snapshot = load_ranking_snapshot()
+    if snapshot is None:
+        write_ranking_snapshot(config)
+        snapshot = ColumnarSnapshot.open(SNAPSHOT_DIR)
+    index = open_rank_index(config)
+    try:
+        count = index.build_from_snapshot(snapshot)
+    finally:
+        index.close()
+    print(f"Built a rank index of {count} users in {RANK_INDEX_PATH}")
+
+
+def load_rank_index(config: dict):
+    """
+    The rank index, if it is in step with the user store and contribution counts
+    
+    Returns:
+        RankIndex, or None when missing, built for other categories or
+        thresholds, or older than the user store or contribution counts
+    """
+    if not RANK_INDEX_PATH.exists() or not USER_STORE_PATH.exists():
+        return None
+    sources = [USER_STORE_PATH, Path(f'{USER_STORE_PATH}-wal'),
+               CONTRIBUTIONS_PATH, Path(f'{CONTRIBUTIONS_PATH}-wal')]
+    newest = max((path.stat().st_mtime for path in sources if path.exists()), default=0)
+    updated = max(path.stat().st_mtime for path in [RANK_INDEX_PATH, Path(f'{RANK_INDEX_PATH}-wal')]
+                  if path.exists())
+    index = open_rank_index(config)
+    if updated < newest or not index.matches():
+        print("Rank index is out of step with the collected data; rebuild it with --rank-index")
+        index.close()
+        return None
+    return index
+
+
+def attach_rank_index(collector: BaseGitHubCollector, config: dict):
+    """Apply the wilayas saved by a collection to the rank index, if one was built"""
+    index = load_rank_index(config)
+    if index is not None:
+        collector.rank_index = index
+        print(f"Updating the rank index of {len(index)} users")
+
+
+def detach_rank_index(collector: BaseGitHubCollector):
+    """Close the rank index attached by attach_rank_index, if any"""
+    if collector.rank_index is not None:
+        collector.rank_index.close()
+        collector.rank_index = None
+
+
+def migrate_raw_data(config: dict):
+    """
+    Load the raw data files into the user store
+    
+    Users found in several files are kept once, under the wilaya their
+    location matches best. The raw files are left in place; once the
+    store exists, collection and ranking use it instead.
+    """
+    files = raw_data_files(RAW_DATA_DIR)
+    print(f"Migrating {len(files)} wilaya files from {RAW_DATA_DIR} to {USER_STORE_PATH}...")
+    users = deduplicate_users(iter_all_raw_users(RAW_DATA_DIR), config)
+    
+    store = UserStore(str(USER_STORE_PATH))
+    try:
+        count = store.upsert(users)
+        by_wilaya = store.counts_by_wilaya()
+        total = store.count()
+    finally:
+        store.close()
+    print(f"Migrated {count} users into {len(by_wilaya)} wilayas ({total} users stored)")
+    write_ranking_snapshot(config)
+    if RANK_INDEX_PATH.exists():
+        build_rank_index(config)
+
+
+def deduplicate_users(users, config: dict) -> list:
+    """Keep each user once, under the wilaya its location matches best"""
+    index = UserIndex(LocationMatcher(config['wilayas']))
+    index.seed(users)
+    return index.resolved_users()
+
+
+def rewrite_stale_wilayas(collector: BaseGitHubCollector, config: dict, compress: bool = False):
+    """Rewrite saved wilayas that lost users to a better-matching wilaya"""
+    index = collector.user_index
+    for code in sorted(index.take_stale_wilayas()):
+        wilaya = next(w for w in config['wilayas'] if w['code'] == code)
+        users = index.users_for(code)
+        save_wilaya(collector, wilaya, users, compress)
+        print(f"Rewrote {wilaya['name_en']}: {len(users)} users after cross-wilaya deduplication")
+
+
+def attach_refresh_planner(collector: BaseGitHubCollector):
+    """Plan an incremental refresh against the currently stored users"""
+    collector.refresh_planner = RefreshPlanner(load_collected_users())
+    print(f"Refreshing against {len(collector.refresh_planner.users)} stored users")
+
+
+def attach_run_stats(collector: BaseGitHubCollector):
+    """Record what each collected wilaya costs, for planning later runs"""
+    collector.run_stats = RunStats(str(RUN_STATS_PATH))
+
+
+def plan_collection(collector: BaseGitHubCollector, config: dict, wilayas: list, refresh: bool = False,
+                    time_window: float = None, fallback_order: list = None):
+    """
+    Plan a collection against the tokens' current rate budget
+    
+    Args:
+        collector: Collector whose tokens and enrichment mode are planned for
+        config: Wilayas configuration
+        wilayas: Wilayas to consider
+        refresh: Whether fresh stored users will be reused
+        time_window: Hours the collection may take; None plans every wilaya in full
+        fallback_order: Wilaya codes to start with when nothing was collected before
+    
+    Returns:
+        CollectionPlan
+    """
+    # /rate_limit is free and loads the real remaining budgets
+    check_rate_limit(collector)
+    planner = CollectionPlanner(
+        config['wilayas'], RunStats(str(RUN_STATS_PATH)), load_collected_users(),
+        enrichment=collector.enrichment, graphql_batch_size=collector.graphql_batch_size,
+        refresh=refresh, fallback_order=fallback_order,
+        concurrency=getattr(collector, 'concurrency', 1)
+    )
+    return planner.plan(available_budget(collector.token_pool),
+                        time_window * 3600 if time_window is not None else None, wilayas)
+
+
+def finish_wilaya(collector: BaseGitHubCollector, journal: ProgressJournal, wilaya: dict, user_count: int):
+    """Journal a saved wilaya, unless the collection plan deferred some of its users or requests failed"""
+    if collector.collection_plan and collector.collection_plan.is_partial(wilaya['code']):
+        return
+    if wilaya['code'] in collector.failed_wilayas:
+        return
+    journal.finish_wilaya(wilaya['code'], user_count)
+
+
+def print_retry_summary(collector: BaseGitHubCollector):
+    """Report retried and failed requests of the run"""
+    print(collector.retry_queue.summary())
+    if collector.circuit_breaker.trips:
+        print(collector.circuit_breaker.summary())
+
+
+async def _collect_all_data_async(collector: AsyncGitHubCollector, wilayas: list,
+                                  journal: ProgressJournal, compress: bool = False) -> bool:
+    """Collect data for all wilayas inside one event loop and connection pool"""
+    succeeded = True
+    async with collector:
+        for wilaya in wilayas:
+            try:
+                users = await collector.collect_wilaya_data(wilaya)
+                save_wilaya(collector, wilaya, users, compress)
+                finish_wilaya(collector, journal, wilaya, len(users))
+                
+            except Exception as e:
+                print(f"Error collecting data for {wilaya['name_en']}: {e}")
+                succeeded = False
+                continue
+    return succeeded
+
+
+async def _collect_wilaya_data_async(collector: AsyncGitHubCollector, wilaya: dict) -> list:
+    """Collect one wilaya with the async collector"""
+    async with collector:
+        return await collector.collect_wilaya_data(wilaya)
+
+
+def check_rate_limit(collector: BaseGitHubCollector) -> int:
+    """Load the remaining budgets of every token from /rate_limit, with either collector"""
+    if isinstance(collector, AsyncGitHubCollector):
+        return asyncio.run(_check_rate_limit_async(collector))
+    return collector.check_rate_limit()
+
+
+async def _check_rate_limit_async(collector: AsyncGitHubCollector) -> int:
+    """Check the rate limit with the async collector"""
+    async with collector:
+        return await collector.check_rate_limit()
+
+
+# Collector of the current --workers process, built by _init_worker
+_worker_collector = None
+
+
+def _worker_settings(collector: BaseGitHubCollector, refresh: bool) -> dict:
+    """
+    Picklable description of a collector, rebuilt in each worker process
+    
+    The data paths are resolved here, since workers started with the spawn
+    method (Windows, macOS) re-import this module and would otherwise see
+    the default paths instead of the ones set by --data-dir.
+    """
+    is_async = isinstance(collector, AsyncGitHubCollector)
+    return {
+        'async': is_async,
+        'concurrency': collector.concurrency if is_async else collector.pool_size,
+        'options': {
+            'tokens': collector.token_pool.tokens,
+            'base_url': collector.base_url,
+            'enrichment': collector.enrichment,
+            'graphql_batch_size': collector.graphql_batch_size,
+            'filter_plan': collector.filter_plan,
+        },
+        'cache': (collector.cache.path, collector.cache.max_bytes) if collector.cache else None,
+        'refresh': refresh,
+        'run_stats': collector.run_stats is not None,
+        'paths': {
+            'rate_leases': str(RATE_LEASES_PATH),
+            'user_store': str(USER_STORE_PATH),
+            'raw_data': str(RAW_DATA_DIR),
+        },
+    }
+
+
+def _init_worker(settings: dict):
+    """Build the collector of a worker process, drawing on the shared rate budget"""
+    global _worker_collector, RATE_LEASES_PATH, USER_STORE_PATH, RAW_DATA_DIR
+    paths = settings['paths']
+    RATE_LEASES_PATH = Path(paths['rate_leases'])
+    USER_STORE_PATH = Path(paths['user_store'])
+    RAW_DATA_DIR = Path(paths['raw_data'])
+    
+    options = dict(settings['options'], rate_coordinator=RateCoordinator(str(RATE_LEASES_PATH)))
+    if settings['cache']:
+        path, max_bytes = settings['cache']
+        options['cache'] = ResponseCache(path, max_bytes=max_bytes)
+    
+    if settings['async']:
+        _worker_collector = AsyncGitHubCollector(concurrency=settings['concurrency'], **options)
+    else:
+        _worker_collector = GitHubCollector(pool_size=settings['concurrency'], **options)
+    if settings['refresh']:
+        _worker_collector.refresh_planner = RefreshPlanner(load_collected_users())
+    if settings['run_stats']:
+        # Kept in memory and returned per wilaya; only the parent writes RUN_STATS_PATH
+        _worker_collector.run_stats = RunStats()
+
+
+def _collect_wilaya_worker(wilaya: dict) -> tuple:
+    """
+    Collect one wilaya in a worker process
+    
+    Returns:
+        Tuple of (users, refresh plan counts or None, retry counts, whether
+        requests failed, run statistics of the wilaya or None)
+    """
+    if isinstance(_worker_collector, AsyncGitHubCollector):
+        users = asyncio.run(_collect_wilaya_data_async(_worker_collector, wilaya))
+    else:
+        users = _worker_collector.collect_wilaya_data(wilaya)
+    planner = _worker_collector.refresh_planner
+    counts = dict(planner.counts) if planner else None
+    if planner:
+        planner.counts = dict.fromkeys(planner.counts, 0)
+    retries = _worker_collector.retry_queue
+    retry_counts = dict(retries.counts)
+    retries.counts = dict.fromkeys(retries.counts, 0)
+    failed = wilaya['code'] in _worker_collector.failed_wilayas
+    run_stats = _worker_collector.run_stats
+    stats = run_stats.wilayas.pop(wilaya['code'], None) if run_stats else None
+    if _worker_collector.cache:
+        _worker_collector.cache.flush_access()
+    return users, counts, retry_counts, failed, stats
+
+
+def _collect_all_data_parallel(collector: BaseGitHubCollector, wilayas: list, journal: ProgressJournal,
+                               workers: int, refresh: bool, compress: bool = False) -> bool:
+    """
+    Collect wilayas in a pool of worker processes
+    
+    Workers share one rate budget per token through the lease table at
+    RATE_LEASES_PATH. Results come back to this process, which resolves
+    cross-wilaya duplicates, saves every wilaya and journals it.
+    """
+    coordinator = RateCoordinator(str(RATE_LEASES_PATH))
+    coordinator.reset()
+    coordinator.close()
+    
+    succeeded = True
+    index = collector.user_index
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(_worker_settings(collector, refresh),)) as executor:
+        futures = {executor.submit(_collect_wilaya_worker, wilaya): wilaya for wilaya in wilayas}
+        for future in as_completed(futures):
+            wilaya = futures[future]
+            try:
+                users, counts, retry_counts, failed, stats = future.result()
+                index.add_candidates([user['username'] for user in users], wilaya['code'])
+                for user in users:
+                    index.add(user)
+                users = index.users_for(wilaya['code'])
+                save_wilaya(collector, wilaya, users, compress)
+                if failed:
+                    collector.failed_wilayas.add(wilaya['code'])
+                else:
+                    journal.finish_wilaya(wilaya['code'], len(users))
+                if counts and collector.refresh_planner:
+                    for state, count in counts.items():
+                        collector.refresh_planner.counts[state] += count
+                for outcome, count in retry_counts.items():
+                    collector.retry_queue.counts[outcome] += count
+                if stats and collector.run_stats:
+                    collector.run_stats.record_wilaya(wilaya['code'], stats['requests'], stats['term_users'],
+                                                      stats['found'], stats['enriched'], stats['reused'],
+                                                      stats['seconds'])
+                
+            except Exception as e:
+                print(f"Error collecting data for {wilaya['name_en']}: {e}")
+                succeeded = False
+                continue
+    return succeeded
+
+
+def collect_all_data(collector: BaseGitHubCollector, config: dict, resume: bool = False,
+                     refresh: bool = False, compress: bool = False, workers: int = 1,
+                     node_shard: NodeShard = None, time_window: float = None):
+    """
+    Collect data for all wilayas
+    
+    Progress is journaled as it happens. With resume=True, finished wilayas
+    are skipped and journaled search pages and users are reused, so an
+    interrupted run continues where it stopped. The journal is deleted once
+    every wilaya has been collected.
+    
+    A user returned by the searches of several wilayas is enriched once and
+    saved only under the wilaya its location matches best.
+    
+    With refresh=True, only users that are new or past their staleness
+    deadline are enriched again; the rest are reused from the stored data.
+    
+    Each wilaya is streamed to an NDJSON file, zstd-compressed when
+    compress=True.
+    
+    With workers > 1, wilayas are collected by that many processes sharing
+    the rate budget of each token. Only finished wilayas are journaled in
+    that mode, and a user found by several wilayas may be enriched by more
+    than one worker before being deduplicated.
+    
+    With a node_shard, only the wilayas this node owns on the hash ring are
+    collected; the outputs of all nodes are combined with merge_node_data.
+    
+    With a time_window (hours), only what the rate budget allows in that
+    time is collected: wilayas by expected ranking value per request, and
+    within the last wilaya that fits, its most valuable and stalest users
+    (see CollectionPlanner). The rest is left in the journal for --resume.
+    User allowances are not enforced by --workers processes.
+    """
     print("Starting data collection for all 69 wilayas...")
     
+    if refresh:
+        attach_refresh_planner(collector)
+    attach_run_stats(collector)
+    attach_rank_index(collector, config)
+    
+    journal = ProgressJournal(str(JOURNAL_PATH), resume=resume)
+    collector.journal = journal
+    
+    assigned = [w for w in config['wilayas'] if node_shard is None or node_shard.owns_wilaya(w['code'])]
+    if node_shard:
+        print(f"Node {node_shard}: {len(assigned)} wilayas assigned")
+    
+    wilayas = [w for w in assigned if not journal.is_finished(w['code'])]
+    if len(wilayas) < len(assigned):
+        print(f"Resuming: {len(assigned) - len(wilayas)} wilayas already collected")
+    
+    collector.user_index = UserIndex(LocationMatcher(config['wilayas']))
     for wilaya in config['wilayas']:
-        try:
-            users = collector.collect_wilaya_data(wilaya)
-            
-            # Save raw data
-            output_path = Path(__file__).parent.parent / 'data' / 'raw' / f"wilaya_{wilaya['code']}.json"
-            collector.save_data(users, str(output_path))
-            
-        except Exception as e:
-            print(f"Error collecting data for {wilaya['name_en']}: {e}")
+        if journal.is_finished(wilaya['code']):
+            collector.user_index.seed(load_wilaya_users(wilaya))
+    
+    plan = None
+    if time_window is not None:
+        plan = plan_collection(collector, config, wilayas, refresh, time_window)
+        print(plan.summary())
+        wilayas = plan.wilayas()
+        if workers == 1:
+            collector.collection_plan = plan
+    
+    if workers > 1:
+        succeeded = _collect_all_data_parallel(collector, wilayas, journal, workers, refresh, compress)
+    elif isinstance(collector, AsyncGitHubCollector):
+        succeeded = asyncio.run(_collect_all_data_async(collector, wilayas, journal, compress))
+    else:
+        succeeded = True
+        for wilaya in wilayas:
+            try:
+                users = collector.collect_wilaya_data(wilaya)
+                
+                # Save raw data
+                save_wilaya(collector, wilaya, users, compress)
+                finish_wilaya(collector, journal, wilaya, len(users))
+                
+            except Exception as e:
+                print(f"Error collecting data for {wilaya['name_en']}: {e}")
+                succeeded = False
+                continue
+    
+    rewrite_stale_wilayas(collector, config, compress)
+    print(f"Collected {len(collector.user_index.users)} unique users")
+    refresh_ranking_snapshot(collector, config)
+    detach_rank_index(collector)
+    collector.journal = None
+    collector.user_index = None
+    collector.run_stats = None
+    collector.collection_plan = None
+    if collector.refresh_planner:
+        print(collector.refresh_planner.summary())
+    print_retry_summary(collector)
+    if not succeeded or collector.failed_wilayas:
+        journal.close()
+        print("Data collection finished with errors; rerun with --resume to retry")
+    elif plan and not plan.complete:
+        journal.close()
+        print("Budget window used up; rerun with --resume to collect the deferred wilayas and users")
+    else:
+        journal.complete()
+        print("Data collection completed!")
+
+
+def national_sweep_wilaya(config: dict) -> dict:
+    """Pseudo-wilaya whose search terms cover the whole country"""
+    return {
+        'code': UNCLASSIFIED_CODE,
+        'name_en': UNCLASSIFIED_NAME,
+        'search_terms': config.get('national_search_terms', NATIONAL_SEARCH_TERMS),
+    }
+
+
+def collect_national_data(collector: BaseGitHubCollector, config: dict, resume: bool = False,
+                          refresh: bool = False, compress: bool = False, node_shard: NodeShard = None):
+    """
+    Collect all wilayas from a single national sweep
+    
+    Only the national search terms are searched (sharded past the result
+    cap), instead of the search terms of every wilaya. Users are then
+    assigned locally to the wilaya their profile location names; users
+    whose location names no wilaya are saved under code 00. Profiles that
+    give a city but not the country are not returned by the sweep.
+    
+    With a node_shard, every node takes the same splitting decisions but
+    only pages through, and enriches, the search shards it owns.
+    """
+    print("Starting national sweep...")
+    
+    collector.node_shard = node_shard
+    if node_shard:
+        print(f"Node {node_shard}: collecting its share of the search shards")
+    
+    if refresh:
+        attach_refresh_planner(collector)
+    attach_run_stats(collector)
+    attach_rank_index(collector, config)
+    
+    journal = ProgressJournal(str(JOURNAL_PATH), resume=resume)
+    collector.journal = journal
+    sweep = national_sweep_wilaya(config)
+    
+    try:
+        if isinstance(collector, AsyncGitHubCollector):
+            users = asyncio.run(_collect_wilaya_data_async(collector, sweep))
+        else:
+            users = collector.collect_wilaya_data(sweep)
+    except Exception as e:
+        print(f"Error during national sweep: {e}")
+        detach_rank_index(collector)
+        journal.close()
+        print("National sweep finished with errors; rerun with --resume to retry")
+        return
+    finally:
+        collector.journal = None
+        collector.run_stats = None
+    
+    by_code = LocationMatcher(config['wilayas']).assign(users)
+    for wilaya in config['wilayas'] + [sweep]:
+        save_wilaya(collector, wilaya, by_code.get(wilaya['code'], []), compress)
+    refresh_ranking_snapshot(collector, config)
+    detach_rank_index(collector)
+    
+    if collector.refresh_planner:
+        print(collector.refresh_planner.summary())
+    print_retry_summary(collector)
+    if collector.failed_wilayas:
+        journal.close()
+        print("National sweep finished with failed requests; rerun with --resume to retry them")
+        return
+    journal.complete()
+    print(f"National sweep completed: {len(users)} users, "
+          f"{len(by_code.get(UNCLASSIFIED_CODE, []))} without a recognizable wilaya")
+
+
+def merge_node_data(config: dict, node_dirs: list, compress: bool = False):
+    """
+    Merge the raw data of several nodes into one dataset
+    
+    Every login is kept once: its most recently collected record, under the
+    wilaya its location matches best among the wilayas that found it. The
+    result replaces the raw data in RAW_DATA_DIR (or the user store, once
+    migrated). Nodes with a user store are read from it.
+    
+    Args:
+        config: Wilayas configuration
+        node_dirs: Data directories of the nodes (or their raw/ subdirectories)
+        compress: Write zstd-compressed files
+    """
+    index = UserIndex(LocationMatcher(config['wilayas']))
+    for node_dir in node_dirs:
+        node_store = Path(node_dir) / USER_STORE_PATH.name
+        if node_store.exists():
+            print(f"Merging the user store {node_store}")
+            index.seed(iter_stored_users(node_store))
             continue
+        raw_dir = Path(node_dir) / 'raw' if (Path(node_dir) / 'raw').is_dir() else Path(node_dir)
+        print(f"Merging {len(raw_data_files(raw_dir))} wilaya files from {raw_dir}")
+        index.seed(iter_all_raw_users(raw_dir))
+    
+    by_code = defaultdict(list)
+    for user in index.resolved_users():
+        by_code[user['wilaya_code']].append(user)
+    
+    sweep = national_sweep_wilaya(config)
+    if USER_STORE_PATH.exists():
+        store = UserStore(str(USER_STORE_PATH))
+        try:
+            for wilaya in config['wilayas'] + [sweep]:
+                store.replace_wilaya(wilaya['code'], by_code.get(wilaya['code'], []))
+        finally:
+            store.close()
+        print(f"Merged {len(index.users)} unique users into {USER_STORE_PATH}")
+        write_ranking_snapshot(config)
+        if RANK_INDEX_PATH.exists():
+            build_rank_index(config)
+        return
+    
+    for wilaya in config['wilayas'] + [sweep]:
+        users = by_code.get(wilaya['code'], [])
+        if users or wilaya is not sweep:
+            write_raw_users(str(wilaya_output_path(wilaya, compress)), users)
     
-    print("Data collection completed!")
+    print(f"Merged {len(index.users)} unique users into {RAW_DATA_DIR}")
+    write_ranking_snapshot(config)
 
 
-def collect_wilaya_data(collector: GitHubCollector, config: dict, wilaya_name: str):
-    """Collect data for specific wilaya"""
+def wilaya_journal_path(wilaya: dict) -> Path:
+    """Journal of a single-wilaya --collect run, kept apart from the --collect-all journal"""
+    return JOURNAL_PATH.with_name(f"collect_wilaya_{wilaya['code']}.jsonl")
+
+
+def collect_wilaya_data(collector: BaseGitHubCollector, config: dict, wilaya_name: str,
+                        resume: bool = False, refresh: bool = False, compress: bool = False):
+    """
+    Collect data for specific wilaya
+    
+    Search pages and enriched users are journaled as they are fetched, so
+    an interrupted run continues with --resume instead of starting over.
+    The journal is deleted once the wilaya is saved without failures.
+    """
     wilaya = next((w for w in config['wilayas'] if w['name_en'].lower() == wilaya_name.lower()), None)
     
     if not wilaya:
@@ -51,34 +806,134 @@ def collect_wilaya_data(collector: GitHubCollector, config: dict, wilaya_name: s
         return
     
     print(f"Collecting data for {wilaya['name_en']}...")
-    users = collector.collect_wilaya_data(wilaya)
+    if refresh:
+        attach_refresh_planner(collector)
+    attach_run_stats(collector)
+    attach_rank_index(collector, config)
     
-    output_path = Path(__file__).parent.parent / 'data' / 'raw' / f"wilaya_{wilaya['code']}.json"
-    collector.save_data(users, str(output_path))
+    journal = ProgressJournal(str(wilaya_journal_path(wilaya)), resume=resume)
+    collector.journal = journal
+    try:
+        if isinstance(collector, AsyncGitHubCollector):
+            users = asyncio.run(_collect_wilaya_data_async(collector, wilaya))
+        else:
+            users = collector.collect_wilaya_data(wilaya)
+    except Exception as e:
+        print(f"Error collecting data for {wilaya['name_en']}: {e}")
+        detach_rank_index(collector)
+        journal.close()
+        print("Collection finished with errors; rerun with --resume to continue it")
+        return
+    finally:
+        collector.journal = None
     
+    # One wilaya is not worth rewriting every user's snapshot; generate_rankings reads the
+    # rank index, or notices the stale snapshot and ranks from the collected data
+    save_collected_wilaya(collector, config, wilaya, users, compress)
+    detach_rank_index(collector)
+    
+    print_retry_summary(collector)
+    if wilaya['code'] in collector.failed_wilayas:
+        journal.close()
+        print("Collection finished with failed requests; rerun with --resume to retry them")
+        return
+    journal.complete()
     print(f"Data collection completed for {wilaya['name_en']}")
 
 
-def generate_rankings(config: dict, category: str = None):
-    """Generate rankings from collected data"""
-    print("Generating rankings...")
+def ingest_contributions(collector: BaseGitHubCollector, config: dict):
+    """
+    Count the public contributions of every stored user from their events feed
     
-    processor = RankingProcessor(config)
-    generator = MarkdownGenerator(config)
+    Contributions accumulate per day in CONTRIBUTIONS_PATH. Each poll
+    resumes at the newest event counted last time, and unchanged feeds are
+    answered with free 304s, so repeated runs cost little rate budget.
+    The new counts are applied to the rank index, if one was built.
+    """
+    logins = list(dict.fromkeys(user['username'] for user in load_collected_users()))
+    print(f"Polling public events of {len(logins)} users...")
     
-    # Load all collected data
-    data_dir = Path(__file__).parent.parent / 'data' / 'raw'
-    all_users = []
+    # /rate_limit is free and loads the real remaining budgets before polling
+    check_rate_limit(collector)
+    rank_index = load_rank_index(config)
+    store = ContributionStore(str(CONTRIBUTIONS_PATH))
+    collector.contribution_store = store
+    try:
+        if isinstance(collector, AsyncGitHubCollector):
+            counts = asyncio.run(_ingest_contributions_async(collector, logins))
+        else:
+            counts = collector.ingest_contributions(logins)
+        store.prune()
+    finally:
+        collector.contribution_store = None
+        store.close()
     
-    for json_file in data_dir.glob('wilaya_*.json'):
-        with open(json_file, 'r', encoding='utf-8') as f:
-            users = json.load(f)
-            all_users.extend(users)
+    print(f"Contributions: {counts['polled']} users polled, {counts['unchanged']} feeds unchanged, "
+          f"{counts['contributions']} new contributions counted")
+    if rank_index is not None:
+        try:
+            rank_index.processor.contributions = load_contributions()
+            changed = rank_index.apply(load_collected_users())
+            print(f"Rank index: {changed['updated']} users rescored")
+        finally:
+            rank_index.close()
+    print_retry_summary(collector)
+
+
+async def _ingest_contributions_async(collector: AsyncGitHubCollector, logins: list) -> dict:
+    """Poll events with the async collector"""
+    async with collector:
+        return await collector.ingest_contributions(logins)
+
+
+def load_contributions() -> dict:
+    """Rolling contribution counts of every polled user, empty if events were never polled"""
+    if not CONTRIBUTIONS_PATH.exists():
+        return {}
+    store = ContributionStore(str(CONTRIBUTIONS_PATH))
+    try:
+        return store.counts()
+    finally:
+        store.close()
+
+
+def dry_run(collector: BaseGitHubCollector, config: dict, wilayas: list, refresh: bool = False,
+            time_window: float = None):
+    """Print the plan, predicted requests and wall-clock time of a collection without collecting"""
+    plan = plan_collection(collector, config, wilayas, refresh, time_window)
+    print(plan.summary())
+
+
+def generate_rankings(config: dict, category: str = None, national_top: int = NATIONAL_TOP,
+                      wilaya_top: int = WILAYA_TOP):
+    """Generate rankings from collected data, keeping the top users of each national and wilaya leaderboard"""
+    print("Generating rankings...")
     
-    print(f"Loaded {len(all_users)} users from collected data")
+    processor = RankingProcessor(config, contributions=load_contributions(),
+                                 national_top=national_top, wilaya_top=wilaya_top)
+    generator = MarkdownGenerator(config)
     
-    # Process rankings
-    rankings = processor.process_rankings(all_users)
+    index = load_rank_index(config)
+    snapshot = load_ranking_snapshot() if index is None else None
+    if index is not None:
+        print(f"Loaded the rank index of {len(index)} users")
+        store = UserStore(str(USER_STORE_PATH))
+        try:
+            rankings = index.rankings(store.get, national_top, wilaya_top)
+        finally:
+            store.close()
+            index.close()
+    elif snapshot is not None:
+        print(f"Loaded {len(snapshot)} users from the ranking snapshot")
+        rankings = processor.process_snapshot(snapshot)
+    else:
+        # Load all collected data
+        all_users = deduplicate_users(load_collected_users(), config)
+        
+        print(f"Loaded {len(all_users)} users from collected data")
+        
+        # Process rankings
+        rankings = processor.process_rankings(all_users)
     
     # Generate markdown files
     if category:
@@ -97,46 +952,165 @@ def main():
     parser.add_argument('--generate-all', action='store_true', help='Generate all rankings')
     parser.add_argument('--generate', action='store_true', help='Generate specific category ranking')
     parser.add_argument('--category', type=str, help='Ranking category')
+    parser.add_argument('--national-top', type=int, default=NATIONAL_TOP,
+                        help='Users listed in each national leaderboard')
+    parser.add_argument('--wilaya-top', type=int, default=WILAYA_TOP,
+                        help='Users listed in each wilaya leaderboard')
     parser.add_argument('--check-rate-limit', action='store_true', help='Check GitHub API rate limit')
+    parser.add_argument('--tokens-file', type=str,
+                        help='File with one GitHub token per line to rotate between')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the conditional-request response cache')
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help='Size bound of the on-disk response cache in MB')
+    parser.add_argument('--graphql', action='store_true',
+                        help='Enrich users with batched GraphQL queries instead of per-user REST calls')
+    parser.add_argument('--graphql-batch-size', type=int, default=25,
+                        help='Users per GraphQL enrichment query')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted --collect-all, --national or --collect run '
+                             'from its journal')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Incremental collection: only re-enrich new or stale users')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the predicted requests and wall-clock time of the collection, then stop')
+    parser.add_argument('--time-window', type=float, metavar='HOURS',
+                        help='Only collect what the rate budget allows in this many hours, '
+                             'most valuable wilayas and users first (--collect-all)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Collect wilayas in N processes sharing one rate budget (--collect-all)')
+    parser.add_argument('--shard', type=str,
+                        help='Collect only this node\'s share i/N of the wilayas (or of the --national sweep)')
+    parser.add_argument('--merge', nargs='+', metavar='NODE_DIR',
+                        help='Merge the data directories of several nodes into one dataset')
+    parser.add_argument('--data-dir', type=str,
+                        help='Directory for raw data and the journal (default: data/)')
+    parser.add_argument('--migrate-users', action='store_true',
+                        help='Load the raw data files into the SQLite user store, which replaces them from then on')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Rebuild the columnar ranking snapshot from the collected users')
+    parser.add_argument('--rank-index', action='store_true',
+                        help='Build the rank index, which later collections update user by user')
+    parser.add_argument('--contributions', action='store_true',
+                        help='Count public contributions of stored users from their events feed (ETag-polled)')
+    parser.add_argument('--national', action='store_true',
+                        help='Collect all wilayas from one national search, assigning users by location')
+    parser.add_argument('--zstd', action='store_true',
+                        help='Compress raw data files with zstd (requires the zstandard package)')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Collect with the asyncio engine (concurrent, pooled connections)')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Maximum in-flight requests for --async collection')
     
     args = parser.parse_args()
     
     # Load configuration
     config = load_wilayas_config()
     
+    if args.zstd and not zstd_available():
+        print("Error: --zstd requires the zstandard package (pip install zstandard)")
+        return
+    
+    if args.data_dir:
+        use_data_dir(Path(args.data_dir))
+    
+    node_shard = None
+    if args.shard:
+        try:
+            node_shard = NodeShard.parse(args.shard)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    
+    # Merging and migrating need no API access
+    if args.merge:
+        merge_node_data(config, args.merge, compress=args.zstd)
+        return
+    
+    if args.migrate_users:
+        migrate_raw_data(config)
+        return
+    
+    if args.snapshot:
+        write_ranking_snapshot(config)
+        return
+    
+    if args.rank_index:
+        build_rank_index(config)
+        return
+    
     # Initialize collector
     try:
-        collector = GitHubCollector()
-    except ValueError as e:
+        tokens = load_tokens(tokens_file=args.tokens_file)
+        cache = None
+        if not args.no_cache:
+            cache = ResponseCache(str(CACHE_PATH), max_bytes=args.cache_max_mb * 1024 * 1024)
+        options = {
+            'tokens': tokens,
+            'cache': cache,
+            'enrichment': 'graphql' if args.graphql else 'rest',
+            'graphql_batch_size': args.graphql_batch_size,
+            'filter_plan': FilterPlan.from_config(config),
+        }
+        if args.use_async:
+            collector = AsyncGitHubCollector(concurrency=args.concurrency, **options)
+        else:
+            collector = GitHubCollector(**options)
+    except (ValueError, OSError) as e:
         print(f"Error: {e}")
-        print("Please set GITHUB_TOKEN environment variable")
+        print("Please set GITHUB_TOKEN (or GITHUB_TOKENS / --tokens-file)")
         return
     
     # Execute commands
     if args.check_rate_limit:
-        remaining = collector.check_rate_limit()
+        remaining = check_rate_limit(collector)
         print(f"GitHub API rate limit remaining: {remaining}")
     
-    elif args.collect_all:
-        collect_all_data(collector, config)
+    elif args.dry_run:
+        if args.national:
+            wilayas = [national_sweep_wilaya(config)]
+        elif args.collect:
+            wilayas = [w for w in config['wilayas'] if w['name_en'].lower() == (args.wilaya or '').lower()]
+        else:
+            wilayas = [w for w in config['wilayas'] if node_shard is None or node_shard.owns_wilaya(w['code'])]
+        if not wilayas:
+            print("Error: nothing to plan (use --collect-all, --national or --collect --wilaya NAME)")
+            return
+        dry_run(collector, config, wilayas, refresh=args.refresh, time_window=args.time_window)
+    
+    elif args.contributions:
+        ingest_contributions(collector, config)
+    
+    elif args.national:
+        collect_national_data(collector, config, resume=args.resume, refresh=args.refresh,
+                              compress=args.zstd, node_shard=node_shard)
+    
+    elif args.collect_all or ((args.refresh or args.time_window is not None) and not args.collect):
+        collect_all_data(collector, config, resume=args.resume, refresh=args.refresh,
+                         compress=args.zstd, workers=args.workers, node_shard=node_shard,
+                         time_window=args.time_window)
     
     elif args.collect:
         if not args.wilaya:
             print("Error: --wilaya required with --collect")
             return
-        collect_wilaya_data(collector, config, args.wilaya)
+        collect_wilaya_data(collector, config, args.wilaya, resume=args.resume, refresh=args.refresh,
+                            compress=args.zstd)
     
     elif args.generate_all:
-        generate_rankings(config)
+        generate_rankings(config, national_top=args.national_top, wilaya_top=args.wilaya_top)
     
     elif args.generate:
         if not args.category:
             print("Error: --category required with --generate")
             return
-        generate_rankings(config, args.category)
+        generate_rankings(config, args.category, national_top=args.national_top, wilaya_top=args.wilaya_top)
     
     else:
         parser.print_help()
+    
+    if cache:
+        cache.close()
 
 
 if __name__ == '__main__':
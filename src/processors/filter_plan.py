@@ -0,0 +1,60 @@
+"""
+Filter Plan
+Compiles the ranking minimum thresholds once, so the collector can push
+them down into search queries and the processor applies the same rules
+"""
+
+from typing import Dict
+
+
+class FilterPlan:
+    """
+    Minimum thresholds a user must meet to be ranked
+    
+    The followers threshold becomes the lower bound of every search shard
+    and the repositories threshold a `repos:>=N` qualifier, so users who
+    could never be ranked are not returned by the search at all.
+    """
+    
+    def __init__(self, min_followers: int = 0, min_repos: int = 0):
+        self.min_followers = min_followers
+        self.min_repos = min_repos
+    
+    @classmethod
+    def from_config(cls, config: Dict) -> 'FilterPlan':
+        """Build the plan from the `minimum_thresholds` of the wilayas config"""
+        thresholds = config.get('minimum_thresholds', {})
+        return cls(min_followers=thresholds.get('followers', 0),
+                   min_repos=thresholds.get('repositories', 0))
+    
+    def search_qualifiers(self) -> str:
+        """
+        Search qualifiers enforced on top of the shard's followers range
+        
+        Returns:
+            Qualifier string, empty when there is nothing to push down
+        """
+        return f'repos:>={self.min_repos}' if self.min_repos > 0 else ''
+    
+    def matches(self, user: Dict) -> bool:
+        """
+        Whether a user meets every threshold
+        
+        Args:
+            user: Stored user record or /users/{login} details (same field names)
+        """
+        return (user.get('followers', 0) >= self.min_followers and
+                user.get('public_repos', 0) >= self.min_repos)
+    
+    def mask(self, followers, public_repos):
+        """
+        Vectorized `matches` over snapshot columns
+        
+        Args:
+            followers: Array of follower counts
+            public_repos: Array of public repository counts
+        
+        Returns:
+            Boolean array, True for users meeting every threshold
+        """
+        return (followers >= self.min_followers) & (public_repos >= self.min_repos)
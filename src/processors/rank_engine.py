@@ -0,0 +1,116 @@
+"""
+Rank Engine
+Vectorized ordering of score columns: national top-N and grouped
+per-wilaya rankings, with the same tie order as a stable descending sort
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def descending_order(scores: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Row indices by descending score, ties kept in row order
+    
+    Matches `sorted(rows, key=score, reverse=True)`. With a limit, the
+    limit-th highest score is found by partial selection (O(n)) and only
+    the rows that make the cut are sorted: every row scoring above it, then
+    the earliest rows tied with it, so at most `limit` rows are sorted.
+    
+    Args:
+        scores: Score of every row
+        limit: Number of leading rows wanted (default: all)
+    
+    Returns:
+        Array of row indices
+    """
+    if limit is not None and limit < len(scores):
+        if limit <= 0:
+            return np.zeros(0, dtype=np.intp)
+        cutoff = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        above = np.flatnonzero(scores > cutoff)
+        tied = np.flatnonzero(scores == cutoff)[:limit - len(above)]
+        return np.concatenate([above[np.argsort(-scores[above], kind='stable')], tied])
+    return np.argsort(-scores, kind='stable')
+
+
+def _packed_order(groups: np.ndarray, scores: np.ndarray) -> Optional[np.ndarray]:
+    """Order by (group, descending score, row) through one int64 key sort, or None if the key does not fit"""
+    size = len(scores)
+    if not size or not np.issubdtype(scores.dtype, np.integer) or not np.issubdtype(groups.dtype, np.integer):
+        return None
+    group_min, group_max = int(groups.min()), int(groups.max())
+    score_min, score_max = int(scores.min()), int(scores.max())
+    score_span = score_max - score_min + 1
+    if (group_max - group_min + 1) * score_span * size >= 2 ** 63:
+        return None
+    keys = (groups.astype(np.int64) - group_min) * score_span + (score_max - scores.astype(np.int64))
+    keys *= size
+    keys += np.arange(size, dtype=np.int64)
+    keys.sort()
+    return keys % size
+
+
+def grouped_descending_order(groups: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Order rows by group, then descending score, ties kept in row order
+    
+    One sort replaces a sort per group. Integer scores are packed with
+    their group and row index into a single int64 key, unique per row, so a
+    plain in-place sort of the keys gives the stable order; otherwise (or
+    if the key would overflow) a lexsort is used.
+    
+    Args:
+        groups: Integer group of every row
+        scores: Score of every row
+    
+    Returns:
+        Tuple of (row indices, start offset of each group in them,
+        group of each of those groups), groups ascending
+    """
+    order = _packed_order(groups, scores)
+    if order is None:
+        order = np.lexsort((-scores, groups))
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(order) else \
+        np.zeros(0, dtype=np.intp)
+    return order, starts, sorted_groups[starts]
+
+
+def ranks_within_groups(starts: np.ndarray, size: int) -> np.ndarray:
+    """
+    1-based rank of every position of a grouped order
+    
+    Args:
+        starts: Start offset of each group, as returned by grouped_descending_order
+        size: Number of ordered rows
+    
+    Returns:
+        Rank of the row at each position within its group
+    """
+    positions = np.arange(size)
+    group_start = np.repeat(starts, np.diff(np.r_[starts, size]))
+    return positions - group_start + 1
+
+
+def group_spans(groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Rows of every group, without ordering them by score
+    
+    Args:
+        groups: Integer group of every row
+    
+    Returns:
+        Tuple of (row indices grouped, in row order within each group,
+        start offset of each group in them, group of each of those groups)
+    """
+    keys = groups
+    if len(groups) and 0 <= groups.min() and groups.max() < 2 ** 15:
+        # Small non-negative groups (wilayas) stable-sort in linear time as int16
+        keys = groups.astype(np.int16)
+    order = np.argsort(keys, kind='stable')
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(order) else \
+        np.zeros(0, dtype=np.intp)
+    return order, starts, sorted_groups[starts]
@@ -0,0 +1,487 @@
+"""
+Rank Index
+Persistent order-statistic index of every category's national and
+per-wilaya rankings, updated user by user from collection deltas in
+O(log n) instead of re-ranking every user
+"""
+
+import os
+import json
+import heapq
+import sqlite3
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Callable, Iterable, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+from sortedcontainers import SortedList
+
+from .ranking_processor import RankingProcessor, SCORE_COLUMNS, NATIONAL_TOP, WILAYA_TOP
+from .rank_engine import group_spans
+from .rank_table import RankTable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# A rank key packs a descending score with the user's sequence number:
+# -score * SEQ_SPAN + seq, so keys sort best score first, ties by sequence
+SEQ_SPAN = 2 ** 32
+
+# Stored score of a user not ranked in a category (see RankingProcessor.is_ranked)
+UNRANKED = np.iinfo(np.int64).min
+
+
+def rank_key(score: int, seq: int) -> int:
+    """Sort key of a user scoring `score` with sequence number `seq`"""
+    return -score * SEQ_SPAN + seq
+
+
+def split_key(key: int) -> Tuple[int, int]:
+    """(score, seq) of a rank key"""
+    seq = key % SEQ_SPAN
+    return -(key - seq) // SEQ_SPAN, seq
+
+
+def _sorted_keys(scores: np.ndarray, seqs: np.ndarray) -> np.ndarray:
+    """Sorted rank keys of score/sequence columns (int64, or Python ints if a key would overflow it)"""
+    if len(scores) and (scores.max() >= 2 ** 31 or scores.min() <= -2 ** 31):
+        return np.array(sorted(rank_key(score, seq) for score, seq in zip(scores.tolist(), seqs.tolist())),
+                        dtype=object)
+    keys = -scores.astype(np.int64) * SEQ_SPAN + seqs.astype(np.int64)
+    keys.sort()
+    return keys
+
+
+class RankKeys:
+    """
+    Sorted rank keys of one ranking
+    
+    The keys loaded with the index stay in a sorted array; keys added or
+    removed since are kept in two SortedLists. A key's position is the
+    number of loaded keys before it, minus the removed and plus the added
+    ones before it, so every change and lookup is a few bisections and the
+    loaded array is never copied.
+    """
+    
+    def __init__(self, base: Optional[np.ndarray] = None):
+        self.base = base if base is not None else np.zeros(0, dtype=np.int64)
+        self.added = SortedList()
+        self.removed = SortedList()
+    
+    def __len__(self) -> int:
+        return len(self.base) - len(self.removed) + len(self.added)
+    
+    def add(self, key: int):
+        """Insert a key not already present"""
+        position = self.removed.bisect_left(key)
+        if position < len(self.removed) and self.removed[position] == key:
+            del self.removed[position]
+        else:
+            self.added.add(key)
+    
+    def remove(self, key: int):
+        """Delete a present key"""
+        position = self.added.bisect_left(key)
+        if position < len(self.added) and self.added[position] == key:
+            del self.added[position]
+        else:
+            self.removed.add(key)
+    
+    def position(self, key: int) -> int:
+        """Number of keys before `key`, in O(log n)"""
+        return int(np.searchsorted(self.base, key)) - self.removed.bisect_left(key) + self.added.bisect_left(key)
+    
+    def head(self, limit: Optional[int] = None) -> List[int]:
+        """First `limit` keys in order (all if None)"""
+        stop = None if limit is None else limit + len(self.removed)
+        base = self.base[:stop].tolist()
+        if self.removed:
+            removed = set(self.removed)
+            base = [key for key in base if key not in removed]
+        if not self.added:
+            return base[:limit]
+        return list(islice(heapq.merge(base, self.added), limit))
+
+
+class RankIndex:
+    """
+    Order-statistic index of the rankings of every category
+    
+    Each category keeps sorted rank keys nationally (under the wilaya code
+    None) and per wilaya. A user's rank is the number of keys before its
+    own, so ranks are read, and users inserted, moved or removed, in
+    O(log n) (see RankKeys).
+    
+    Ties keep the order users entered the index (their sequence number):
+    an index built from the ranking snapshot ranks exactly as
+    RankingProcessor.process_snapshot, and users added later rank after
+    the users they tie with.
+    
+    Every indexed user's wilaya and category scores (packed int64, in
+    category order) are kept in SQLite at `path`, and the sorted keys
+    rebuilt from them when the index is opened. Scores are computed by
+    `processor` (its thresholds decide who is ranked and its contribution
+    counts are used), and an index is only valid for the categories and
+    thresholds it was built with (see `matches`).
+    """
+    
+    def __init__(self, path: str, processor: RankingProcessor):
+        self.path = path
+        self.processor = processor
+        self.categories = [category_config['id'] for category_config in processor.categories]
+        self.fingerprint = json.dumps({'categories': self.categories, 'thresholds': processor.thresholds},
+                                      sort_keys=True)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' login TEXT PRIMARY KEY,'
+            ' seq INTEGER NOT NULL,'
+            ' wilaya_code TEXT NOT NULL,'
+            ' scores BLOB NOT NULL)'
+        )
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self.conn.commit()
+        
+        # login -> (seq, wilaya_code, packed scores), as stored
+        self.entries: Dict[str, Tuple[int, str, bytes]] = {}
+        self.logins: Dict[int, str] = {}
+        # category -> wilaya code (None: national) -> sorted rank keys
+        self.keys: Dict[str, Dict[Optional[str], RankKeys]] = {}
+        # wilaya code -> logins of its indexed users
+        self.wilaya_members: Dict[str, set] = {}
+        self.next_seq = 0
+        if self.matches():
+            self._load()
+        else:
+            self._index([], np.zeros(0, dtype=np.int64), [], [])
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, login: str) -> bool:
+        return login in self.entries
+    
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_meta(self, values: Dict[str, str]):
+        self.conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', values.items())
+    
+    def matches(self) -> bool:
+        """Whether the stored index was built for the processor's categories and thresholds"""
+        return self._meta('fingerprint') == self.fingerprint
+    
+    def _load(self):
+        """Rebuild the sorted keys from the stored entries"""
+        rows = self.conn.execute('SELECT login, seq, wilaya_code, scores FROM entries').fetchall()
+        logins, seqs, codes, scores = zip(*rows) if rows else ((), (), (), ())
+        self._index(list(logins), np.array(seqs, dtype=np.int64), list(codes), list(scores))
+        self.next_seq = int(self._meta('next_seq') or 0)
+        logger.info(f"Loaded a rank index of {len(self.entries)} users from {self.path}")
+    
+    def _index(self, logins: List[str], seqs: np.ndarray, codes: List[str], packed: List[bytes]):
+        """Replace the in-memory index with the given users"""
+        seq_list = seqs.tolist()
+        self.entries = dict(zip(logins, zip(seq_list, codes, packed)))
+        scores = np.frombuffer(b''.join(packed), dtype=np.int64).reshape(len(logins), len(self.categories))
+        self.logins = dict(zip(seq_list, logins))
+        
+        wilaya_codes, groups = np.unique(np.array(codes, dtype=str), return_inverse=True)
+        members, starts, start_groups = group_spans(groups.reshape(-1))
+        ends = np.r_[starts[1:], len(members)].tolist()
+        spans = [(wilaya_codes[group].item(), members[start:end])
+                 for group, start, end in zip(start_groups.tolist(), starts.tolist(), ends)]
+        self.wilaya_members = {code: {logins[row] for row in rows.tolist()} for code, rows in spans}
+        for column, category in enumerate(self.categories):
+            ranked = scores[:, column] != UNRANKED
+            self.keys[category] = {None: RankKeys(_sorted_keys(scores[ranked, column], seqs[ranked]))}
+            for code, rows in spans:
+                rows = rows[ranked[rows]]
+                if len(rows):
+                    self.keys[category][code] = RankKeys(_sorted_keys(scores[rows, column], seqs[rows]))
+    
+    def build(self, logins: Sequence[str], columns: Dict[str, np.ndarray], wilaya_codes: Sequence[str]) -> int:
+        """
+        Replace the whole index with the given users
+        
+        Users are numbered in the order given, which sets the tie order.
+        
+        Args:
+            logins: Logins of users meeting the minimum thresholds
+            columns: SCORE_COLUMNS of the users
+            wilaya_codes: Wilaya code of every user
+        
+        Returns:
+            Number of users indexed
+        """
+        scores = self.processor.score_columns(columns, list(logins) if self.processor.contributions else [])
+        matrix = np.column_stack([np.asarray(scores[category], dtype=np.int64) for category in self.categories]) \
+            if self.categories else np.zeros((len(logins), 0), dtype=np.int64)
+        for column, category in enumerate(self.categories):
+            population = self.processor.ranked_rows(category, list(logins) if self.processor.contributions else [])
+            if population is not None:
+                unranked = np.ones(len(logins), dtype=bool)
+                unranked[population] = False
+                matrix[unranked, column] = UNRANKED
+        seqs = np.arange(len(logins), dtype=np.int64)
+        packed = [row.tobytes() for row in matrix]
+        
+        with self.conn:
+            self.conn.execute('DELETE FROM entries')
+            self.conn.executemany(
+                'INSERT INTO entries (login, seq, wilaya_code, scores) VALUES (?, ?, ?, ?)',
+                zip(logins, seqs.tolist(), wilaya_codes, packed)
+            )
+            self._set_meta({'fingerprint': self.fingerprint, 'next_seq': str(len(logins)),
+                            'updated_at': datetime.utcnow().isoformat()})
+        
+        self._index(list(logins), seqs, list(wilaya_codes), packed)
+        self.next_seq = len(logins)
+        logger.info(f"Built a rank index of {len(logins)} users in {self.path}")
+        return len(logins)
+    
+    def build_from_snapshot(self, snapshot) -> int:
+        """
+        Replace the whole index with the users of a columnar snapshot
+        
+        Args:
+            snapshot: ColumnarSnapshot of the collected users
+        
+        Returns:
+            Number of users indexed
+        """
+        indices = np.flatnonzero(self.processor.filter_plan.mask(snapshot.column('followers'),
+                                                                 snapshot.column('public_repos')))
+        columns = {name: np.asarray(snapshot.column(name)[indices]) for name in SCORE_COLUMNS}
+        codes = [f'{code:02d}' for code in snapshot.column('wilaya_code')[indices].tolist()]
+        return self.build([snapshot.login(i) for i in indices.tolist()], columns, codes)
+    
+    def _entry(self, user: Dict) -> Optional[Tuple[str, bytes]]:
+        """(wilaya_code, packed scores) of a user, or None if it does not meet the thresholds"""
+        if not self.processor.filter_plan.matches(user):
+            return None
+        scores = [int(self.processor.calculate_score(user, category) or 0)
+                  if self.processor.is_ranked(user, category) else UNRANKED
+                  for category in self.categories]
+        return user.get('wilaya_code', '00'), np.array(scores, dtype=np.int64).tobytes()
+    
+    def _scores(self, login: str) -> List[int]:
+        """Scores of an indexed user, in category order"""
+        return np.frombuffer(self.entries[login][2], dtype=np.int64).tolist()
+    
+    def _insert(self, login: str, seq: int, code: str, packed: bytes):
+        self.entries[login] = (seq, code, packed)
+        self.logins[seq] = login
+        self.wilaya_members.setdefault(code, set()).add(login)
+        for category, score in zip(self.categories, np.frombuffer(packed, dtype=np.int64).tolist()):
+            if score == UNRANKED:
+                continue
+            key = rank_key(score, seq)
+            self.keys[category][None].add(key)
+            self.keys[category].setdefault(code, RankKeys()).add(key)
+    
+    def _remove(self, login: str):
+        scores = self._scores(login)
+        seq, code, _ = self.entries.pop(login)
+        del self.logins[seq]
+        members = self.wilaya_members[code]
+        members.discard(login)
+        if not members:
+            del self.wilaya_members[code]
+        for category, score in zip(self.categories, scores):
+            if score == UNRANKED:
+                continue
+            key = rank_key(score, seq)
+            self.keys[category][None].remove(key)
+            wilaya = self.keys[category][code]
+            wilaya.remove(key)
+            if not len(wilaya):
+                del self.keys[category][code]
+    
+    def apply(self, upserts: Iterable[Dict] = (), deletes: Iterable[str] = ()) -> Dict[str, int]:
+        """
+        Apply a collection delta, in one transaction
+        
+        Upserted users are scored and moved to their new place in every
+        ranking of their category and wilaya; users whose wilaya and scores
+        did not change are left alone, and users below the thresholds are
+        removed.
+        
+        Args:
+            upserts: Collected user records (with 'username' and 'wilaya_code')
+            deletes: Logins of users no longer collected
+        
+        Returns:
+            Dictionary with the number of users added, updated, removed and unchanged
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        # Final stored state of every login the delta changed: its row, or None once removed
+        final = {}
+        
+        for user in upserts:
+            login = user['username']
+            entry = self._entry(user)
+            current = self.entries.get(login)
+            if entry is None:
+                if current is not None:
+                    self._remove(login)
+                    final[login] = None
+                    counts['removed'] += 1
+                continue
+            if current is not None and current[1:] == entry:
+                counts['unchanged'] += 1
+                continue
+            if current is not None:
+                seq = current[0]
+                self._remove(login)
+                counts['updated'] += 1
+            else:
+                seq = self.next_seq
+                self.next_seq += 1
+                counts['added'] += 1
+            self._insert(login, seq, *entry)
+            final[login] = (login, seq) + entry
+        
+        for login in deletes:
+            if login in self.entries:
+                self._remove(login)
+                final[login] = None
+                counts['removed'] += 1
+        
+        writes = [row for row in final.values() if row is not None]
+        removals = [(login,) for login, row in final.items() if row is None]
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO entries (login, seq, wilaya_code, scores) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(login) DO UPDATE SET seq = excluded.seq, wilaya_code = excluded.wilaya_code, '
+                'scores = excluded.scores',
+                writes
+            )
+            self.conn.executemany('DELETE FROM entries WHERE login = ?', removals)
+            self._set_meta({'next_seq': str(self.next_seq), 'updated_at': datetime.utcnow().isoformat()})
+        return counts
+    
+    def members(self, wilaya_code: str) -> List[str]:
+        """Logins of the indexed users of a wilaya"""
+        return list(self.wilaya_members.get(wilaya_code, ()))
+    
+    def replace_wilaya(self, wilaya_code: str, users: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Make `users` the indexed users of a wilaya, as UserStore.replace_wilaya
+        
+        Args:
+            wilaya_code: Wilaya being saved
+            users: Its users
+        
+        Returns:
+            Dictionary with the number of users added, updated, removed and unchanged
+        """
+        users = [dict(user, wilaya_code=user.get('wilaya_code', wilaya_code)) for user in users]
+        logins = {user['username'] for user in users}
+        deletes = [login for login in self.members(wilaya_code) if login not in logins]
+        counts = self.apply(users, deletes)
+        logger.info(f"Rank index of wilaya {wilaya_code}: {counts['added']} added, {counts['updated']} updated, "
+                    f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+        return counts
+    
+    def _keys(self, category: str, wilaya_code: Optional[str] = None) -> RankKeys:
+        return self.keys[category].get(wilaya_code, RankKeys())
+    
+    def total(self, category: str, wilaya_code: Optional[str] = None) -> int:
+        """Number of users ranked in a category, nationally or in one wilaya"""
+        return len(self._keys(category, wilaya_code))
+    
+    def rank(self, login: str, category: str, wilaya: bool = False) -> Optional[int]:
+        """
+        Exact rank of a user, in O(log n)
+        
+        Args:
+            login: GitHub login
+            category: Ranking category ID
+            wilaya: Rank within the user's wilaya instead of nationally
+        
+        Returns:
+            1-based rank, or None if the user is not indexed or not ranked in the category
+        """
+        entry = self.entries.get(login)
+        if entry is None:
+            return None
+        seq, code, _ = entry
+        score = self._scores(login)[self.categories.index(category)]
+        if score == UNRANKED:
+            return None
+        return self._keys(category, code if wilaya else None).position(rank_key(score, seq)) + 1
+    
+    def top(self, category: str, limit: Optional[int] = None,
+            wilaya_code: Optional[str] = None) -> List[Tuple[int, int, str]]:
+        """
+        Leading users of a ranking
+        
+        Args:
+            category: Ranking category ID
+            limit: Number of users wanted (default: all)
+            wilaya_code: Rank within this wilaya instead of nationally
+        
+        Returns:
+            List of (rank, score, login), best first
+        """
+        ranked = []
+        for rank, key in enumerate(self._keys(category, wilaya_code).head(limit), 1):
+            score, seq = split_key(key)
+            ranked.append((rank, score, self.logins[seq]))
+        return ranked
+    
+    def rankings(self, record: Callable[[str], Optional[Dict]], national_top: Optional[int] = NATIONAL_TOP,
+                 wilaya_top: Optional[int] = WILAYA_TOP) -> Dict:
+        """
+        Rankings of every category, as RankingProcessor.process_rankings returns them
+        
+        Only the leaderboards' users are read. Their tables hold exact
+        totals; RankTable.rank_of only knows the users they hold (use
+        `rank` for anyone else).
+        
+        Args:
+            record: Returns the stored record of a login
+            national_top: Users kept in each national leaderboard (None keeps everyone)
+            wilaya_top: Users kept in each wilaya leaderboard (None keeps everyone)
+        
+        Returns:
+            Dictionary containing all ranking data
+        """
+        users, rows_by_login = [], {}
+        
+        def table(category: str, wilaya_code: Optional[str], limit: Optional[int]) -> RankTable:
+            rows, scores = [], []
+            for rank, score, login in self.top(category, limit, wilaya_code):
+                if login not in rows_by_login:
+                    rows_by_login[login] = len(users)
+                    users.append(record(login) or {'username': login})
+                rows.append(rows_by_login[login])
+                scores.append(score)
+            return RankTable(category, users, np.array(rows, dtype=np.intp), np.array(scores, dtype=np.int64),
+                             np.arange(1, len(rows) + 1), total=self.total(category, wilaya_code))
+        
+        rankings = {
+            'total_users': len(self.entries),
+            'by_category': {},
+            'by_wilaya': {},
+            'national': {},
+            'limits': {'national': national_top, 'wilaya': wilaya_top}
+        }
+        for category in self.categories:
+            rankings['national'][category] = table(category, None, national_top)
+            rankings['by_wilaya'][category] = {
+                code: table(category, code, wilaya_top)
+                for code in sorted(code for code in self.keys[category] if code is not None)
+            }
+        return rankings
+    
+    def close(self):
+        """Close the underlying database"""
+        self.conn.close()
@@ -0,0 +1,92 @@
+"""
+Rank Table
+Read-only ranking of one category: row indices into a shared user
+sequence with separate score and rank columns, so rankings never write
+into the user records they rank
+"""
+
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+class RankTable:
+    """
+    Ranking of one category over a shared sequence of users
+    
+    Position i of the table is the user `users[rows[i]]`, with score
+    `scores[i]` and rank `ranks[i]`. The columns are read-only arrays and
+    slicing a table returns a view over the same arrays, so the national
+    and per-wilaya tables of every category share one user sequence
+    without copying it.
+    
+    A table may hold only the top of its ranking (a leaderboard). `total`
+    still counts every user ranked, and `rank_of` gives the exact rank of
+    any of them from the category's full score column.
+    """
+    
+    def __init__(self, category: str, users: Sequence[Dict], rows: np.ndarray,
+                 scores: np.ndarray, ranks: np.ndarray, total: Optional[int] = None,
+                 score_column: Optional[np.ndarray] = None, population: Optional[np.ndarray] = None):
+        self.category = category
+        self.users = users
+        self.rows = self._frozen(rows)
+        self.scores = self._frozen(scores)
+        self.ranks = self._frozen(ranks)
+        self.total = len(self.rows) if total is None else total
+        self.score_column = score_column
+        self.population = population
+    
+    @staticmethod
+    def _frozen(column: np.ndarray) -> np.ndarray:
+        view = np.asarray(column).view()
+        view.setflags(write=False)
+        return view
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __getitem__(self, key: Union[int, slice]) -> Union['RankTable', Tuple[int, float, Dict]]:
+        """A view of some positions (slice), or the (rank, score, user) at one position"""
+        if isinstance(key, slice):
+            return RankTable(self.category, self.users, self.rows[key], self.scores[key], self.ranks[key],
+                             self.total, self.score_column, self.population)
+        return self.ranks[key].item(), self.scores[key].item(), self.users[int(self.rows[key])]
+    
+    def __iter__(self) -> Iterator[Tuple[int, float, Dict]]:
+        """(rank, score, user) of every position, best first"""
+        for row, score, rank in zip(self.rows.tolist(), self.scores.tolist(), self.ranks.tolist()):
+            yield rank, score, self.users[row]
+    
+    def user(self, position: int) -> Dict:
+        """User at a position (0 is the best ranked)"""
+        return self.users[int(self.rows[position])]
+    
+    def rank_of(self, row: int) -> Optional[int]:
+        """
+        Exact rank of a user in this ranking, whether or not the table holds it
+        
+        Counts the users scoring higher, plus the users tied with it that
+        come first (ties keep the users' order), in O(n).
+        
+        Args:
+            row: Index of the user in `users`
+        
+        Returns:
+            1-based rank, or None if the user is not part of this ranking
+        """
+        if self.score_column is None:
+            positions = np.flatnonzero(self.rows == row)
+            return self.ranks[positions[0]].item() if len(positions) else None
+        
+        population = self.population
+        if population is None:
+            if not 0 <= row < len(self.score_column):
+                return None
+            scores, rows = self.score_column, np.arange(len(self.score_column))
+        else:
+            if not len(population) or population[np.searchsorted(population, row) % len(population)] != row:
+                return None
+            scores, rows = self.score_column[population], population
+        score = self.score_column[row]
+        return int(np.count_nonzero(scores > score) + np.count_nonzero((scores == score) & (rows < row))) + 1
@@ -3,26 +3,61 @@ Ranking Processor
 Processes collected GitHub data and generates rankings
 """
 
-from typing import List, Dict
-from collections import defaultdict
+from typing import List, Dict, Optional, Sequence, Tuple
 import logging
 
+import numpy as np
+
+from .filter_plan import FilterPlan
+from .rank_engine import descending_order, grouped_descending_order, group_spans, ranks_within_groups
+from .rank_table import RankTable
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Numeric user fields the category scores are computed from
+SCORE_COLUMNS = ['followers', 'public_repos', 'public_gists', 'total_stars']
+
+# Users kept in each national and per-wilaya leaderboard (None keeps everyone)
+NATIONAL_TOP = 100
+WILAYA_TOP = 100
+
+
 class RankingProcessor:
-    """Process and rank GitHub users"""
+    """
+    Process and rank GitHub users
     
-    def __init__(self, config: Dict):
+    Rankings are RankTables: per-category score and rank columns pointing
+    into the ranked users by index, so the user records are never written.
+    
+    Each national and per-wilaya ranking keeps only its top `national_top`
+    and `wilaya_top` users, selected without sorting the rest; the tables
+    still report exact totals and the rank of any user (RankTable.rank_of).
+    
+    `contributions` maps logins to their rolling public contribution count
+    (see ContributionStore.counts). Once any user was polled, only polled
+    users are ranked in public_contributions, since event counts and the
+    estimate from repositories and gists used before any poll are not
+    comparable.
+    """
+    
+    def __init__(self, config: Dict, contributions: Optional[Dict[str, int]] = None,
+                 national_top: Optional[int] = NATIONAL_TOP, wilaya_top: Optional[int] = WILAYA_TOP):
         self.config = config
+        self.contributions = contributions or {}
+        self.national_top = national_top
+        self.wilaya_top = wilaya_top
         self.categories = config['ranking_categories']
         self.thresholds = config['minimum_thresholds']
+        self.filter_plan = FilterPlan.from_config(config)
     
     def filter_users(self, users: List[Dict]) -> List[Dict]:
         """
         Filter users based on minimum thresholds
         
+        Uses the same FilterPlan the collector pushes down into its searches.
+        
         Args:
             users: List of user dictionaries
             
@@ -32,8 +67,7 @@ class RankingProcessor:
         filtered = []
         
         for user in users:
-            if (user.get('followers', 0) >= self.thresholds['followers'] and
-                user.get('public_repos', 0) >= self.thresholds['repositories']):
+            if self.filter_plan.matches(user):
                 filtered.append(user)
         
         logger.info(f"Filtered {len(filtered)} users from {len(users)} total")
@@ -51,6 +85,9 @@ class RankingProcessor:
             Calculated score
         """
         if category == 'public_contributions':
+            # Counted from the public events feed once users were polled
+            if self.contributions:
+                return self.contributions.get(user.get('username'), 0)
             # Estimate from repos and activity
             return user.get('public_repos', 0) * 10 + user.get('public_gists', 0) * 5
         
@@ -69,7 +106,28 @@ class RankingProcessor:
         
         return 0
     
-    def rank_by_category(self, users: List[Dict], category: str) -> List[Dict]:
+    def is_ranked(self, user: Dict, category: str) -> bool:
+        """Whether a user meeting the thresholds is ranked in a category (see ranked_rows)"""
+        if category == 'public_contributions' and self.contributions:
+            return user.get('username') in self.contributions
+        return True
+    
+    def ranked_rows(self, category: str, logins: List[str]) -> Optional[np.ndarray]:
+        """
+        Rows ranked in a category, when not every user is
+        
+        Args:
+            category: Ranking category ID
+            logins: Logins of the users (only read when contributions were counted)
+            
+        Returns:
+            Sorted row indices, or None if every user is ranked
+        """
+        if category == 'public_contributions' and self.contributions:
+            return np.array([i for i, login in enumerate(logins) if login in self.contributions], dtype=np.intp)
+        return None
+    
+    def rank_by_category(self, users: List[Dict], category: str) -> RankTable:
         """
         Rank users by specific category
         
@@ -78,22 +136,13 @@ class RankingProcessor:
             category: Ranking category ID
             
         Returns:
-            Sorted list of users with ranks
+            RankTable of the users, best first
         """
-        # Calculate scores
-        for user in users:
-            user['score'] = self.calculate_score(user, category)
-        
-        # Sort by score descending
-        ranked = sorted(users, key=lambda x: x['score'], reverse=True)
-        
-        # Add rank numbers
-        for i, user in enumerate(ranked, 1):
-            user['rank'] = i
-        
-        return ranked
+        columns, logins = self._user_columns(users)
+        return self._national_table(category, users, self._category_score(category, columns, logins),
+                                    population=self.ranked_rows(category, logins))
     
-    def rank_by_wilaya(self, users: List[Dict], category: str) -> Dict[str, List[Dict]]:
+    def rank_by_wilaya(self, users: List[Dict], category: str) -> Dict[str, RankTable]:
         """
         Rank users grouped by wilaya
         
@@ -102,20 +151,13 @@ class RankingProcessor:
             category: Ranking category ID
             
         Returns:
-            Dictionary mapping wilaya codes to ranked user lists
+            Dictionary mapping wilaya codes to RankTables
         """
-        # Group by wilaya
-        by_wilaya = defaultdict(list)
-        for user in users:
-            wilaya_code = user.get('wilaya_code', '00')
-            by_wilaya[wilaya_code].append(user)
-        
-        # Rank within each wilaya
-        ranked_by_wilaya = {}
-        for wilaya_code, wilaya_users in by_wilaya.items():
-            ranked_by_wilaya[wilaya_code] = self.rank_by_category(wilaya_users, category)
-        
-        return ranked_by_wilaya
+        columns, logins = self._user_columns(users)
+        groups, group_codes = self._user_groups(users)
+        return self._wilaya_tables(category, users, self._category_score(category, columns, logins),
+                                   groups, group_codes, self._wilaya_order(group_spans(groups)),
+                                   population=self.ranked_rows(category, logins))
     
     def process_rankings(self, users: List[Dict]) -> Dict:
         """
@@ -131,26 +173,199 @@ class RankingProcessor:
         
         # Filter users
         filtered_users = self.filter_users(users)
+        return self.rank_filtered_users(filtered_users)
+    
+    def process_snapshot(self, snapshot) -> Dict:
+        """
+        Process all rankings from a columnar snapshot
+        
+        The thresholds are applied to the memory-mapped columns and scores
+        are computed from the columns directly; user records are decoded
+        only when a generator reads them from a RankTable.
+        
+        Args:
+            snapshot: ColumnarSnapshot of the collected users
+            
+        Returns:
+            Dictionary containing all ranking data
+        """
+        logger.info(f"Processing rankings for {len(snapshot)} users from {snapshot.directory}")
+        
+        indices = np.flatnonzero(self.filter_plan.mask(snapshot.column('followers'),
+                                                       snapshot.column('public_repos')))
+        logger.info(f"Filtered {len(indices)} users from {len(snapshot)} total")
+        
+        columns = {name: np.asarray(snapshot.column(name)[indices]) for name in SCORE_COLUMNS}
+        logins = [snapshot.login(i) for i in indices] if self.contributions else []
+        groups = np.asarray(snapshot.column('wilaya_code')[indices], dtype=np.int64)
+        group_codes = {int(group): f'{group:02d}' for group in np.unique(groups)}
+        return self.rank_columns(snapshot.rows(indices), columns, logins, groups, group_codes)
+    
+    def rank_filtered_users(self, filtered_users: List[Dict]) -> Dict:
+        """
+        Rank users that passed the thresholds in every category
+        
+        Args:
+            filtered_users: Users meeting the minimum thresholds
+            
+        Returns:
+            Dictionary containing all ranking data
+        """
+        columns, logins = self._user_columns(filtered_users)
+        groups, group_codes = self._user_groups(filtered_users)
+        return self.rank_columns(filtered_users, columns, logins, groups, group_codes)
+    
+    def _user_columns(self, users: List[Dict]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """SCORE_COLUMNS of user dicts, and their logins when contributions were counted"""
+        columns = {
+            name: np.fromiter((user.get(name, 0) for user in users), dtype=np.int64, count=len(users))
+            for name in SCORE_COLUMNS
+        }
+        logins = [user.get('username') for user in users] if self.contributions else []
+        return columns, logins
+    
+    @staticmethod
+    def _user_groups(users: List[Dict]) -> Tuple[np.ndarray, Dict[int, str]]:
+        """Integer wilaya group of every user dict, and the wilaya code of every group"""
+        codes, groups = np.unique(np.array([user.get('wilaya_code', '00') for user in users], dtype=str),
+                                  return_inverse=True)
+        return groups.reshape(-1), dict(enumerate(codes.tolist()))
+    
+    @staticmethod
+    def _wilaya_order(spans: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> List[int]:
+        """Groups in the order their first user appears, from group_spans"""
+        members, starts, start_groups = spans
+        return start_groups[np.argsort(members[starts])].tolist()
+    
+    def _category_score(self, category: str, columns: Dict[str, np.ndarray], logins: List[str]) -> np.ndarray:
+        """Vectorized calculate_score of one category"""
+        if category == 'public_contributions':
+            if not self.contributions:
+                return columns['public_repos'] * 10 + columns['public_gists'] * 5
+            score = np.zeros(len(logins), dtype=np.int64)
+            polled = [(i, self.contributions[login]) for i, login in enumerate(logins)
+                      if login in self.contributions]
+            if polled:
+                rows, counts = zip(*polled)
+                score[list(rows)] = counts
+            return score
+        elif category == 'total_contributions':
+            return columns['public_repos'] * 12 + columns['total_stars']
+        elif category == 'followers':
+            return columns['followers']
+        elif category == 'stars':
+            return columns['total_stars']
+        elif category == 'repositories':
+            return columns['public_repos']
+        return np.zeros(len(columns['followers']), dtype=np.int64)
+    
+    def score_columns(self, columns: Dict[str, np.ndarray], logins: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized calculate_score: the score column of every category
+        
+        Args:
+            columns: SCORE_COLUMNS of the users, one array each
+            logins: Logins of the users (only read when contributions were counted)
+            
+        Returns:
+            Dictionary mapping category IDs to score arrays
+        """
+        return {
+            category_config['id']: self._category_score(category_config['id'], columns, logins)
+            for category_config in self.categories
+        }
+    
+    @staticmethod
+    def _national_table(category: str, users: Sequence[Dict], score: np.ndarray, limit: int = None,
+                        population: np.ndarray = None) -> RankTable:
+        if population is not None:
+            rows = population[descending_order(score[population], limit)]
+            return RankTable(category, users, rows, score[rows], np.arange(1, len(rows) + 1),
+                             total=len(population), score_column=score, population=population)
+        rows = descending_order(score, limit)
+        if len(rows) == len(score):
+            return RankTable(category, users, rows, score[rows], np.arange(1, len(rows) + 1))
+        return RankTable(category, users, rows, score[rows], np.arange(1, len(rows) + 1),
+                         total=len(score), score_column=score)
+    
+    @staticmethod
+    def _wilaya_tables(category: str, users: Sequence[Dict], score: np.ndarray, groups: np.ndarray,
+                       group_codes: Dict[int, str], wilaya_order: List[int], limit: int = None,
+                       spans: Tuple[np.ndarray, np.ndarray, np.ndarray] = None,
+                       population: np.ndarray = None) -> Dict[str, RankTable]:
+        if limit is None and population is None:
+            order, starts, start_groups = grouped_descending_order(groups, score)
+            scores = score[order]
+            ranks = ranks_within_groups(starts, len(order))
+            ends = np.r_[starts[1:], len(order)].tolist()
+            tables = {
+                group: RankTable(category, users, order[start:end], scores[start:end], ranks[start:end])
+                for group, start, end in zip(start_groups.tolist(), starts.tolist(), ends)
+            }
+        else:
+            # Split the rows by wilaya once, then select each wilaya's top rows
+            members, starts, start_groups = spans if spans is not None else group_spans(groups)
+            ends = np.r_[starts[1:], len(members)].tolist()
+            ranked = None
+            if population is not None:
+                ranked = np.zeros(len(score), dtype=bool)
+                ranked[population] = True
+            tables = {}
+            for group, start, end in zip(start_groups.tolist(), starts.tolist(), ends):
+                group_rows = members[start:end]
+                if ranked is not None:
+                    group_rows = group_rows[ranked[group_rows]]
+                    if not len(group_rows):
+                        continue
+                rows = group_rows[descending_order(score[group_rows], limit)]
+                tables[group] = RankTable(category, users, rows, score[rows], np.arange(1, len(rows) + 1),
+                                          total=len(group_rows), score_column=score, population=group_rows)
+        return {group_codes[group]: tables[group] for group in wilaya_order if group in tables}
+    
+    def rank_columns(self, users: Sequence[Dict], columns: Dict[str, np.ndarray], logins: List[str],
+                     groups: np.ndarray, group_codes: Dict[int, str]) -> Dict:
+        """
+        Rank users in every category from their score columns
         
+        Ties keep the users' order. Every table of the result is a
+        RankTable over `users`, cut to the processor's leaderboard sizes;
+        the user records themselves are not modified.
+        
+        Args:
+            users: Users meeting the minimum thresholds (any sequence)
+            columns: SCORE_COLUMNS of the users
+            logins: Logins of the users (only read when contributions were counted)
+            groups: Integer wilaya group of every user
+            group_codes: Wilaya code of every group
+            
+        Returns:
+            Dictionary containing all ranking data
+        """
         rankings = {
-            'total_users': len(filtered_users),
+            'total_users': len(users),
             'by_category': {},
             'by_wilaya': {},
-            'national': {}
+            'national': {},
+            'limits': {'national': self.national_top, 'wilaya': self.wilaya_top}
         }
+        scores = self.score_columns(columns, logins)
+        spans = group_spans(groups)
+        wilaya_order = self._wilaya_order(spans)
         
-        # Generate rankings for each category
         for category_config in self.categories:
             category_id = category_config['id']
             logger.info(f"Processing category: {category_id}")
+            score = scores[category_id]
+            population = self.ranked_rows(category_id, logins)
             
             # National ranking
-            national_ranking = self.rank_by_category(filtered_users.copy(), category_id)
-            rankings['national'][category_id] = national_ranking[:100]  # Top 100
+            rankings['national'][category_id] = self._national_table(category_id, users, score,
+                                                                     self.national_top, population)
             
             # By wilaya ranking
-            wilaya_rankings = self.rank_by_wilaya(filtered_users.copy(), category_id)
-            rankings['by_wilaya'][category_id] = wilaya_rankings
+            rankings['by_wilaya'][category_id] = self._wilaya_tables(category_id, users, score, groups,
+                                                                     group_codes, wilaya_order, self.wilaya_top,
+                                                                     spans, population)
         
         logger.info("Rankings processing completed")
         return rankings
@@ -0,0 +1 @@
+# Simulator module
@@ -0,0 +1,497 @@
+"""
+Offline GitHub API Simulator
+Local HTTP stand-in for the endpoints the collectors use, serving a
+SyntheticPopulation with GitHub's rate-limit headers, search cap, latency
+and injected errors
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, unquote
+import logging
+
+from collectors.location_matcher import normalize_location
+from collectors.search_sharding import SEARCH_RESULT_CAP
+from .population import SyntheticPopulation
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# GitHub's documented budgets per resource: (requests per window, window in seconds)
+GITHUB_LIMITS = {
+    'core': (5000, 3600),
+    'search': (30, 60),
+    'graphql': (5000, 3600),
+}
+
+# Budgets large enough that rate pacing does not dominate a benchmark
+UNLIMITED_LIMITS = {
+    'core': (10_000_000, 3600),
+    'search': (1_000_000, 60),
+    'graphql': (10_000_000, 3600),
+}
+
+QUALIFIER_PATTERN = re.compile(r'(\w+):("[^"]*"|\S+)')
+
+
+def _parse_range(value: str, convert) -> Tuple[Optional[object], Optional[object]]:
+    """Parse a search range (`N`, `>=N`, `>N`, `<=N`, `<N`, `A..B`) into inclusive bounds"""
+    if '..' in value:
+        low, high = value.split('..', 1)
+        return (None if low in ('', '*') else convert(low)), (None if high in ('', '*') else convert(high))
+    for prefix in ('>=', '<=', '>', '<'):
+        if value.startswith(prefix):
+            bound = convert(value[len(prefix):])
+            if prefix == '>':
+                bound = bound + 1 if isinstance(bound, int) else bound
+            if prefix == '<':
+                bound = bound - 1 if isinstance(bound, int) else bound
+            return (bound, None) if prefix.startswith('>') else (None, bound)
+    bound = convert(value)
+    return bound, bound
+
+
+def _in_range(value, bounds) -> bool:
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+class SimulatorStats:
+    """Thread-safe counters of the requests a simulator has served"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.statuses = Counter()
+    
+    def record(self, endpoint: str, status: int):
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.statuses[status] += 1
+    
+    @property
+    def total(self) -> int:
+        """Requests served, conditional and failed ones included"""
+        return sum(self.requests.values())
+    
+    def snapshot(self) -> Dict:
+        """Copy of the counters"""
+        with self._lock:
+            return {
+                'total': sum(self.requests.values()),
+                'by_endpoint': dict(self.requests),
+                'by_status': {str(status): count for status, count in sorted(self.statuses.items())},
+            }
+
+
+class _Budget:
+    """Fixed-window request budget of one (token, resource) pair"""
+    
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.used = 0
+        # GitHub reports (and resets windows at) whole epoch seconds
+        self.reset_at = math.ceil(time.time() + window)
+    
+    def headers(self, resource: str) -> Dict[str, str]:
+        return {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.limit - self.used),
+            'X-RateLimit-Reset': str(int(self.reset_at)),
+            'X-RateLimit-Used': str(self.used),
+            'X-RateLimit-Resource': resource,
+        }
+    
+    def roll(self, now: float):
+        if now >= self.reset_at:
+            self.used = 0
+            self.reset_at = math.ceil(now + self.window)
+
+
+class _Server(ThreadingHTTPServer):
+    # Concurrent collectors open many connections at once; the default backlog of 5 drops them
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class GitHubAPISimulator:
+    """
+    Serves a synthetic population over the GitHub REST and GraphQL APIs
+    
+    Supported endpoints are /search/users, /users/{login},
+    /users/{login}/repos, /users/{login}/events/public, /rate_limit and the
+    POST /graphql queries built by graphql_enrichment. Every authorization
+    header gets its own core, search and graphql budgets; an exhausted
+    budget answers 403 with X-RateLimit-Remaining: 0, like GitHub. Replies
+    carry an ETag, and a matching If-None-Match gets an uncharged 304.
+    
+    Args:
+        population: Users to serve
+        limits: Budgets per resource as (limit, window seconds), GITHUB_LIMITS by default
+        latency: Mean added latency per request in seconds (uniform +/-50%)
+        error_rate: Share of requests answered with a 502
+        secondary_limit_rate: Share of requests answered with a secondary
+            rate limit (403 with Retry-After)
+        retry_after: Retry-After seconds of secondary rate limits
+        seed: Seed of the latency and error draws
+    """
+    
+    def __init__(self, population: SyntheticPopulation, limits: Optional[Dict] = None,
+                 latency: float = 0.0, error_rate: float = 0.0, secondary_limit_rate: float = 0.0,
+                 retry_after: int = 1, seed: int = 0):
+        self.population = population
+        self.limits = dict(GITHUB_LIMITS, **(limits or {}))
+        self.latency = latency
+        self.error_rate = error_rate
+        self.secondary_limit_rate = secondary_limit_rate
+        self.retry_after = retry_after
+        self.stats = SimulatorStats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._budgets = {}
+        self._search_results = {}
+        self._location_results = {}
+        self._normalized_locations = None
+        self._server = None
+        self._thread = None
+    
+    # Starting and stopping the server
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+    
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """
+        Serve in a background thread
+        
+        Returns:
+            Base URL to pass to a collector
+        """
+        self._server = _Server((host, port), _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"GitHub API simulator serving {self.population.size} users at {self.base_url}")
+        return self.base_url
+    
+    def stop(self):
+        """Stop serving"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    def reset(self):
+        """Forget budgets and statistics, e.g. between benchmark runs"""
+        with self._lock:
+            self._budgets.clear()
+        self.stats = SimulatorStats()
+    
+    # Rate limits and fault injection
+    
+    def _budget(self, token: str, resource: str) -> _Budget:
+        key = (token, resource)
+        if key not in self._budgets:
+            self._budgets[key] = _Budget(*self.limits[resource])
+        return self._budgets[key]
+    
+    def charge(self, token: str, resource: str) -> Tuple[bool, Dict[str, str]]:
+        """
+        Take one request from a budget
+        
+        Returns:
+            Tuple of (allowed, rate-limit headers)
+        """
+        with self._lock:
+            budget = self._budget(token, resource)
+            budget.roll(time.time())
+            allowed = budget.used < budget.limit
+            if allowed:
+                budget.used += 1
+            return allowed, budget.headers(resource)
+    
+    def refund(self, token: str, resource: str) -> Dict[str, str]:
+        """Give back a request GitHub would not charge (304)"""
+        with self._lock:
+            budget = self._budget(token, resource)
+            budget.used = max(budget.used - 1, 0)
+            return budget.headers(resource)
+    
+    def rate_limit_body(self, token: str) -> Dict:
+        """/rate_limit reply of a token"""
+        with self._lock:
+            resources = {}
+            for resource in self.limits:
+                budget = self._budget(token, resource)
+                budget.roll(time.time())
+                resources[resource] = {
+                    'limit': budget.limit,
+                    'remaining': budget.limit - budget.used,
+                    'reset': int(budget.reset_at),
+                    'used': budget.used,
+                }
+        return {'resources': resources, 'rate': resources['core']}
+    
+    def draw_fault(self) -> Optional[str]:
+        """Pick the injected fault of a request: 'error', 'secondary' or None"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return 'error'
+        if roll < self.error_rate + self.secondary_limit_rate:
+            return 'secondary'
+        return None
+    
+    def delay(self):
+        """Sleep for the simulated network and server latency"""
+        if self.latency > 0:
+            with self._lock:
+                factor = self._rng.uniform(0.5, 1.5)
+            time.sleep(self.latency * factor)
+    
+    # Endpoints
+    
+    def _users_at(self, term: Optional[str]) -> List[Dict]:
+        """Profiles whose location contains a normalized term (all when None), most followed first"""
+        with self._lock:
+            cached = self._location_results.get(term)
+        if cached is not None:
+            return cached
+        
+        if self._normalized_locations is None:
+            self._normalized_locations = {login: f' {normalize_location(user["location"])} '
+                                          for login, user in self.population.users.items()}
+        users = [user for login, user in self.population.users.items()
+                 if term is None or f' {term} ' in self._normalized_locations[login]]
+        users.sort(key=lambda user: (-user['followers'], user['login']))
+        with self._lock:
+            self._location_results[term] = users
+        return users
+    
+    def _search_matches(self, query: str) -> List[str]:
+        """Logins matching a search query, most followed first"""
+        with self._lock:
+            cached = self._search_results.get(query)
+        if cached is not None:
+            return cached
+        
+        users = None
+        filters = []
+        for name, value in QUALIFIER_PATTERN.findall(query):
+            value = value.strip('"')
+            if name == 'location':
+                users = self._users_at(normalize_location(value))
+            elif name in ('followers', 'repos'):
+                field = 'followers' if name == 'followers' else 'public_repos'
+                bounds = _parse_range(value, int)
+                filters.append(lambda user, field=field, bounds=bounds: _in_range(user[field], bounds))
+            elif name == 'created':
+                bounds = _parse_range(value, str)
+                filters.append(lambda user, bounds=bounds: _in_range(user['created_at'][:10], bounds))
+        
+        if users is None:
+            users = self._users_at(None)
+        matches = [user for user in users if all(f(user) for f in filters)]
+        logins = [user['login'] for user in matches]
+        with self._lock:
+            self._search_results[query] = logins
+        return logins
+    
+    def search_users(self, params: Dict) -> Tuple[int, object]:
+        page = int(params.get('page', 1))
+        per_page = min(int(params.get('per_page', 30)), 100)
+        if 'q' not in params:
+            return 422, {'message': 'Validation Failed', 'errors': [{'field': 'q', 'code': 'missing'}]}
+        if page * per_page > SEARCH_RESULT_CAP:
+            return 422, {'message': 'Only the first 1000 search results are available'}
+        
+        logins = self._search_matches(params['q'])
+        items = []
+        for login in logins[(page - 1) * per_page:page * per_page]:
+            items.append({'login': login, 'id': self.population.users[login]['id'], 'type': 'User',
+                          'score': 1.0})
+        return 200, {'total_count': len(logins), 'incomplete_results': False, 'items': items}
+    
+    def user_resource(self, login: str, resource: Optional[str], params: Dict) -> Tuple[int, object]:
+        if login not in self.population.users:
+            return 404, {'message': 'Not Found'}
+        if resource is None:
+            return 200, self.population.get(login)
+        
+        per_page = min(int(params.get('per_page', 30)), 100)
+        page = int(params.get('page', 1))
+        if resource == 'repos':
+            items = self.population.repos(login)
+        elif resource == 'events/public':
+            items = self.population.events(login)
+        else:
+            return 404, {'message': 'Not Found'}
+        return 200, items[(page - 1) * per_page:page * per_page]
+    
+    def _repositories(self, login: str, cursor: Optional[str]) -> Dict:
+        repos = self.population.repos(login)
+        start = int(cursor) if cursor else 0
+        page = repos[start:start + 100]
+        has_next = start + 100 < len(repos)
+        return {
+            'totalCount': len(repos),
+            'pageInfo': {'hasNextPage': has_next, 'endCursor': str(start + 100) if has_next else None},
+            'nodes': [{'stargazerCount': repo['stargazers_count'], 'forkCount': repo['forks_count']}
+                      for repo in page],
+        }
+    
+    def _graphql_user(self, login: str) -> Optional[Dict]:
+        profile = self.population.get(login)
+        if profile is None:
+            return None
+        return {
+            'login': login,
+            'name': profile['name'],
+            'avatarUrl': profile['avatar_url'],
+            'bio': profile['bio'],
+            'company': profile['company'],
+            'location': profile['location'],
+            'email': '',
+            'websiteUrl': profile['blog'] or None,
+            'twitterUsername': profile['twitter_username'],
+            'createdAt': profile['created_at'],
+            'updatedAt': profile['updated_at'],
+            'followers': {'totalCount': profile['followers']},
+            'following': {'totalCount': profile['following']},
+            'gists': {'totalCount': profile['public_gists']},
+            'repositories': self._repositories(login, None),
+        }
+    
+    def graphql(self, body: Dict) -> Tuple[int, object]:
+        """
+        Answer the collector's GraphQL queries
+        
+        Only the two query shapes of graphql_enrichment are understood,
+        recognized from their variables: batches of `$lN` logins aliased
+        `uN`, and the repositories page query of one `$login`.
+        """
+        variables = body.get('variables') or {}
+        if 'login' in variables:
+            login = variables['login']
+            if login not in self.population.users:
+                return 200, {'data': {'user': None}}
+            return 200, {'data': {'user': {'repositories': self._repositories(login, variables.get('cursor'))}}}
+        
+        data = {}
+        for name, login in variables.items():
+            if name.startswith('l') and name[1:].isdigit():
+                data[f'u{name[1:]}'] = self._graphql_user(login)
+        if not data:
+            return 200, {'data': None, 'errors': [{'message': 'Unsupported query'}]}
+        return 200, {'data': data}
+
+
+def _resource_of(method: str, path: str) -> Optional[str]:
+    if path.startswith('/rate_limit'):
+        return None
+    if path.startswith('/search/'):
+        return 'search'
+    if method == 'POST' and path == '/graphql':
+        return 'graphql'
+    return 'core'
+
+
+def _make_handler(simulator: GitHubAPISimulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; do not let Nagle hold the body back
+        disable_nagle_algorithm = True
+        
+        def log_message(self, format, *args):
+            pass
+        
+        def _reply(self, endpoint: str, status: int, body, headers: Dict[str, str]):
+            payload = json.dumps(body).encode('utf-8') if body is not None else b''
+            simulator.stats.record(endpoint, status)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if payload:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def _handle(self, method: str):
+            url = urlsplit(self.path)
+            path = unquote(url.path).rstrip('/') or '/'
+            params = dict(parse_qsl(url.query))
+            token = self.headers.get('Authorization', '')
+            body = None
+            if method == 'POST':
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+            
+            simulator.delay()
+            parts = path.strip('/').split('/')
+            if path == '/rate_limit':
+                endpoint = 'rate_limit'
+            elif path == '/search/users':
+                endpoint = 'search'
+            elif path == '/graphql' and method == 'POST':
+                endpoint = 'graphql'
+            elif parts[0] == 'users' and len(parts) >= 2:
+                endpoint = 'users/' + '/'.join(parts[2:]) if len(parts) > 2 else 'users'
+            else:
+                return self._reply('unknown', 404, {'message': 'Not Found'}, {})
+            
+            resource = _resource_of(method, path)
+            if resource is None:
+                return self._reply(endpoint, 200, simulator.rate_limit_body(token), {})
+            
+            allowed, headers = simulator.charge(token, resource)
+            if not allowed:
+                return self._reply(endpoint, 403, {'message': 'API rate limit exceeded'}, headers)
+            
+            fault = simulator.draw_fault()
+            if fault == 'error':
+                return self._reply(endpoint, 502, {'message': 'Server Error'}, headers)
+            if fault == 'secondary':
+                return self._reply(endpoint, 403, {'message': 'You have exceeded a secondary rate limit'},
+                                   dict(headers, **{'Retry-After': str(simulator.retry_after)}))
+            
+            if endpoint == 'search':
+                status, reply = simulator.search_users(params)
+            elif endpoint == 'graphql':
+                status, reply = simulator.graphql(body)
+            else:
+                status, reply = simulator.user_resource(parts[1], '/'.join(parts[2:]) or None, params)
+            
+            if status == 200:
+                etag = '"' + hashlib.md5(json.dumps(reply).encode('utf-8')).hexdigest() + '"'
+                headers['ETag'] = etag
+                if method == 'GET' and self.headers.get('If-None-Match') == etag:
+                    headers.update(simulator.refund(token, resource))
+                    return self._reply(endpoint, 304, None, headers)
+            self._reply(endpoint, status, reply, headers)
+        
+        def do_GET(self):
+            self._handle('GET')
+        
+        def do_POST(self):
+            self._handle('POST')
+    
+    return Handler
@@ -0,0 +1,161 @@
+"""
+Synthetic Population
+Deterministic synthetic Algerian GitHub users for the offline API simulator,
+with heavy-tailed followers, repositories and activity
+"""
+
+import random
+import hashlib
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+
+FIRST_NAMES = [
+    'Ahmed', 'Fatima', 'Mohamed', 'Amina', 'Yacine', 'Sarah', 'Karim', 'Lina', 'Rachid', 'Nour',
+    'Samir', 'Meriem', 'Walid', 'Imane', 'Sofiane', 'Yasmine', 'Amine', 'Khadija', 'Nabil', 'Asma',
+    'Riad', 'Houda', 'Bilal', 'Salima', 'Mehdi', 'Rania', 'Anis', 'Lamia', 'Hichem', 'Selma'
+]
+
+LAST_NAMES = [
+    'Benali', 'Zerrouki', 'Boudiaf', 'Mansouri', 'Khelifi', 'Hamidi', 'Larbi', 'Belkacem',
+    'Saidi', 'Bouzid', 'Cherif', 'Meziane', 'Haddad', 'Brahimi', 'Amrani', 'Kaci', 'Ouali',
+    'Toumi', 'Djebbar', 'Slimani', 'Guenchi', 'Rahmani', 'Bensalem', 'Ferhat'
+]
+
+LANGUAGES = ['Python', 'JavaScript', 'TypeScript', 'Java', 'PHP', 'Dart', 'Go', 'C++', 'Kotlin', 'Rust']
+
+EVENT_TYPES = ['PushEvent', 'PushEvent', 'PushEvent', 'PullRequestEvent', 'IssuesEvent',
+               'CreateEvent', 'WatchEvent', 'IssueCommentEvent']
+
+# Relative GitHub population of the largest wilayas; every other wilaya weighs 1
+WILAYA_WEIGHTS = {
+    '16': 40, '31': 14, '25': 10, '19': 6, '09': 6, '06': 5, '15': 5, '23': 4,
+    '05': 4, '13': 4, '35': 3, '22': 3, '42': 3, '26': 2, '07': 2, '18': 2
+}
+
+# Share of users whose location names only the country, or another country
+COUNTRY_ONLY_SHARE = 0.08
+ABROAD_SHARE = 0.03
+ABROAD_LOCATIONS = ['Paris, France', 'Montreal, Canada', 'Lyon, France', 'Dubai, UAE', 'Berlin, Germany']
+
+# Oldest and newest account creation dates of the synthetic users
+CREATED_FROM = datetime(2008, 4, 1)
+CREATED_TO = datetime(2025, 12, 31)
+
+# GitHub only serves the latest 300 public events of a user
+MAX_EVENTS = 300
+
+
+class SyntheticPopulation:
+    """
+    A fixed set of synthetic users, identical for the same size and seed
+    
+    Profiles are generated up front; repositories and events are derived
+    on demand from a per-user seed so large populations stay small in
+    memory. Each user lives in a wilaya picked by WILAYA_WEIGHTS and writes
+    its location in one of the forms seen on real profiles ("Oran, Algeria",
+    "وهران", "Constantine, DZ", ...).
+    """
+    
+    def __init__(self, size: int, wilayas: List[Dict], seed: int = 0):
+        self.size = size
+        self.seed = seed
+        rng = random.Random(seed)
+        
+        weights = [WILAYA_WEIGHTS.get(wilaya['code'], 1) for wilaya in wilayas]
+        self.users = {}
+        for i in range(size):
+            wilaya = rng.choices(wilayas, weights)[0]
+            login = f"{rng.choice(FIRST_NAMES).lower()}-{rng.choice(LAST_NAMES).lower()}-{i}"
+            self.users[login] = self._profile(rng, login, wilaya)
+        self.logins = list(self.users)
+    
+    @staticmethod
+    def _location(rng: random.Random, wilaya: Dict) -> Optional[str]:
+        roll = rng.random()
+        if roll < ABROAD_SHARE:
+            return rng.choice(ABROAD_LOCATIONS)
+        if roll < ABROAD_SHARE + COUNTRY_ONLY_SHARE:
+            return rng.choice(['Algeria', 'Algérie', 'DZ', None])
+        
+        city = rng.choice(wilaya['cities'])
+        return rng.choice([
+            f'{city}, Algeria',
+            city,
+            f"{wilaya['name_fr']}, Algérie",
+            wilaya['name_ar'],
+            f'{city}, DZ',
+        ])
+    
+    def _profile(self, rng: random.Random, login: str, wilaya: Dict) -> Dict:
+        created = CREATED_FROM + timedelta(seconds=rng.randrange(int((CREATED_TO - CREATED_FROM).total_seconds())))
+        updated = created + timedelta(seconds=rng.randrange(int((CREATED_TO - created).total_seconds()) + 1))
+        name = login.rsplit('-', 1)[0].replace('-', ' ').title()
+        return {
+            'login': login,
+            'id': int(hashlib.sha1(login.encode('utf-8')).hexdigest()[:8], 16),
+            'name': name if rng.random() < 0.85 else None,
+            'avatar_url': f'https://avatars.githubusercontent.com/{login}',
+            'bio': f"{rng.choice(LANGUAGES)} developer" if rng.random() < 0.5 else None,
+            'company': None,
+            'location': self._location(rng, wilaya),
+            'email': None,
+            'blog': '',
+            'twitter_username': None,
+            'followers': min(int((rng.paretovariate(1.16) - 1) * 6), 50000),
+            'following': int(rng.paretovariate(1.5) * 3),
+            'public_repos': min(int(rng.paretovariate(1.3) * 3) - 2, 800) if rng.random() > 0.05 else 0,
+            'public_gists': int(rng.paretovariate(2.0)) - 1,
+            'created_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'updated_at': updated.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'wilaya_code': wilaya['code'],
+        }
+    
+    def get(self, login: str) -> Optional[Dict]:
+        """Profile of a user in /users/{login} form, or None if unknown"""
+        profile = self.users.get(login)
+        if profile is None:
+            return None
+        return {key: value for key, value in profile.items() if key != 'wilaya_code'}
+    
+    def _rng(self, login: str, stream: str) -> random.Random:
+        return random.Random(f'{self.seed}:{login}:{stream}')
+    
+    def repos(self, login: str) -> List[Dict]:
+        """Public repositories of a user, most recently updated first"""
+        profile = self.users[login]
+        rng = self._rng(login, 'repos')
+        repos = []
+        for i in range(max(profile['public_repos'], 0)):
+            repos.append({
+                'name': f'project-{i}',
+                'full_name': f'{login}/project-{i}',
+                'language': rng.choice(LANGUAGES),
+                'stargazers_count': int((rng.paretovariate(1.1) - 1) * 2),
+                'forks_count': int((rng.paretovariate(1.3) - 1)),
+                'fork': rng.random() < 0.15,
+            })
+        return repos
+    
+    def events(self, login: str) -> List[Dict]:
+        """Latest public events of a user, newest first"""
+        profile = self.users[login]
+        rng = self._rng(login, 'events')
+        count = min(int((rng.paretovariate(1.2) - 1) * 10), MAX_EVENTS)
+        newest = datetime.strptime(profile['updated_at'], '%Y-%m-%dT%H:%M:%SZ')
+        
+        events = []
+        for i in range(count):
+            created = newest - timedelta(hours=i * rng.uniform(1, 48))
+            event_type = rng.choice(EVENT_TYPES)
+            event = {
+                'id': str(profile['id'] * 1000 + count - i),
+                'type': event_type,
+                'created_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'repo': {'name': f'{login}/project-{rng.randrange(max(profile["public_repos"], 1))}'},
+                'payload': {},
+            }
+            if event_type == 'PushEvent':
+                event['payload'] = {'size': rng.randint(1, 5)}
+            events.append(event)
+        return events
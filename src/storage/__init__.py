@@ -0,0 +1 @@
+# Storage module
\ No newline at end of file
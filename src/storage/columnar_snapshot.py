@@ -0,0 +1,199 @@
+"""
+Columnar Snapshot
+Writes the deduplicated users as NumPy columns plus string tables, so the
+ranking stage can memory-map the numeric columns it scores on instead of
+building a dict per user
+"""
+
+import os
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Iterable, Iterator, Optional
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_VERSION = 1
+
+# Numeric user fields stored as int64 columns (missing values are 0)
+NUMERIC_COLUMNS = ['followers', 'following', 'public_repos', 'public_gists', 'total_stars', 'total_forks']
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _write_strings(directory: Path, name: str, strings: List[str]):
+    """Store strings as one UTF-8 blob and an int64 offsets column of len(strings) + 1"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(directory / f'{name}_offsets.npy', offsets)
+    with open(directory / f'{name}.bin', 'wb') as f:
+        for b in encoded:
+            f.write(b)
+
+
+def write_snapshot(directory: Path, users: Iterable[Dict]) -> int:
+    """
+    Write users as a columnar snapshot, replacing any previous one
+    
+    The snapshot is built in `<directory>.partial` and swapped into place
+    once complete, so readers never see a half-written snapshot.
+    
+    Args:
+        directory: Snapshot directory
+        users: Deduplicated user records
+    
+    Returns:
+        Number of users written
+    """
+    directory = Path(directory)
+    partial = directory.with_name(directory.name + '.partial')
+    if partial.exists():
+        shutil.rmtree(partial)
+    partial.mkdir(parents=True)
+    
+    columns = {name: [] for name in NUMERIC_COLUMNS}
+    wilaya_codes, logins, records = [], [], []
+    for user in users:
+        for name in NUMERIC_COLUMNS:
+            columns[name].append(user.get(name) or 0)
+        wilaya_codes.append(int(user.get('wilaya_code') or 0))
+        logins.append(user['username'])
+        records.append(json.dumps(user, ensure_ascii=False))
+    
+    for name, values in columns.items():
+        np.save(partial / f'{name}.npy', np.array(values, dtype=np.int64))
+    np.save(partial / 'wilaya_code.npy', np.array(wilaya_codes, dtype=np.int16))
+    _write_strings(partial, 'logins', logins)
+    _write_strings(partial, 'records', records)
+    with open(partial / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': SNAPSHOT_VERSION,
+            'count': len(logins),
+            'columns': NUMERIC_COLUMNS + ['wilaya_code'],
+            'created_at': datetime.utcnow().isoformat(),
+        }, f, indent=2)
+    
+    if directory.exists():
+        shutil.rmtree(directory)
+    os.replace(partial, directory)
+    logger.info(f"Wrote a columnar snapshot of {len(logins)} users to {directory}")
+    return len(logins)
+
+
+class _StringTable:
+    """Memory-mapped strings addressed by row index"""
+    
+    def __init__(self, directory: Path, name: str):
+        self.offsets = np.load(directory / f'{name}_offsets.npy', mmap_mode='r')
+        blob_path = directory / f'{name}.bin'
+        if blob_path.stat().st_size:
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+    
+    def __getitem__(self, index: int) -> str:
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+
+class SnapshotRows:
+    """
+    Records of selected snapshot rows, decoded on first access
+    
+    Position i is the record of snapshot row `indices[i]`.
+    """
+    
+    def __init__(self, snapshot: 'ColumnarSnapshot', indices: np.ndarray):
+        self.snapshot = snapshot
+        self.indices = indices
+        self._decoded = {}
+    
+    def __len__(self) -> int:
+        return len(self.indices)
+    
+    def __getitem__(self, position: int) -> Dict:
+        if position not in self._decoded:
+            self._decoded[position] = self.snapshot.record(int(self.indices[position]))
+        return self._decoded[position]
+
+
+class ColumnarSnapshot:
+    """
+    Read side of a snapshot written by write_snapshot
+    
+    Numeric columns are memory-mapped (zero-copy until touched); logins
+    and full user records are decoded only for the rows asked for.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest.get('version')} in {self.directory}")
+        self.count = self.manifest['count']
+        self._columns = {
+            name: np.load(self.directory / f'{name}.npy', mmap_mode='r')
+            for name in self.manifest['columns']
+        }
+        self._logins = _StringTable(self.directory, 'logins')
+        self._records = _StringTable(self.directory, 'records')
+    
+    @classmethod
+    def open(cls, directory: Path) -> Optional['ColumnarSnapshot']:
+        """The snapshot in a directory, or None if none was written"""
+        if not (Path(directory) / MANIFEST_NAME).exists():
+            return None
+        return cls(directory)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def column(self, name: str) -> np.ndarray:
+        """
+        Memory-mapped numeric column
+        
+        Args:
+            name: One of NUMERIC_COLUMNS or 'wilaya_code' (wilaya codes as integers)
+        
+        Returns:
+            Read-only array with one value per user
+        """
+        return self._columns[name]
+    
+    def login(self, index: int) -> str:
+        """Login of the user at a row"""
+        return self._logins[index]
+    
+    def logins(self) -> List[str]:
+        """Logins of every user, in row order"""
+        return [self._logins[i] for i in range(self.count)]
+    
+    def record(self, index: int) -> Dict:
+        """Full user record at a row"""
+        return json.loads(self._records[index])
+    
+    def records(self, indices: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+        """
+        Lazily decode user records
+        
+        Args:
+            indices: Rows to decode, in the order wanted (default: every row)
+        
+        Yields:
+            User dictionaries
+        """
+        for index in (range(self.count) if indices is None else indices):
+            yield json.loads(self._records[int(index)])
+    
+    def rows(self, indices: np.ndarray) -> SnapshotRows:
+        """Lazily decoded records of the given rows, addressed by position in `indices`"""
+        return SnapshotRows(self, indices)
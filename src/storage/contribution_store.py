@@ -0,0 +1,126 @@
+"""
+Contribution Store
+SQLite store of per-user daily contribution counts accumulated from the
+public events feed, with the ETag and newest event id of each user's last
+poll so later polls only count new events
+"""
+
+import os
+import time
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple, Mapping
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Contributions are ranked over this many trailing days
+ROLLING_WINDOW_DAYS = 365
+
+
+class ContributionStore:
+    """
+    Rolling contribution counters, one row per user and day
+    
+    GitHub only serves a user's latest 300 public events from the last 90
+    days; polling regularly lets the store keep counting past that horizon.
+    Each poll records the ETag of the first events page, so an unchanged
+    feed is answered with a free 304, and the newest event id seen, so
+    events are never counted twice.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cursors ('
+            ' login TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_event_id INTEGER NOT NULL,'
+            ' polled_at REAL NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS daily_contributions ('
+            ' login TEXT NOT NULL,'
+            ' day TEXT NOT NULL,'
+            ' count INTEGER NOT NULL,'
+            ' PRIMARY KEY (login, day))'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_daily_contributions_day ON daily_contributions (day)')
+        self.conn.commit()
+    
+    def cursor(self, login: str) -> Optional[Tuple[Optional[str], int]]:
+        """
+        Where the last poll of a user stopped
+        
+        Returns:
+            Tuple of (ETag of the first events page, newest event id counted),
+            or None if the user was never polled
+        """
+        row = self.conn.execute('SELECT etag, last_event_id FROM cursors WHERE login = ?', (login,)).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def record(self, login: str, etag: Optional[str], last_event_id: int, days: Mapping[str, int]):
+        """
+        Add newly seen contributions of a user and move its cursor
+        
+        Args:
+            login: GitHub username
+            etag: ETag of the first events page
+            last_event_id: Newest event id counted so far
+            days: New contributions per day ('YYYY-MM-DD')
+        """
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO daily_contributions (login, day, count) VALUES (?, ?, ?) '
+                'ON CONFLICT(login, day) DO UPDATE SET count = count + excluded.count',
+                [(login, day, count) for day, count in days.items() if count]
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO cursors (login, etag, last_event_id, polled_at) VALUES (?, ?, ?, ?)',
+                (login, etag, last_event_id, time.time())
+            )
+    
+    def touch(self, login: str):
+        """Note a poll that found nothing new"""
+        with self.conn:
+            self.conn.execute('UPDATE cursors SET polled_at = ? WHERE login = ?', (time.time(), login))
+    
+    def counts(self, window_days: int = ROLLING_WINDOW_DAYS, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Contributions of every polled user over the trailing window
+        
+        Users polled without any contribution in the window count 0, so
+        they can be told apart from users never polled.
+        
+        Args:
+            window_days: Days counted back from `now`
+            now: End of the window (defaults to the current UTC time)
+        
+        Returns:
+            Mapping of login to contribution count
+        """
+        since = ((now or datetime.utcnow()) - timedelta(days=window_days)).strftime('%Y-%m-%d')
+        counts = {login: 0 for (login,) in self.conn.execute('SELECT login FROM cursors')}
+        for login, count in self.conn.execute(
+            'SELECT login, SUM(count) FROM daily_contributions WHERE day >= ? GROUP BY login', (since,)
+        ):
+            counts[login] = count
+        return counts
+    
+    def prune(self, window_days: int = ROLLING_WINDOW_DAYS):
+        """Drop daily counts that fell out of the rolling window"""
+        since = (datetime.utcnow() - timedelta(days=window_days)).strftime('%Y-%m-%d')
+        with self.conn:
+            removed = self.conn.execute('DELETE FROM daily_contributions WHERE day < ?', (since,)).rowcount
+        if removed:
+            logger.info(f"Pruned {removed} daily contribution counts older than {since}")
+    
+    def close(self):
+        """Close the underlying database"""
+        self.conn.close()
@@ -0,0 +1,209 @@
+"""
+Raw Data Storage
+Streams collected users to newline-delimited JSON files, optionally
+zstd-compressed, and reads them back lazily
+"""
+
+import io
+import os
+import json
+from pathlib import Path
+from typing import List, Dict, Iterable, Iterator, Optional
+import logging
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Raw data formats, preferred first when several exist for one wilaya.
+# Plain .json is the pretty-printed list written by earlier versions.
+RAW_SUFFIXES = ['.ndjson.zst', '.ndjson', '.json']
+
+PARTIAL_SUFFIX = '.partial'
+
+# Users per zstd frame; every completed frame stays readable after a crash
+ZSTD_FRAME_USERS = 500
+
+ZSTD_LEVEL = 10
+
+# Raised when a compressed file ends in the middle of a frame
+TRUNCATION_ERRORS = (zstandard.ZstdError,) if zstandard else ()
+
+
+def zstd_available() -> bool:
+    """Whether the optional zstandard package is installed"""
+    return zstandard is not None
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ImportError("Reading or writing .zst raw data requires the zstandard package "
+                          "(pip install zstandard)")
+
+
+def raw_data_path(directory: Path, wilaya_code: str, compress: bool = False) -> Path:
+    """Raw data file of a wilaya in the current format"""
+    return Path(directory) / f"wilaya_{wilaya_code}{'.ndjson.zst' if compress else '.ndjson'}"
+
+
+def _wilaya_code(path: Path) -> str:
+    return path.name.split('.')[0].split('_', 1)[1]
+
+
+def find_raw_file(directory: Path, wilaya_code: str) -> Optional[Path]:
+    """Existing raw data file of a wilaya, if any"""
+    for suffix in RAW_SUFFIXES:
+        path = Path(directory) / f"wilaya_{wilaya_code}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def raw_data_files(directory: Path) -> List[Path]:
+    """One raw data file per collected wilaya, sorted by wilaya code"""
+    files = {}
+    for suffix in reversed(RAW_SUFFIXES):
+        for path in Path(directory).glob(f'wilaya_*{suffix}'):
+            if path.name.endswith(suffix) and not path.name.endswith(PARTIAL_SUFFIX):
+                files[_wilaya_code(path)] = path
+    return [files[code] for code in sorted(files)]
+
+
+def partial_files(directory: Path) -> List[Path]:
+    """Raw data files left unfinished by an interrupted write"""
+    return sorted(Path(directory).glob(f'wilaya_*{PARTIAL_SUFFIX}'))
+
+
+def _open_text(path: Path) -> io.TextIOBase:
+    if path.name.endswith('.zst') or path.name.endswith(f'.zst{PARTIAL_SUFFIX}'):
+        _require_zstd()
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                          closefd=True)
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_raw_users(path: Path) -> Iterator[Dict]:
+    """
+    Lazily read the users of one raw data file
+    
+    NDJSON files are decoded one line at a time; a torn final line (or
+    frame) from an interrupted write is skipped. Legacy .json files are
+    still read whole.
+    
+    Args:
+        path: Raw data file in any supported format
+    
+    Yields:
+        User dictionaries
+    """
+    path = Path(path)
+    if path.name.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    
+    try:
+        with _open_text(path) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable line {line_number} of {path}")
+    except TRUNCATION_ERRORS as e:
+        logger.warning(f"Stopped reading truncated {path}: {e}")
+
+
+def iter_all_raw_users(directory: Path) -> Iterator[Dict]:
+    """Lazily read the users of every wilaya collected in a directory"""
+    for path in raw_data_files(directory):
+        yield from iter_raw_users(path)
+
+
+def count_raw_users(path: Path) -> int:
+    """Number of users in a raw data file, without keeping them in memory"""
+    return sum(1 for _ in iter_raw_users(path))
+
+
+class RawDataWriter:
+    """
+    Appends users to a raw data file one NDJSON line at a time
+    
+    Lines go to `<path>.partial` and are flushed as they are written (in
+    zstd frames of ZSTD_FRAME_USERS users when the path ends in .zst).
+    close() moves the file into place and removes the same wilaya's files
+    in other formats, so readers only ever see complete files.
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(self.path.name + PARTIAL_SUFFIX)
+        self.count = 0
+        self.compress = self.path.name.endswith('.zst')
+        
+        os.makedirs(self.path.parent, exist_ok=True)
+        self._raw = open(self.partial_path, 'wb')
+        self._compressor = None
+        if self.compress:
+            _require_zstd()
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(self._raw, closefd=False)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+    
+    def write(self, user: Dict):
+        """Append one user"""
+        line = (json.dumps(user, ensure_ascii=False) + '\n').encode('utf-8')
+        self.count += 1
+        if self._compressor:
+            self._compressor.write(line)
+            if self.count % ZSTD_FRAME_USERS == 0:
+                self._compressor.flush(zstandard.FLUSH_FRAME)
+        else:
+            self._raw.write(line)
+        self._raw.flush()
+    
+    def close(self):
+        """Finish the file and move it into place"""
+        if self._compressor:
+            self._compressor.close()
+        self._raw.close()
+        os.replace(self.partial_path, self.path)
+        
+        stem = self.path.name[:-len(next(s for s in RAW_SUFFIXES if self.path.name.endswith(s)))]
+        for suffix in RAW_SUFFIXES:
+            other = self.path.with_name(stem + suffix)
+            if other != self.path and other.exists():
+                other.unlink()
+    
+    def abort(self):
+        """Stop writing, keeping the partial file for inspection"""
+        if self._compressor:
+            self._compressor.close()
+        self._raw.close()
+
+
+def write_raw_users(path: str, users: Iterable[Dict]) -> int:
+    """
+    Stream users to a raw data file
+    
+    Returns:
+        Number of users written
+    """
+    with RawDataWriter(path) as writer:
+        for user in users:
+            writer.write(user)
+    return writer.count
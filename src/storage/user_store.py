@@ -0,0 +1,162 @@
+"""
+User Store
+SQLite store of collected users, one row per login, indexed by wilaya and
+profile update time so single users can be upserted and wilayas counted
+without reading every raw data file
+"""
+
+import os
+import json
+import sqlite3
+from typing import Dict, Iterable, Iterator, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UserStore:
+    """
+    Collected users keyed by login
+    
+    Each row keeps the whole user record as JSON next to the columns it is
+    looked up by: its wilaya, its profile `updated_at` and when it was
+    collected. A login lives in one wilaya at a time; upserting it under
+    another wilaya moves it.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS users ('
+            ' login TEXT PRIMARY KEY,'
+            ' wilaya_code TEXT NOT NULL,'
+            ' updated_at TEXT,'
+            ' collected_at TEXT,'
+            ' data TEXT NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_users_wilaya ON users (wilaya_code)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users (updated_at)')
+        self.conn.commit()
+    
+    def __len__(self) -> int:
+        return self.count()
+    
+    @staticmethod
+    def _row(user: Dict) -> tuple:
+        return (user['username'], user.get('wilaya_code', ''), user.get('updated_at'),
+                user.get('collected_at'), json.dumps(user, ensure_ascii=False))
+    
+    def _upsert_rows(self, rows: Iterable[tuple]):
+        self.conn.executemany(
+            'INSERT INTO users (login, wilaya_code, updated_at, collected_at, data) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(login) DO UPDATE SET wilaya_code = excluded.wilaya_code, '
+            'updated_at = excluded.updated_at, collected_at = excluded.collected_at, data = excluded.data',
+            rows
+        )
+    
+    def upsert(self, users: Iterable[Dict]) -> int:
+        """
+        Insert users or replace their stored record, in one transaction
+        
+        Args:
+            users: User records (with 'username' and 'wilaya_code'), possibly a generator
+        
+        Returns:
+            Number of users written
+        """
+        count = 0
+        
+        def rows():
+            nonlocal count
+            for user in users:
+                count += 1
+                yield self._row(user)
+        
+        with self.conn:
+            self._upsert_rows(rows())
+        return count
+    
+    def replace_wilaya(self, wilaya_code: str, users: Iterable[Dict]) -> int:
+        """
+        Make `users` the stored users of a wilaya
+        
+        The users are upserted, and users still stored under the wilaya but
+        missing from `users` are deleted, as when a wilaya's raw data file
+        is rewritten.
+        
+        Args:
+            wilaya_code: Wilaya being saved
+            users: Its users, possibly a generator
+        
+        Returns:
+            Number of users written
+        """
+        logins = set()
+        
+        def rows():
+            for user in users:
+                logins.add(user['username'])
+                yield self._row(dict(user, wilaya_code=user.get('wilaya_code', wilaya_code)))
+        
+        with self.conn:
+            self._upsert_rows(rows())
+            stored = [login for (login,) in self.conn.execute(
+                'SELECT login FROM users WHERE wilaya_code = ?', (wilaya_code,)
+            )]
+            self.conn.executemany('DELETE FROM users WHERE login = ?',
+                                  [(login,) for login in stored if login not in logins])
+        logger.info(f"Saved {len(logins)} users of wilaya {wilaya_code} to {self.path}")
+        return len(logins)
+    
+    def get(self, login: str) -> Optional[Dict]:
+        """Stored record of a user, or None"""
+        row = self.conn.execute('SELECT data FROM users WHERE login = ?', (login,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def iter_users(self, wilaya_code: Optional[str] = None, updated_since: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Lazily read stored users, ordered by wilaya
+        
+        Args:
+            wilaya_code: Only the users of this wilaya
+            updated_since: Only users whose profile `updated_at` is at or after
+                this ISO 8601 timestamp
+        
+        Yields:
+            User dictionaries
+        """
+        query = 'SELECT data FROM users'
+        conditions, params = [], []
+        if wilaya_code is not None:
+            conditions.append('wilaya_code = ?')
+            params.append(wilaya_code)
+        if updated_since is not None:
+            conditions.append('updated_at >= ?')
+            params.append(updated_since)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY wilaya_code'
+        
+        for (data,) in self.conn.execute(query, params):
+            yield json.loads(data)
+    
+    def count(self, wilaya_code: Optional[str] = None) -> int:
+        """Number of stored users, in total or in one wilaya"""
+        if wilaya_code is None:
+            return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM users WHERE wilaya_code = ?', (wilaya_code,)).fetchone()[0]
+    
+    def counts_by_wilaya(self) -> Dict[str, int]:
+        """Number of stored users of every wilaya holding any"""
+        return dict(self.conn.execute(
+            'SELECT wilaya_code, COUNT(*) FROM users GROUP BY wilaya_code ORDER BY wilaya_code'
+        ))
+    
+    def close(self):
+        """Close the underlying database"""
+        self.conn.close()
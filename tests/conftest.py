@@ -0,0 +1,79 @@
+"""
+Shared fixtures
+Puts the src/ packages on the import path and provides a fake clock,
+the wilayas configuration, synthetic collected users and a temporary
+data directory for main
+"""
+
+import sys
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+# main's module-level data paths, moved by use_data_dir
+PATH_GLOBALS = ['RAW_DATA_DIR', 'JOURNAL_PATH', 'RUN_STATS_PATH', 'CONTRIBUTIONS_PATH', 'USER_STORE_PATH',
+                'SNAPSHOT_DIR', 'RANK_INDEX_PATH', 'RATE_LEASES_PATH']
+
+
+class FakeClock:
+    """Clock that only moves when a test advances `now`"""
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope='session')
+def config():
+    """The real wilayas configuration"""
+    with open(ROOT / 'config' / 'wilayas.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def make_users():
+    """
+    Factory of synthetic collected users
+    
+    Scores are drawn from small ranges so every ranking has many ties, and
+    some users fall below the minimum thresholds.
+    """
+    def make(count, seed=0, codes=('16', '31', '25'), prefix='user'):
+        rng = random.Random(seed)
+        return [
+            {
+                'username': f'{prefix}{i}',
+                'location': None,
+                'followers': rng.randint(3, 12),
+                'public_repos': rng.randint(0, 6),
+                'public_gists': rng.randint(0, 3),
+                'total_stars': rng.randint(0, 8),
+                'wilaya_code': rng.choice(codes),
+                'wilaya_name': None,
+                'collected_at': f'2026-01-{rng.randint(1, 28):02d}T00:00:00',
+            }
+            for i in range(count)
+        ]
+    return make
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """main's data paths moved under a temporary directory for the test"""
+    import main
+    for name in PATH_GLOBALS:
+        monkeypatch.setattr(main, name, getattr(main, name))
+    main.use_data_dir(tmp_path / 'data')
+    return tmp_path / 'data'
@@ -0,0 +1,128 @@
+"""
+Tests of CollectionPlanner: estimates, fitting wilayas into a rate
+budget with user allowances, and ordering users by expected value
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from collectors.collection_planner import CollectionPlanner, available_budget, MAX_URGENCY
+from collectors.run_stats import RunStats
+from collectors.token_pool import TokenPool
+
+
+NOW = datetime(2026, 3, 1)
+
+WILAYAS = [
+    {'code': '16', 'name_en': 'Algiers', 'search_terms': ['Algiers']},
+    {'code': '31', 'name_en': 'Oran', 'search_terms': ['Oran']},
+    {'code': '25', 'name_en': 'Constantine', 'search_terms': ['Constantine', 'Qacentina']},
+]
+
+
+def stored_users(code, count, followers, age_days):
+    return [{'username': f'{code}-{i}', 'wilaya_code': code, 'followers': followers - i, 'public_repos': 3,
+             'total_stars': 0, 'collected_at': (NOW - timedelta(days=age_days)).isoformat()}
+            for i in range(count)]
+
+
+def budget(core=5000, search=30, graphql=5000, reset_in=100.0):
+    """Budget whose whole remainder can be sent at once, resetting after `reset_in` seconds"""
+    return {resource: {'remaining': remaining, 'limit': remaining, 'burst': remaining,
+                       'window': 3600.0, 'reset_in': reset_in}
+            for resource, remaining in [('core', core), ('search', search), ('graphql', graphql)]}
+
+
+@pytest.fixture
+def planner():
+    # Algiers holds the best-ranked users, all overdue; Oran's are fresh and lower ranked
+    users = stored_users('16', 10, 100, age_days=30) + stored_users('31', 10, 50, age_days=0)
+    return CollectionPlanner(WILAYAS, RunStats(), users, concurrency=1000, now=NOW)
+
+
+def test_estimate_from_stored_users_and_defaults(planner):
+    algiers = planner.estimate(WILAYAS[0])
+    assert (algiers['search'], algiers['found'], algiers['new'], algiers['enrich']) == (1, 10, 0, 10)
+    # One details request and one repository page per user
+    assert algiers['per_user'] == {'core': 2.0, 'graphql': 0.0}
+    
+    constantine = planner.estimate(WILAYAS[2])
+    assert (constantine['search'], constantine['found'], constantine['new']) == (2, 60, 60)
+
+
+def test_estimate_from_run_stats():
+    stats = RunStats()
+    stats.record_wilaya('16', {'search': 6, 'core': 900}, {'Algiers': 450}, 450, 300, 150, 12.0)
+    planner = CollectionPlanner(WILAYAS, stats, now=NOW)
+    estimate = planner.estimate(WILAYAS[0])
+    assert (estimate['search'], estimate['found'], estimate['enrich']) == (6, 450, 450)
+    assert estimate['per_user']['core'] == 3.0
+
+
+def test_plan_without_window_takes_everything_by_value(planner):
+    plan = planner.plan(budget())
+    assert [wilaya['code'] for wilaya in plan.wilayas()][0] == '16'
+    assert plan.complete and not plan.skipped
+    assert plan.requests['search'] == 4
+    assert plan.requests['core'] == sum(entry['requests']['core'] for entry in plan.entries)
+
+
+def test_fallback_order_when_nothing_is_known():
+    planner = CollectionPlanner(WILAYAS, RunStats(), fallback_order=['31', '25'], now=NOW)
+    assert [wilaya['code'] for wilaya in planner.plan(budget()).wilayas()] == ['31', '25', '16']
+
+
+def test_budget_gives_last_wilaya_an_allowance(planner):
+    order = [wilaya['code'] for wilaya in planner.plan(budget()).wilayas()]
+    first = planner.plan(budget()).entries[0]['requests']['core']
+    
+    plan = planner.plan(budget(core=first + 9), window_seconds=60)
+    assert plan.entries[0]['allowance'] is None
+    second = plan.entries[1]
+    assert second['wilaya']['code'] == order[1]
+    # 9 requests left at 2 per user
+    assert second['allowance'] == 4
+    assert plan.is_partial(order[1]) and not plan.is_partial(order[0])
+    assert [entry['wilaya']['code'] for entry in plan.skipped] == order[2:]
+    assert plan.requests['core'] <= first + 9
+    assert not plan.complete
+
+
+def test_wilaya_without_room_for_one_user_is_skipped(planner):
+    plan = planner.plan(budget(core=1), window_seconds=60)
+    assert plan.entries == []
+    assert len(plan.skipped) == 3
+
+
+def test_select_users_orders_by_value_and_cuts_to_allowance(planner):
+    first = planner.plan(budget()).entries[0]['requests']['core']
+    plan = planner.plan(budget(core=first + 9), window_seconds=60)
+    code = plan.wilayas()[1]['code']
+    logins = ['new-user'] + [f'{code}-{i}' for i in range(9, -1, -1)]
+    
+    selected, deferred = plan.select_users(code, logins)
+    assert len(selected) == 4 and len(deferred) == len(logins) - 4
+    priorities = [planner.priority(login, code) for login in selected + deferred]
+    assert priorities == sorted(priorities, reverse=True)
+    # A wilaya without an allowance keeps every login
+    assert plan.select_users(plan.wilayas()[0]['code'], logins) == (planner.order_users('16', logins), [])
+
+
+def test_priority_of_new_users_uses_wilaya_mean(planner):
+    mean = planner.wilaya_mean_values['16']
+    assert planner.priority('unknown', '16') == pytest.approx(mean * MAX_URGENCY)
+    assert planner.priority('unknown', '48') == pytest.approx(planner.mean_value * MAX_URGENCY)
+    # Fresh stored users are worth little until they go stale
+    assert planner.priority('31-0', '31') < planner.priority('16-5', '16')
+
+
+def test_available_budget_sums_tokens(clock):
+    pool = TokenPool(['a', 'b'], clock=clock)
+    for token, remaining in [('a', 100), ('b', 250)]:
+        pool.update(token, 'core', {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Limit': '5000',
+                                    'X-RateLimit-Reset': str(int(clock.now) + 600)}, 200)
+    core = available_budget(pool, now=clock.now)['core']
+    assert core['remaining'] == 350
+    assert core['limit'] == 10000
+    assert core['reset_in'] == pytest.approx(600)
@@ -0,0 +1,91 @@
+"""
+Tests of the columnar snapshot: writing users and reading them back
+through the memory-mapped columns, and main's staleness check
+"""
+
+import os
+import json
+
+import pytest
+
+import main
+from storage.columnar_snapshot import ColumnarSnapshot, write_snapshot, MANIFEST_NAME, NUMERIC_COLUMNS
+from storage.raw_data import write_raw_users, raw_data_path
+
+
+USERS = [
+    {'username': 'amel', 'name': 'Amel Aït Ouméziane', 'location': 'Tizi Ouzou', 'wilaya_code': '15',
+     'followers': 12, 'following': 3, 'public_repos': 4, 'public_gists': 1, 'total_stars': 40, 'total_forks': 2},
+    # Missing and null counters are stored as 0, but the record keeps them as they were
+    {'username': 'b', 'name': None, 'location': None, 'wilaya_code': None, 'followers': None, 'total_stars': 7},
+    {'username': 'يوسف', 'bio': '', 'wilaya_code': '16', 'followers': 5, 'public_repos': 0},
+]
+
+
+def test_round_trip(tmp_path):
+    assert write_snapshot(tmp_path / 'snapshot', USERS) == 3
+    snapshot = ColumnarSnapshot.open(tmp_path / 'snapshot')
+    
+    assert len(snapshot) == 3
+    assert snapshot.column('followers').tolist() == [12, 0, 5]
+    assert snapshot.column('total_forks').tolist() == [2, 0, 0]
+    assert snapshot.column('wilaya_code').tolist() == [15, 0, 16]
+    assert snapshot.logins() == ['amel', 'b', 'يوسف']
+    assert snapshot.login(2) == 'يوسف'
+    assert [snapshot.record(i) for i in range(3)] == USERS
+    assert list(snapshot.records([2, 0])) == [USERS[2], USERS[0]]
+    
+    rows = snapshot.rows(snapshot.column('followers').argsort()[::-1])
+    assert len(rows) == 3
+    assert rows[0]['username'] == 'amel'
+    assert rows[2]['name'] is None
+
+
+def test_columns_are_read_only_memory_maps(tmp_path):
+    write_snapshot(tmp_path / 'snapshot', USERS)
+    column = ColumnarSnapshot.open(tmp_path / 'snapshot').column('total_stars')
+    assert set(NUMERIC_COLUMNS) <= set(json.loads((tmp_path / 'snapshot' / MANIFEST_NAME).read_text())['columns'])
+    with pytest.raises(ValueError):
+        column[0] = 1
+
+
+def test_empty_snapshot(tmp_path):
+    assert write_snapshot(tmp_path / 'snapshot', []) == 0
+    snapshot = ColumnarSnapshot.open(tmp_path / 'snapshot')
+    assert len(snapshot) == 0
+    assert snapshot.logins() == []
+    assert list(snapshot.records()) == []
+
+
+def test_rewrite_replaces_previous_snapshot(tmp_path):
+    assert ColumnarSnapshot.open(tmp_path / 'snapshot') is None
+    write_snapshot(tmp_path / 'snapshot', USERS)
+    write_snapshot(tmp_path / 'snapshot', USERS[:1])
+    assert ColumnarSnapshot.open(tmp_path / 'snapshot').logins() == ['amel']
+    assert not (tmp_path / 'snapshot.partial').exists()
+
+
+def test_unknown_version_is_rejected(tmp_path):
+    write_snapshot(tmp_path / 'snapshot', USERS)
+    manifest_path = tmp_path / 'snapshot' / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest['version'] = 99
+    manifest_path.write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        ColumnarSnapshot.open(tmp_path / 'snapshot')
+
+
+def test_snapshot_older_than_raw_data_is_stale(data_dir):
+    raw_path = raw_data_path(main.RAW_DATA_DIR, '16')
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    write_raw_users(str(raw_path), USERS[2:])
+    assert main.load_ranking_snapshot() is None
+    
+    write_snapshot(main.SNAPSHOT_DIR, USERS)
+    manifest_mtime = (main.SNAPSHOT_DIR / MANIFEST_NAME).stat().st_mtime
+    os.utime(raw_path, (manifest_mtime - 10, manifest_mtime - 10))
+    assert main.load_ranking_snapshot().logins() == ['amel', 'b', 'يوسف']
+    
+    # Collecting again after the snapshot was written makes it stale
+    os.utime(raw_path, (manifest_mtime + 10, manifest_mtime + 10))
+    assert main.load_ranking_snapshot() is None
@@ -0,0 +1,44 @@
+"""
+Tests of count_new_events: counting contribution events newer than the
+previous poll's cursor
+"""
+
+from collectors.contribution_ingester import count_new_events
+
+
+def event(event_id, kind='PushEvent', day='2026-03-01'):
+    return {'id': str(event_id), 'type': kind, 'created_at': f'{day}T12:00:00Z'}
+
+
+def test_first_poll_counts_every_contribution_by_day():
+    events = [event(30, day='2026-03-02'), event(20, 'WatchEvent'), event(10, 'IssuesEvent')]
+    days, newest, reached = count_new_events(events, 0)
+    assert days == {'2026-03-02': 1, '2026-03-01': 1}
+    assert newest == 30
+    assert not reached
+
+
+def test_stops_at_cursor():
+    events = [event(50), event(40, 'PullRequestEvent'), event(30), event(20)]
+    days, newest, reached = count_new_events(events, 30)
+    assert sum(days.values()) == 2
+    assert newest == 50
+    assert reached
+
+
+def test_nothing_new_keeps_cursor():
+    days, newest, reached = count_new_events([event(30), event(20)], 30)
+    assert not days
+    assert newest == 30
+    assert reached
+
+
+def test_non_contribution_events_move_cursor():
+    days, newest, reached = count_new_events([event(70, 'ForkEvent'), event(60, 'WatchEvent')], 55)
+    assert not days
+    assert newest == 70
+    assert not reached
+
+
+def test_empty_page():
+    assert count_new_events([], 12) == ({}, 12, False)
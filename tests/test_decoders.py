@@ -0,0 +1,41 @@
+"""
+Tests of the typed response decoders: projection onto the declared
+fields and rejection of payloads of the wrong shape
+"""
+
+import pytest
+
+from collectors.decoders import SEARCH_PAGE, USER_DETAILS, REPO_PAGE, EVENT_PAGE, PayloadError, decode_json
+
+
+def test_user_details_keep_declared_fields():
+    details = USER_DETAILS.decode(b'{"login": "a", "followers": 7, "node_id": "x", "plan": {"name": "pro"}}')
+    assert details == {'login': 'a', 'followers': 7}
+
+
+def test_search_page_projects_nested_items():
+    page = SEARCH_PAGE.decode(b'{"total_count": 2, "items": [{"login": "a", "id": 1}, {"login": "b", "score": 1.0}]}')
+    assert page == {'total_count': 2, 'items': [{'login': 'a'}, {'login': 'b'}]}
+
+
+def test_list_payloads():
+    repos = REPO_PAGE.decode(b'[{"stargazers_count": 3, "forks_count": 1, "name": "r"}]')
+    assert repos == [{'stargazers_count': 3, 'forks_count': 1}]
+    events = EVENT_PAGE.decode(b'[{"id": "1", "type": "PushEvent", "created_at": "2026-01-01", "actor": {}}]')
+    assert events == [{'id': '1', 'type': 'PushEvent', 'created_at': '2026-01-01'}]
+
+
+@pytest.mark.parametrize('decoder,body', [
+    (USER_DETAILS, b'[]'),
+    (EVENT_PAGE, b'{"message": "Not Found"}'),
+    (REPO_PAGE, b'not json'),
+])
+def test_wrong_shape_raises_payload_error(decoder, body):
+    with pytest.raises(PayloadError):
+        decoder.decode(body)
+
+
+def test_decode_json_raises_payload_error():
+    assert decode_json(b'{"a": [1]}') == {'a': [1]}
+    with pytest.raises(PayloadError):
+        decode_json(b'{"a": ')
@@ -0,0 +1,113 @@
+"""
+Tests of the batched GraphQL enrichment queries and of mapping their
+results onto the REST detail shape
+"""
+
+import pytest
+
+from collectors.decoders import PayloadError
+from collectors.graphql_enrichment import (
+    build_batch_query, build_repos_page_query, parse_batch_response, parse_repos_page, to_rest_details,
+    REPOS_PAGE_SIZE
+)
+
+
+def node(login, stars=(3, 4), forks=(1, 0), next_cursor=None, **fields):
+    return {
+        'login': login,
+        'name': None,
+        'avatarUrl': f'https://avatars.example/{login}',
+        'bio': None,
+        'company': None,
+        'location': 'Algiers',
+        'email': '',
+        'websiteUrl': None,
+        'twitterUsername': None,
+        'createdAt': '2020-01-01T00:00:00Z',
+        'updatedAt': '2026-01-01T00:00:00Z',
+        'followers': {'totalCount': 12},
+        'following': {'totalCount': 3},
+        'gists': {'totalCount': 2},
+        'repositories': {
+            'totalCount': len(stars),
+            'pageInfo': {'hasNextPage': next_cursor is not None, 'endCursor': next_cursor},
+            'nodes': [{'stargazerCount': s, 'forkCount': f} for s, f in zip(stars, forks)],
+        },
+        **fields,
+    }
+
+
+def test_batch_query_aliases_every_login():
+    query, variables = build_batch_query(['alice', 'bob', 'carol'])
+    assert variables == {'l0': 'alice', 'l1': 'bob', 'l2': 'carol'}
+    assert 'query($l0: String!, $l1: String!, $l2: String!)' in query
+    for i in range(3):
+        assert f'u{i}: user(login: $l{i}) {{ ...UserFields }}' in query
+    assert query.count('fragment UserFields on User') == 1
+    # The first page of repositories needs no cursor variable
+    assert '$cursor' not in query
+    assert f'repositories(first: {REPOS_PAGE_SIZE}, ownerAffiliations: OWNER, privacy: PUBLIC)' in query
+
+
+def test_repos_page_query_passes_cursor():
+    query, variables = build_repos_page_query('alice', 'Y3Vyc29y')
+    assert variables == {'login': 'alice', 'cursor': 'Y3Vyc29y'}
+    assert 'after: $cursor' in query
+
+
+def test_rest_details_shape():
+    details = to_rest_details(node('alice', websiteUrl='https://alice.dev'))
+    assert details == {
+        'login': 'alice',
+        'name': None,
+        'avatar_url': 'https://avatars.example/alice',
+        'bio': None,
+        'company': None,
+        'location': 'Algiers',
+        'email': None,
+        'blog': 'https://alice.dev',
+        'twitter_username': None,
+        'followers': 12,
+        'following': 3,
+        'public_repos': 2,
+        'public_gists': 2,
+        'created_at': '2020-01-01T00:00:00Z',
+        'updated_at': '2026-01-01T00:00:00Z',
+    }
+    assert to_rest_details(node('bob'))['blog'] == ''
+
+
+def test_parse_sums_first_page_and_keeps_cursor():
+    payload = {'data': {'u0': node('alice'), 'u1': node('bob', stars=(10,), forks=(2,), next_cursor='abc')}}
+    results = parse_batch_response(payload, ['alice', 'bob'])
+    assert results['alice']['total_stars'] == 7
+    assert results['alice']['total_forks'] == 1
+    assert results['alice']['cursor'] is None
+    assert results['bob']['cursor'] == 'abc'
+    assert results['bob']['details']['login'] == 'bob'
+
+
+def test_parse_skips_null_and_missing_users():
+    payload = {'data': {'u0': None, 'u2': node('carol')},
+               'errors': [{'type': 'NOT_FOUND', 'path': ['u0']}]}
+    results = parse_batch_response(payload, ['ghost', 'missing', 'carol'])
+    assert list(results) == ['carol']
+
+
+def test_parse_without_data_raises():
+    with pytest.raises(PayloadError):
+        parse_batch_response({'errors': [{'message': 'Bad credentials'}]}, ['alice'])
+
+
+def test_parse_malformed_node_raises_payload_error():
+    bad = node('alice')
+    del bad['followers']
+    with pytest.raises(PayloadError):
+        parse_batch_response({'data': {'u0': bad}}, ['alice'])
+
+
+def test_parse_repos_page():
+    connection = node('alice', stars=(5, 6), forks=(1, 1), next_cursor='xyz')['repositories']
+    assert parse_repos_page({'data': {'user': {'repositories': connection}}}) == (11, 2, 'xyz')
+    with pytest.raises(PayloadError):
+        parse_repos_page({'data': {'user': None}, 'errors': [{'type': 'NOT_FOUND'}]})
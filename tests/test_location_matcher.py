@@ -0,0 +1,82 @@
+"""
+Tests of LocationMatcher: whole-word Aho-Corasick matching of profile
+locations against wilaya terms, and choosing one wilaya per location
+"""
+
+import pytest
+
+from collectors.location_matcher import LocationMatcher, normalize_location, UNCLASSIFIED_CODE, UNCLASSIFIED_NAME
+
+
+WILAYAS = [
+    {'code': '16', 'name_en': 'Algiers', 'name_fr': 'Alger', 'name_ar': 'الجزائر',
+     'cities': ['Bab Ezzouar'], 'search_terms': ['Algiers', 'Alger']},
+    {'code': '22', 'name_en': 'Sidi Bel Abbes', 'name_fr': 'Sidi Bel Abbès', 'name_ar': 'سيدي بلعباس',
+     'cities': [], 'search_terms': []},
+    {'code': '06', 'name_en': 'Bejaia', 'name_fr': 'Béjaïa', 'name_ar': 'بجاية', 'cities': ['Akbou'],
+     'search_terms': []},
+    {'code': '44', 'name_en': 'Sidi', 'cities': ['Bel'], 'search_terms': []},
+    {'code': '01', 'name_en': 'Adrar', 'cities': ['Timimoun'], 'search_terms': []},
+    {'code': '49', 'name_en': 'Timimoun', 'cities': [], 'search_terms': []},
+]
+
+
+@pytest.fixture
+def matcher():
+    return LocationMatcher(WILAYAS)
+
+
+def test_normalize_location():
+    assert normalize_location('Béjaïa, ALGÉRIE!') == 'bejaia algerie'
+    assert normalize_location(None) == ''
+
+
+def test_overlapping_terms_keep_longest_match(matcher):
+    # 'Sidi' and 'Bel' (wilaya 44) lie inside 'Sidi Bel Abbes' (wilaya 22)
+    assert matcher.scores('Sidi Bel Abbes, Algeria') == {'22': len('sidi bel abbes'), '44': len('sidi')}
+    assert matcher.classify('Sidi Bel Abbes, Algeria') == '22'
+    assert matcher.classify('Sidi, Algeria') == '44'
+
+
+def test_terms_match_whole_words_only(matcher):
+    assert matcher.scores('Algerian developer') == {}
+    assert matcher.scores('Akboukou') == {}
+    assert matcher.scores('Bab Ezzouar') == {'16': len('bab ezzouar')}
+
+
+def test_accents_and_case_are_folded(matcher):
+    for location in ['BEJAIA', 'béjaïa', 'Bejaïa - Akbou', 'akbou']:
+        assert matcher.classify(location) == '06'
+    assert matcher.classify('SIDI BEL ABBÈS') == '22'
+    assert matcher.classify('الجزائر') == '16'
+
+
+def test_tie_goes_to_lowest_code(matcher):
+    # 'Timimoun' is a city of Adrar and a wilaya of its own
+    assert matcher.scores('Timimoun') == {'01': 8, '49': 8}
+    assert matcher.classify('Timimoun') == '01'
+    assert matcher.best('Timimoun', ['49', '01']) == '01'
+
+
+def test_best_among_candidates(matcher):
+    assert matcher.best('Akbou, Béjaïa', ['16', '06']) == '06'
+    # No candidate named: lowest code
+    assert matcher.best('Somewhere', ['22', '16']) == '16'
+
+
+def test_country_only_location_is_unclassified(matcher):
+    assert matcher.classify('Algeria') is None
+    assert matcher.classify(None) is None
+    
+    by_code = matcher.assign([{'username': 'a', 'location': 'Algeria'},
+                              {'username': 'b', 'location': 'Alger, Algeria'}])
+    assert [user['username'] for user in by_code[UNCLASSIFIED_CODE]] == ['a']
+    assert by_code[UNCLASSIFIED_CODE][0]['wilaya_name'] == UNCLASSIFIED_NAME
+    assert by_code['16'][0]['wilaya_name'] == 'Algiers'
+
+
+def test_matches_real_configuration(config):
+    matcher = LocationMatcher(config['wilayas'])
+    assert matcher.classify('Oran, Algeria') == '31'
+    assert matcher.classify('Tizi Ouzou') == '15'
+    assert matcher.classify('Algérie') is None
@@ -0,0 +1,84 @@
+"""
+Tests of node sharding: consistent-hash ownership of wilayas and search
+shards, and merging the data collected by several nodes
+"""
+
+import pytest
+
+import main
+from collectors.node_sharding import NodeShard
+from storage.raw_data import write_raw_users, raw_data_path, iter_all_raw_users
+
+
+WILAYA_CODES = [f'{code:02d}' for code in range(1, 59)]
+QUERIES = [f'location:Algiers followers:{low}..{low + 9}' for low in range(0, 500, 10)]
+
+
+def nodes(count):
+    return [NodeShard(index, count) for index in range(1, count + 1)]
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 5])
+def test_every_key_has_exactly_one_owner(count):
+    shards = nodes(count)
+    for code in WILAYA_CODES:
+        assert sum(shard.owns_wilaya(code) for shard in shards) == 1
+    for query in QUERIES:
+        assert sum(shard.owns_search(query) for shard in shards) == 1
+    # Every node computes the same ring
+    assert {shard.owner('wilaya:16') for shard in shards} == {shards[0].owner('wilaya:16')}
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before, after = NodeShard(1, 3), NodeShard(1, 4)
+    keys = [f'wilaya:{code}' for code in WILAYA_CODES] + [f'search:{query}' for query in QUERIES]
+    moved = [key for key in keys if before.owner(key) != after.owner(key)]
+    assert moved
+    assert all(after.owner(key) == 4 for key in moved)
+    # Roughly a quarter of the keys move, not a reshuffle
+    assert len(moved) < len(keys) / 2
+
+
+def test_every_node_gets_a_share():
+    owners = [NodeShard(1, 3).owner(f'wilaya:{code}') for code in WILAYA_CODES]
+    assert set(owners) == {1, 2, 3}
+
+
+@pytest.mark.parametrize('spec', ['0/3', '4/3', '1/0', '2', 'a/b', '1/2/3'])
+def test_invalid_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        NodeShard.parse(spec)
+
+
+def test_parse():
+    shard = NodeShard.parse('2/3')
+    assert (shard.index, shard.count) == (2, 3)
+    assert str(shard) == '2/3'
+
+
+def user(login, code, location, collected_at, followers=5):
+    return {'username': login, 'wilaya_code': code, 'location': location, 'followers': followers,
+            'public_repos': 1, 'public_gists': 0, 'total_stars': 0, 'collected_at': collected_at}
+
+
+def test_merge_keeps_freshest_record_under_best_wilaya(tmp_path, data_dir, config):
+    node1, node2 = tmp_path / 'node1', tmp_path / 'node2'
+    write_raw_users(str(raw_data_path(node1 / 'raw', '16')), [
+        user('a', '16', 'Algiers', '2026-01-01T00:00:00', followers=5),
+        user('b', '16', 'Oran, Algeria', '2026-01-05T00:00:00', followers=9),
+    ])
+    write_raw_users(str(raw_data_path(node2 / 'raw', '31')), [
+        user('a', '31', 'Algiers', '2026-02-01T00:00:00', followers=7),
+        user('b', '31', 'Oran, Algeria', '2026-01-02T00:00:00', followers=8),
+        user('c', '31', 'Oran', '2026-01-03T00:00:00'),
+    ])
+    
+    main.merge_node_data(config, [str(node1), str(node2 / 'raw')])
+    
+    merged = {u['username']: u for u in iter_all_raw_users(data_dir / 'raw')}
+    assert set(merged) == {'a', 'b', 'c'}
+    # The newest record wins, filed under the wilaya its location names
+    assert (merged['a']['followers'], merged['a']['wilaya_code']) == (7, '16')
+    assert (merged['b']['followers'], merged['b']['wilaya_code']) == (9, '31')
+    assert merged['c']['wilaya_code'] == '31'
+    assert (data_dir / 'snapshot').exists()
@@ -0,0 +1,101 @@
+"""
+Tests of ProgressJournal: replaying a run on resume, surviving a torn
+final line, and grouping the fsyncs of user records
+"""
+
+import os
+
+import pytest
+
+from collectors import progress_journal
+from collectors.progress_journal import ProgressJournal, USER_SYNC_BATCH
+
+
+def user(login, code='16'):
+    return {'username': login, 'wilaya_code': code, 'followers': 5}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'journal' / 'collect_all.jsonl')
+
+
+def test_resume_replays_recorded_work(path):
+    journal = ProgressJournal(path)
+    journal.record_search_page('location:Algiers', 1, {'total_count': 2, 'incomplete_results': False,
+                                                        'items': [{'login': 'a', 'id': 1}, {'login': 'b'}]})
+    journal.record_user(user('a'))
+    journal.record_missing_user('16', 'b')
+    journal.finish_wilaya('31', 40)
+    journal.close()
+    
+    resumed = ProgressJournal(path, resume=True)
+    try:
+        assert resumed.search_page('location:Algiers', 1) == {'total_count': 2,
+                                                               'items': [{'login': 'a'}, {'login': 'b'}]}
+        assert resumed.search_page('location:Algiers', 2) is None
+        assert resumed.user('16', 'a') == user('a')
+        assert resumed.is_user_done('16', 'a') and resumed.is_user_done('16', 'b')
+        assert not resumed.is_user_done('31', 'a')
+        assert resumed.is_finished('31') and not resumed.is_finished('16')
+    finally:
+        resumed.close()
+
+
+def test_without_resume_starts_empty(path):
+    journal = ProgressJournal(path)
+    journal.finish_wilaya('31', 40)
+    journal.close()
+    
+    fresh = ProgressJournal(path)
+    fresh.close()
+    assert not fresh.is_finished('31')
+    assert os.path.getsize(path) == 0
+
+
+def test_torn_last_line_is_skipped(path):
+    journal = ProgressJournal(path)
+    journal.record_user(user('a'))
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "user", "user": {"usern')
+    
+    resumed = ProgressJournal(path, resume=True)
+    resumed.record_user(user('c'))
+    resumed.close()
+    
+    again = ProgressJournal(path, resume=True)
+    again.close()
+    assert set(again.users) == {('16', 'a'), ('16', 'c')}
+
+
+def test_complete_removes_journal(path):
+    journal = ProgressJournal(path)
+    journal.finish_wilaya('16', 1)
+    journal.complete()
+    assert not os.path.exists(path)
+
+
+def test_user_records_are_fsynced_in_groups(path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(progress_journal.os, 'fsync', synced.append)
+    journal = ProgressJournal(path)
+    
+    for i in range(USER_SYNC_BATCH - 1):
+        journal.record_user(user(f'u{i}'))
+    assert synced == []
+    journal.record_missing_user('16', 'gone')
+    assert len(synced) == 1
+    
+    journal.record_user(user('late'))
+    journal.finish_wilaya('16', USER_SYNC_BATCH + 1)
+    assert len(synced) == 2
+    
+    journal.record_user(user('last', '31'))
+    journal.close()
+    assert len(synced) == 3
+    
+    # Unsynced records were still written to the file
+    resumed = ProgressJournal(path, resume=True)
+    resumed.close()
+    assert resumed.user('31', 'last') is not None
@@ -0,0 +1,97 @@
+"""
+Tests of the vectorized ordering in processors.rank_engine against a
+stable descending sort
+"""
+
+import numpy as np
+import pytest
+
+from processors.rank_engine import descending_order, grouped_descending_order, ranks_within_groups, group_spans
+
+
+def stable_descending(scores):
+    """Reference order: sorted(rows, key=score, reverse=True)"""
+    return sorted(range(len(scores)), key=lambda row: scores[row], reverse=True)
+
+
+def grouped_reference(groups, scores):
+    return sorted(range(len(scores)), key=lambda row: (groups[row], -scores[row], row))
+
+
+@pytest.fixture
+def tied_scores():
+    return np.random.default_rng(0).integers(0, 8, size=500)
+
+
+def test_descending_order_matches_stable_sort(tied_scores):
+    assert descending_order(tied_scores).tolist() == stable_descending(tied_scores.tolist())
+
+
+def test_descending_order_of_floats():
+    scores = np.random.default_rng(1).integers(0, 5, size=200) / 2
+    assert descending_order(scores).tolist() == stable_descending(scores.tolist())
+
+
+@pytest.mark.parametrize('limit', [1, 7, 63, 64, 250, 499])
+def test_descending_order_limit_keeps_earliest_ties(tied_scores, limit):
+    # Most limits cut through a run of tied scores, taking the partition path
+    assert descending_order(tied_scores, limit).tolist() == stable_descending(tied_scores.tolist())[:limit]
+
+
+def test_descending_order_limit_out_of_range(tied_scores):
+    assert descending_order(tied_scores, 0).tolist() == []
+    assert descending_order(tied_scores, -3).tolist() == []
+    assert descending_order(tied_scores, 10_000).tolist() == stable_descending(tied_scores.tolist())
+
+
+def test_descending_order_all_tied():
+    scores = np.full(50, 4)
+    assert descending_order(scores, 10).tolist() == list(range(10))
+
+
+def test_grouped_order_packed_keys():
+    rng = np.random.default_rng(2)
+    groups = rng.integers(1, 6, size=400)
+    scores = rng.integers(0, 10, size=400)
+    order, starts, group_ids = grouped_descending_order(groups, scores)
+    
+    assert order.tolist() == grouped_reference(groups.tolist(), scores.tolist())
+    assert group_ids.tolist() == sorted(set(groups.tolist()))
+    ordered_groups = groups[order].tolist()
+    assert starts.tolist() == [position for position, group in enumerate(ordered_groups)
+                               if position == 0 or ordered_groups[position - 1] != group]
+
+
+@pytest.mark.parametrize('scores', [
+    np.array([2.5, 1.0, 2.5, 3.0, 1.0, 0.5]),
+    # Too wide for the packed int64 key
+    np.array([2 ** 62, 0, 2 ** 62, 5, 0, 1], dtype=np.int64),
+])
+def test_grouped_order_lexsort_fallback(scores):
+    groups = np.array([2, 1, 2, 1, 1, 2])
+    order, starts, group_ids = grouped_descending_order(groups, scores)
+    assert order.tolist() == grouped_reference(groups.tolist(), scores.tolist())
+    assert starts.tolist() == [0, 3]
+    assert group_ids.tolist() == [1, 2]
+
+
+def test_grouped_order_empty():
+    order, starts, group_ids = grouped_descending_order(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    assert len(order) == len(starts) == len(group_ids) == 0
+
+
+def test_ranks_within_groups():
+    assert ranks_within_groups(np.array([0, 3, 4]), 7).tolist() == [1, 2, 3, 1, 1, 2, 3]
+
+
+@pytest.mark.parametrize('groups', [
+    np.array([31, 16, 31, 25, 16, 16, 31]),
+    # Outside the int16 fast path
+    np.array([40000, 16, 40000, -1, 16, -1, 31]),
+])
+def test_group_spans_keep_row_order(groups):
+    order, starts, group_ids = group_spans(groups)
+    expected = sorted(range(len(groups)), key=lambda row: (groups[row], row))
+    assert order.tolist() == expected
+    assert group_ids.tolist() == sorted(set(groups.tolist()))
+    assert [groups[order[start]] for start in starts] == group_ids.tolist()
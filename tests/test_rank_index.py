@@ -0,0 +1,199 @@
+"""
+Tests of RankIndex and RankKeys: bisection arithmetic against a sorted
+list, and incremental deltas against a full RankingProcessor run
+"""
+
+import random
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import main
+from processors.ranking_processor import RankingProcessor, SCORE_COLUMNS
+from processors.rank_index import RankIndex, RankKeys, rank_key, split_key
+
+
+def test_rank_key_round_trip():
+    for score, seq in [(0, 0), (5, 3), (2 ** 40, 2 ** 32 - 1), (17, 123456)]:
+        assert split_key(rank_key(score, seq)) == (score, seq)
+    # Higher scores sort first, ties by sequence number
+    assert rank_key(9, 5) < rank_key(8, 0) < rank_key(8, 1)
+
+
+def test_rank_keys_match_sorted_list():
+    rng = random.Random(0)
+    initial = sorted(rng.sample(range(-5000, 5000), 400))
+    keys = RankKeys(np.array(initial, dtype=np.int64))
+    present = list(initial)
+    
+    for _ in range(600):
+        if present and rng.random() < 0.5:
+            key = rng.choice(present)
+            keys.remove(key)
+            present.remove(key)
+        else:
+            key = rng.randrange(-6000, 6000)
+            if key in present:
+                continue
+            keys.add(key)
+            present.append(key)
+        present.sort()
+        
+        assert len(keys) == len(present)
+        probe = rng.randrange(-6000, 6000)
+        assert keys.position(probe) == sum(1 for key in present if key < probe)
+    
+    for key in present[::25]:
+        assert keys.position(key) == present.index(key)
+    assert keys.head() == present
+    assert keys.head(30) == present[:30]
+
+
+def test_rank_keys_readd_removed_base_key():
+    keys = RankKeys(np.array([1, 2, 3], dtype=np.int64))
+    keys.remove(2)
+    keys.add(2)
+    assert not keys.added and not keys.removed
+    assert keys.head() == [1, 2, 3]
+
+
+def columns_of(users):
+    return {name: np.array([user.get(name, 0) for user in users], dtype=np.int64) for name in SCORE_COLUMNS}
+
+
+def build_index(path, processor, users):
+    index = RankIndex(str(path), processor)
+    index.build([user['username'] for user in users], columns_of(users), [user['wilaya_code'] for user in users])
+    return index
+
+
+def assert_matches_processor(index, processor, users):
+    """Every ranking of the index equals a full run over `users` (in index sequence order)"""
+    rankings = processor.process_rankings(users)
+    for category in index.categories:
+        expected = [(rank, score, user['username']) for rank, score, user in rankings['national'][category]]
+        assert index.top(category) == expected
+        assert index.total(category) == len(expected)
+        for rank, _, login in expected[::17]:
+            assert index.rank(login, category) == rank
+        
+        codes = {code for code in index.keys[category] if code is not None}
+        assert codes == set(rankings['by_wilaya'][category])
+        for code in codes:
+            expected = [(rank, score, user['username'])
+                        for rank, score, user in rankings['by_wilaya'][category][code]]
+            assert index.top(category, wilaya_code=code) == expected
+            for rank, _, login in expected[::7]:
+                assert index.rank(login, category, wilaya=True) == rank
+
+
+@pytest.fixture
+def processor(config):
+    return RankingProcessor(config, national_top=None, wilaya_top=None)
+
+
+def test_build_matches_processor(tmp_path, processor, make_users):
+    users = processor.filter_users(make_users(500))
+    index = build_index(tmp_path / 'index.sqlite', processor, users)
+    try:
+        assert_matches_processor(index, processor, users)
+    finally:
+        index.close()
+
+
+def test_delta_matches_full_run(tmp_path, processor, make_users):
+    rng = random.Random(4)
+    users = processor.filter_users(make_users(500))
+    index = build_index(tmp_path / 'index.sqlite', processor, users)
+    
+    changed = []
+    for user in rng.sample(users, 60):
+        changed.append(dict(user, followers=rng.randint(3, 12), total_stars=rng.randint(0, 8),
+                            wilaya_code=rng.choice(['16', '31', '25'])))
+    deleted = {user['username'] for user in rng.sample(users, 30)}
+    added = make_users(40, seed=9, prefix='new')
+    # Users dropping below the thresholds leave every ranking
+    dropped = [dict(users[0], followers=0)]
+    
+    counts = index.apply(changed + added + dropped, deleted)
+    assert counts['removed'] >= len(deleted)
+    
+    by_login = {user['username']: user for user in changed + dropped}
+    current = [by_login.get(user['username'], user) for user in users if user['username'] not in deleted]
+    current = processor.filter_users(current + added)
+    try:
+        assert_matches_processor(index, processor, current)
+    finally:
+        index.close()
+    
+    reopened = RankIndex(str(tmp_path / 'index.sqlite'), processor)
+    try:
+        assert reopened.matches()
+        assert_matches_processor(reopened, processor, current)
+    finally:
+        reopened.close()
+
+
+def test_last_state_of_a_login_wins_after_reopen(tmp_path, processor, make_users):
+    users = processor.filter_users(make_users(50))
+    index = build_index(tmp_path / 'index.sqlite', processor, users)
+    login = users[0]['username']
+    # Removed (below the thresholds), then upserted again within one delta
+    index.apply([dict(users[0], followers=0), dict(users[0], followers=12)])
+    rank = index.rank(login, 'followers')
+    index.close()
+    
+    reopened = RankIndex(str(tmp_path / 'index.sqlite'), processor)
+    try:
+        assert login in reopened
+        assert reopened.rank(login, 'followers') == rank
+    finally:
+        reopened.close()
+
+
+def test_replace_wilaya_removes_missing_members(tmp_path, processor, make_users):
+    users = processor.filter_users(make_users(200))
+    index = build_index(tmp_path / 'index.sqlite', processor, users)
+    try:
+        algiers = [user for user in users if user['wilaya_code'] == '16']
+        kept = algiers[::2]
+        counts = index.replace_wilaya('16', kept)
+        assert counts['removed'] == len(algiers) - len(kept)
+        assert sorted(index.members('16')) == sorted(user['username'] for user in kept)
+        assert_matches_processor(index, processor, [user for user in users
+                                                    if user['wilaya_code'] != '16' or user in kept])
+    finally:
+        index.close()
+
+
+def test_unpolled_users_are_not_ranked_in_public_contributions(tmp_path, config, make_users):
+    users = make_users(300, seed=5)
+    contributions = {user['username']: i % 5 for i, user in enumerate(users) if i % 4 == 0}
+    processor = RankingProcessor(config, contributions=contributions, national_top=None, wilaya_top=None)
+    users = processor.filter_users(users)
+    index = build_index(tmp_path / 'index.sqlite', processor, users)
+    try:
+        assert_matches_processor(index, processor, users)
+        unpolled = next(user['username'] for user in users if user['username'] not in contributions)
+        assert index.rank(unpolled, 'public_contributions') is None
+        assert index.rank(unpolled, 'followers') is not None
+        
+        # Polling a user ranks it on the next delta
+        contributions[unpolled] = 3
+        index.apply([user for user in users if user['username'] == unpolled])
+        assert_matches_processor(index, processor, users)
+    finally:
+        index.close()
+
+
+def test_detach_closes_the_collectors_index(tmp_path, processor, make_users):
+    index = build_index(tmp_path / 'index.sqlite', processor, processor.filter_users(make_users(50)))
+    collector = SimpleNamespace(rank_index=index)
+    main.detach_rank_index(collector)
+    assert collector.rank_index is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        index.conn.execute('SELECT 1')
+    # Detaching again is a no-op
+    main.detach_rank_index(collector)
@@ -0,0 +1,96 @@
+"""
+Tests of RankingProcessor: the vectorized rankings against a stable sort
+of calculate_score, top-N leaderboards and the columnar snapshot path
+"""
+
+import pytest
+
+from processors.ranking_processor import RankingProcessor
+from storage.columnar_snapshot import ColumnarSnapshot, write_snapshot
+
+
+def reference(processor, users, category):
+    """(rank, score, login) by a stable descending sort of calculate_score, skipping unranked users"""
+    ranked = [user for user in users if processor.is_ranked(user, category)]
+    ordered = sorted(ranked, key=lambda user: processor.calculate_score(user, category), reverse=True)
+    return [(rank, processor.calculate_score(user, category), user['username'])
+            for rank, user in enumerate(ordered, 1)]
+
+
+def table_rows(table):
+    return [(rank, score, user['username']) for rank, score, user in table]
+
+
+def assert_matches_reference(processor, users, rankings, limits=(None, None)):
+    filtered = processor.filter_users(users)
+    national_top, wilaya_top = limits
+    for category in processor.categories:
+        category_id = category['id']
+        expected = reference(processor, filtered, category_id)
+        table = rankings['national'][category_id]
+        assert table_rows(table) == expected[:national_top]
+        assert table.total == len(expected)
+        
+        codes = {user['wilaya_code'] for user in filtered if processor.is_ranked(user, category_id)}
+        assert set(rankings['by_wilaya'][category_id]) == codes
+        for code in codes:
+            expected = reference(processor, [user for user in filtered if user['wilaya_code'] == code], category_id)
+            assert table_rows(rankings['by_wilaya'][category_id][code]) == expected[:wilaya_top]
+
+
+def test_full_rankings_match_reference(config, make_users):
+    processor = RankingProcessor(config, national_top=None, wilaya_top=None)
+    users = make_users(600)
+    assert_matches_reference(processor, users, processor.process_rankings(users))
+
+
+def test_leaderboards_keep_top_and_exact_ranks(config, make_users):
+    processor = RankingProcessor(config, national_top=25, wilaya_top=10)
+    users = make_users(600, seed=1)
+    rankings = processor.process_rankings(users)
+    assert_matches_reference(processor, users, rankings, limits=(25, 10))
+    
+    table = rankings['national']['followers']
+    expected = {login: rank for rank, _, login in reference(processor, processor.filter_users(users), 'followers')}
+    for row in range(0, len(table.users), 37):
+        assert table.rank_of(row) == expected[table.users[row]['username']]
+
+
+def test_only_polled_users_rank_in_public_contributions(config, make_users):
+    users = make_users(400, seed=2)
+    contributions = {user['username']: i % 7 for i, user in enumerate(users) if i % 3 == 0}
+    processor = RankingProcessor(config, contributions=contributions, national_top=None, wilaya_top=None)
+    rankings = processor.process_rankings(users)
+    assert_matches_reference(processor, users, rankings)
+    
+    ranked = {user['username'] for _, _, user in rankings['national']['public_contributions']}
+    assert ranked and ranked <= set(contributions)
+    # Other categories still rank everyone
+    assert rankings['national']['followers'].total == len(processor.filter_users(users))
+
+
+def test_snapshot_rankings_match_records(config, make_users, tmp_path):
+    processor = RankingProcessor(config, national_top=30, wilaya_top=None)
+    users = make_users(500, seed=3)
+    write_snapshot(tmp_path / 'snapshot', users)
+    from_records = processor.process_rankings(users)
+    from_snapshot = processor.process_snapshot(ColumnarSnapshot.open(tmp_path / 'snapshot'))
+    
+    for category in processor.categories:
+        category_id = category['id']
+        assert table_rows(from_snapshot['national'][category_id]) == \
+            table_rows(from_records['national'][category_id])
+        for code, table in from_records['by_wilaya'][category_id].items():
+            assert table_rows(from_snapshot['by_wilaya'][category_id][code]) == table_rows(table)
+
+
+@pytest.mark.parametrize('category,score', [
+    ('followers', 9),
+    ('repositories', 4),
+    ('stars', 7),
+    ('public_contributions', 4 * 10 + 2 * 5),
+    ('total_contributions', 4 * 12 + 7),
+])
+def test_calculate_score(config, category, score):
+    user = {'username': 'a', 'followers': 9, 'public_repos': 4, 'public_gists': 2, 'total_stars': 7}
+    assert RankingProcessor(config).calculate_score(user, category) == score
@@ -0,0 +1,74 @@
+"""
+Tests of RateCoordinator: coordinators opened on one lease table draw
+down a single rate budget per token
+"""
+
+import pytest
+
+from collectors.rate_coordinator import RateCoordinator
+from collectors.token_pool import TokenPool
+
+
+@pytest.fixture
+def coordinators(tmp_path, clock):
+    path = str(tmp_path / 'leases.sqlite')
+    opened = [RateCoordinator(path, clock=clock), RateCoordinator(path, clock=clock)]
+    yield opened
+    for coordinator in opened:
+        coordinator.close()
+
+
+def headers(remaining):
+    return {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': '5000', 'X-RateLimit-Limit': '5000'}
+
+
+def test_two_coordinators_share_one_budget(coordinators):
+    first, second = (coordinator.limiter_for('token') for coordinator in coordinators)
+    first.update('core', headers(100), 200)
+    
+    for _ in range(3):
+        first.reserve('core')
+        second.reserve('core')
+    assert first.remaining('core') == second.remaining('core') == 94
+    
+    # A budget reported to one process is seen by the other
+    second.update('core', headers(50), 200)
+    assert first.remaining('core') == 50
+
+
+def test_bursts_are_shared(coordinators):
+    first, second = (coordinator.limiter_for('token').bucket('search') for coordinator in coordinators)
+    waits = [bucket.reserve() for _ in range(first.burst) for bucket in (first, second)]
+    # Together the two processes get one burst, then are paced
+    assert waits[:first.burst] == [0.0] * first.burst
+    assert all(wait > 0 for wait in waits[first.burst:])
+
+
+def test_block_is_seen_by_every_process(coordinators, clock):
+    first, second = (coordinator.limiter_for('token') for coordinator in coordinators)
+    assert first.update('core', dict(headers(10), **{'Retry-After': '30'}), 403) is True
+    assert second.reserve('core') == pytest.approx(30.0)
+
+
+def test_tokens_have_separate_rows(coordinators):
+    coordinator = coordinators[0]
+    pool = TokenPool(['a', 'b'], clock=coordinator.clock, limiter_factory=coordinator.limiter_for)
+    pool.update('a', 'core', headers(10), 200)
+    pool.update('b', 'core', headers(20), 200)
+    assert pool.select('core') == 'b'
+    
+    keys = [row[0] for row in coordinator.conn.execute('SELECT key FROM leases')]
+    assert coordinator.bucket_key('a', 'core') in keys
+    # Tokens are only stored as hashes
+    assert not any(key.startswith(('a:', 'b:')) for key in keys)
+
+
+def test_reset_forgets_every_budget(coordinators):
+    first, second = (coordinator.limiter_for('token') for coordinator in coordinators)
+    first.update('core', headers(3), 200)
+    coordinators[1].reset()
+    assert coordinators[0].read(coordinators[0].bucket_key('token', 'core')) == {}
+    
+    # A fresh limiter starts from the full default budget again
+    assert coordinators[1].limiter_for('token').remaining('core') == 5000
+    assert second.remaining('core') == 5000
@@ -0,0 +1,105 @@
+"""
+Tests of the token bucket pacing and of how RateLimiter classifies
+rate-limited responses
+"""
+
+import pytest
+
+from collectors.rate_limiter import TokenBucket, RateLimiter, resource_for_path, SECONDARY_LIMIT_BACKOFF
+
+
+@pytest.mark.parametrize('path,resource', [
+    ('/search/users', 'search'),
+    ('/graphql', 'graphql'),
+    ('/users/octocat/repos', 'core'),
+    ('/rate_limit', None),
+])
+def test_resource_for_path(path, resource):
+    assert resource_for_path(path) == resource
+
+
+def test_bucket_bursts_then_paces(clock):
+    bucket = TokenBucket(limit=100, window=100, burst=5, clock=clock)
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    # The requests left are spread over the seconds left in the window
+    assert bucket.reserve() == pytest.approx(1 / (94 / 100))
+    assert bucket.reserve() == pytest.approx(2 / (93 / 100))
+    
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+    assert bucket.remaining == 92
+
+
+def test_bucket_refund(clock):
+    bucket = TokenBucket(limit=10, window=60, burst=2, clock=clock)
+    bucket.reserve()
+    bucket.refund()
+    assert bucket.remaining == 10
+    assert bucket.tokens == 2.0
+
+
+def test_exhausted_bucket_waits_for_reset(clock):
+    bucket = TokenBucket(limit=2, window=60, burst=10, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+    assert bucket.reserve() == pytest.approx(60.0)
+    
+    clock.now += 61
+    assert bucket.reserve() == 0.0
+    assert bucket.remaining == 1
+
+
+def test_bucket_update_trusts_new_window_only(clock):
+    bucket = TokenBucket(limit=5000, window=3600, burst=10, clock=clock)
+    reset_at = clock.now + 1800
+    bucket.update(remaining=4000, reset_at=reset_at)
+    assert bucket.remaining == 4000
+    # Same window: a stale higher count does not raise the budget
+    bucket.update(remaining=4500, reset_at=reset_at)
+    assert bucket.remaining == 4000
+    bucket.update(remaining=3990, reset_at=reset_at)
+    assert bucket.remaining == 3990
+
+
+def test_blocked_bucket_waits(clock):
+    bucket = TokenBucket(limit=100, window=100, burst=5, clock=clock)
+    bucket.block(clock.now + 30)
+    assert bucket.reserve() == pytest.approx(30.0)
+
+
+def headers(remaining='10', **extra):
+    return {'X-RateLimit-Remaining': remaining, 'X-RateLimit-Reset': '5000', 'X-RateLimit-Limit': '5000', **extra}
+
+
+def test_plain_403_is_not_a_rate_limit(clock):
+    limiter = RateLimiter(clock)
+    assert limiter.update('core', headers(), 403, b'{"message": "Resource not accessible by integration"}') is False
+    assert limiter.bucket('core').blocked_until == 0.0
+
+
+def test_403_with_retry_after_is_retried(clock):
+    limiter = RateLimiter(clock)
+    assert limiter.update('core', headers(**{'Retry-After': '60'}), 403) is True
+    assert limiter.bucket('core').blocked_until == clock.now + 60
+
+
+def test_403_with_spent_budget_waits_for_reset(clock):
+    limiter = RateLimiter(clock)
+    assert limiter.update('core', headers(remaining='0'), 403) is True
+    assert limiter.bucket('core').blocked_until == 5000
+
+
+@pytest.mark.parametrize('status,body', [
+    (403, b'{"message": "You have exceeded a Secondary Rate Limit. Please wait."}'),
+    (429, b''),
+])
+def test_secondary_limit_backs_off(clock, status, body):
+    limiter = RateLimiter(clock)
+    assert limiter.update('search', headers(), status, body) is True
+    assert limiter.bucket('search').blocked_until == clock.now + SECONDARY_LIMIT_BACKOFF
+
+
+def test_success_updates_budget_of_reported_resource(clock):
+    limiter = RateLimiter(clock)
+    assert limiter.update('core', headers(remaining='42', **{'X-RateLimit-Resource': 'search'}), 200) is False
+    assert limiter.remaining('search') == 42
@@ -0,0 +1,94 @@
+"""
+Tests of the NDJSON raw data files: writing and reading them back,
+plain and zstd-compressed, and replacing a wilaya's file across formats
+"""
+
+import json
+
+import pytest
+
+from storage import raw_data
+from storage.raw_data import (
+    RawDataWriter, write_raw_users, iter_raw_users, iter_all_raw_users, raw_data_path, raw_data_files,
+    find_raw_file, partial_files, count_raw_users
+)
+
+
+def users(count, code='16'):
+    return [{'username': f'user{i}', 'wilaya_code': code, 'location': 'Alger, Algérie', 'followers': i}
+            for i in range(count)]
+
+
+@pytest.fixture(params=[False, True], ids=['plain', 'zstd'])
+def compress(request):
+    if request.param:
+        pytest.importorskip('zstandard')
+    return request.param
+
+
+def test_round_trip(tmp_path, compress, monkeypatch):
+    # Small frames, so the compressed file holds several
+    monkeypatch.setattr(raw_data, 'ZSTD_FRAME_USERS', 7)
+    path = raw_data_path(tmp_path, '16', compress)
+    assert path.name == ('wilaya_16.ndjson.zst' if compress else 'wilaya_16.ndjson')
+    
+    assert write_raw_users(str(path), iter(users(40))) == 40
+    assert list(iter_raw_users(path)) == users(40)
+    assert count_raw_users(path) == 40
+    assert partial_files(tmp_path) == []
+
+
+def test_writer_keeps_partial_file_until_closed(tmp_path, compress):
+    path = raw_data_path(tmp_path, '16', compress)
+    writer = RawDataWriter(str(path))
+    writer.write(users(1)[0])
+    assert not path.exists()
+    assert partial_files(tmp_path) == [writer.partial_path]
+    assert raw_data_files(tmp_path) == []
+    writer.close()
+    assert path.exists() and not writer.partial_path.exists()
+
+
+def test_failed_write_leaves_previous_file(tmp_path):
+    path = raw_data_path(tmp_path, '16')
+    write_raw_users(str(path), users(3))
+    
+    def failing():
+        yield from users(2)
+        raise RuntimeError('collection failed')
+    with pytest.raises(RuntimeError):
+        write_raw_users(str(path), failing())
+    assert list(iter_raw_users(path)) == users(3)
+
+
+def test_torn_final_line_is_skipped(tmp_path):
+    path = raw_data_path(tmp_path, '16')
+    write_raw_users(str(path), users(3))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"username": "tor')
+    assert list(iter_raw_users(path)) == users(3)
+
+
+def test_new_format_replaces_wilaya_file(tmp_path):
+    pytest.importorskip('zstandard')
+    legacy = tmp_path / 'wilaya_16.json'
+    legacy.write_text(json.dumps(users(2)), encoding='utf-8')
+    assert list(iter_raw_users(legacy)) == users(2)
+    
+    write_raw_users(str(raw_data_path(tmp_path, '16', compress=True)), users(5))
+    assert not legacy.exists()
+    assert find_raw_file(tmp_path, '16').name == 'wilaya_16.ndjson.zst'
+    
+    write_raw_users(str(raw_data_path(tmp_path, '16')), users(4))
+    assert [path.name for path in tmp_path.iterdir()] == ['wilaya_16.ndjson']
+    assert count_raw_users(find_raw_file(tmp_path, '16')) == 4
+
+
+def test_every_wilaya_is_read_once_in_code_order(tmp_path):
+    write_raw_users(str(raw_data_path(tmp_path, '31')), users(2, '31'))
+    write_raw_users(str(raw_data_path(tmp_path, '16')), users(3, '16'))
+    (tmp_path / 'wilaya_25.json').write_text(json.dumps(users(1, '25')), encoding='utf-8')
+    
+    assert [path.name for path in raw_data_files(tmp_path)] == \
+        ['wilaya_16.ndjson', 'wilaya_25.json', 'wilaya_31.ndjson']
+    assert [user['wilaya_code'] for user in iter_all_raw_users(tmp_path)] == ['16'] * 3 + ['25'] + ['31'] * 2
@@ -0,0 +1,104 @@
+"""
+Tests of ResponseCache: TTL freshness, revalidation with ETag or
+Last-Modified, and least recently used eviction
+"""
+
+import pytest
+
+from collectors.response_cache import ResponseCache, endpoint_for_path
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttls={'user': 60, 'repos': 60}, clock=clock)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize('path,endpoint', [
+    ('/search/users', 'search'),
+    ('/users/octocat', 'user'),
+    ('/users/octocat/repos', 'repos'),
+    ('/users/octocat/events/public', 'events'),
+    ('/rate_limit', 'default'),
+])
+def test_endpoint_for_path(path, endpoint):
+    assert endpoint_for_path(path) == endpoint
+
+
+def test_fresh_hit_inside_ttl(cache, clock):
+    cache.store('/users/a', None, b'{"login": "a"}', {'ETag': '"v1"'})
+    clock.now += 59
+    entry = cache.lookup('/users/a')
+    assert entry.fresh
+    assert entry.body == b'{"login": "a"}'
+    # Query parameters are part of the key
+    assert cache.lookup('/users/a', {'page': 2}) is None
+
+
+def test_stale_entry_revalidates_with_etag(cache, clock):
+    cache.store('/users/a/repos', {'page': 1}, b'[]', {'ETag': '"v1"'})
+    clock.now += 61
+    entry = cache.lookup('/users/a/repos', {'page': 1})
+    assert not entry.fresh
+    assert entry.conditional_headers() == {'If-None-Match': '"v1"'}
+
+
+def test_stale_entry_revalidates_with_last_modified(cache, clock):
+    cache.store('/users/a', None, b'{}', {'Last-Modified': 'Tue, 06 Jan 2026 10:00:00 GMT'})
+    clock.now += 61
+    entry = cache.lookup('/users/a')
+    assert entry.conditional_headers() == {'If-Modified-Since': 'Tue, 06 Jan 2026 10:00:00 GMT'}
+
+
+def test_not_modified_restarts_ttl(cache, clock):
+    cache.store('/users/a', None, b'{}', {'ETag': '"v1"'})
+    clock.now += 61
+    cache.revalidated(cache.lookup('/users/a'))
+    clock.now += 30
+    entry = cache.lookup('/users/a')
+    assert entry.fresh
+    assert entry.stored_at == clock.now - 30
+
+
+def test_expired_entry_without_validator_is_dropped(cache, clock):
+    cache.store('/users/a', None, b'{}', {})
+    assert cache.lookup('/users/a').fresh
+    clock.now += 61
+    assert cache.lookup('/users/a') is None
+
+
+def test_uncacheable_response_is_not_stored(cache):
+    # No validator and no TTL for the events class
+    cache.store('/users/a/events/public', None, b'[]', {})
+    assert cache.lookup('/users/a/events/public') is None
+
+
+def test_hits_are_written_with_the_next_store(cache, clock):
+    cache.store('/users/a', None, b'{}', {'ETag': '"a"'})
+    clock.now += 5
+    cache.lookup('/users/a')
+    assert cache.pending_access
+    assert cache.conn.execute('SELECT accessed_at FROM responses').fetchone()[0] == 1000.0
+    
+    cache.store('/users/b', None, b'{}', {'ETag': '"b"'})
+    assert not cache.pending_access
+    assert dict(cache.conn.execute('SELECT etag, accessed_at FROM responses'))['"a"'] == 1005.0
+
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=1000, clock=clock)
+    try:
+        for login in 'abc':
+            cache.store(f'/users/{login}', None, b'x' * 300, {'ETag': f'"{login}"'})
+            clock.now += 1
+        # Reading 'a' makes 'b' the least recently used entry
+        cache.lookup('/users/a')
+        clock.now += 1
+        cache.store('/users/d', None, b'x' * 300, {'ETag': '"d"'})
+        
+        assert cache.total_bytes <= 900
+        assert cache.lookup('/users/b') is None
+        assert all(cache.lookup(f'/users/{login}') for login in 'acd')
+    finally:
+        cache.close()
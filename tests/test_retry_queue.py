@@ -0,0 +1,177 @@
+"""
+Tests of the deferred retry queue (jittered backoff, giving up) and of
+the per-endpoint circuit breaker
+"""
+
+import asyncio
+
+import pytest
+
+from collectors import retry_queue
+from collectors.retry_queue import RetryQueue, CircuitBreaker, CircuitOpenError, circuit_for_path, OPEN, HALF_OPEN, CLOSED
+
+
+class Flaky:
+    """Task failing with `error` a given number of times before returning 'ok'"""
+    
+    def __init__(self, failures, error=None):
+        self.failures = failures
+        self.error = error or ConnectionError('reset')
+        self.calls = 0
+    
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return 'ok'
+
+
+@pytest.fixture
+def queue(clock, monkeypatch):
+    """Seeded queue whose drain sleeps by advancing the fake clock"""
+    def sleep(seconds):
+        clock.now += seconds
+    monkeypatch.setattr(retry_queue.time, 'sleep', sleep)
+    return RetryQueue(max_attempts=3, base_delay=1.0, max_delay=5.0, seed=7, clock=clock)
+
+
+def retryable(error):
+    return isinstance(error, (ConnectionError, CircuitOpenError))
+
+
+@pytest.mark.parametrize('path,circuit', [
+    ('/search/users', 'search'),
+    ('/users/octocat', 'users'),
+    ('/users/octocat/repos', 'users/repos'),
+    ('/users/octocat/events/public', 'users/events'),
+    ('/graphql', 'graphql'),
+])
+def test_circuit_for_path(path, circuit):
+    assert circuit_for_path(path) == circuit
+
+
+def test_backoff_is_jittered_within_capped_exponential_bound(queue):
+    for failures, bound in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        delays = [queue.backoff(failures) for _ in range(200)]
+        assert all(0 <= delay <= bound for delay in delays)
+        assert max(delays) > bound / 2
+    
+    first, second = RetryQueue(seed=7), RetryQueue(seed=7)
+    assert [first.backoff(3) for _ in range(5)] == [second.backoff(3) for _ in range(5)]
+
+
+def test_deferred_task_recovers_after_backoff(queue, clock):
+    task = Flaky(failures=1)
+    results = []
+    start = clock.now
+    queue.defer('task', ConnectionError('reset'), task, results.append)
+    assert len(queue) == 1
+    
+    queue.drain(retryable)
+    assert results == ['ok']
+    assert task.calls == 2
+    assert start <= clock.now <= start + 2.0
+    assert queue.counts == {'deferred': 1, 'retried': 2, 'recovered': 1, 'failed': 0}
+
+
+def test_gives_up_after_max_attempts(queue):
+    task = Flaky(failures=10)
+    results = []
+    queue.defer('task', ConnectionError('reset'), task, results.append)
+    queue.drain(retryable)
+    # The failed first attempt counts, so two retries reach max_attempts=3
+    assert task.calls == 2
+    assert results == []
+    assert queue.counts['failed'] == 1
+    assert len(queue) == 0
+
+
+def test_non_retryable_error_gives_up_at_once(queue):
+    task = Flaky(failures=10, error=KeyError('login'))
+    queue.defer('task', ConnectionError('reset'), task)
+    queue.drain(retryable)
+    assert task.calls == 1
+    assert queue.counts['failed'] == 1
+
+
+def test_open_circuit_delays_retry_until_it_may_close(queue, clock):
+    task = Flaky(failures=0)
+    queue.defer('task', CircuitOpenError('search', retry_at=clock.now + 30), task)
+    queue.drain(retryable)
+    assert task.calls == 1
+    assert clock.now >= 1000.0 + 30
+
+
+def test_pending_trial_does_not_use_an_attempt(queue, clock):
+    task = Flaky(failures=4, error=CircuitOpenError('search', retry_at=clock.now, trial_pending=True))
+    results = []
+    queue.defer('task', ConnectionError('reset'), task, results.append)
+    queue.drain(retryable)
+    assert results == ['ok']
+    assert queue.counts['failed'] == 0
+
+
+def test_drain_async_retries_coroutines(clock):
+    queue = RetryQueue(max_attempts=3, base_delay=0.0, clock=clock)
+    calls = []
+    
+    async def task():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ConnectionError('reset')
+        return len(calls)
+    
+    results = []
+    queue.defer('task', ConnectionError('reset'), task, results.append)
+    asyncio.run(queue.drain_async(retryable))
+    assert results == [2]
+    assert queue.counts['recovered'] == 1
+
+
+def test_circuit_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(2):
+        breaker.check('search')
+        breaker.record_failure('search')
+    breaker.check('search')
+    breaker.record_failure('search')
+    assert breaker.states['search']['state'] == OPEN
+    
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.check('search')
+    assert raised.value.retry_at == clock.now + 30
+    assert not raised.value.trial_pending
+    # Other endpoints are unaffected
+    breaker.check('users')
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, clock=clock)
+    breaker.record_failure('search')
+    breaker.record_failure('search')
+    breaker.record_success('search')
+    breaker.record_failure('search')
+    assert breaker.states['search']['state'] == CLOSED
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure('search')
+    clock.now += 30
+    
+    breaker.check('search')
+    assert breaker.states['search']['state'] == HALF_OPEN
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.check('search')
+    assert raised.value.trial_pending
+    
+    breaker.record_failure('search')
+    assert breaker.states['search']['state'] == OPEN
+    assert breaker.trips == {'search': 2}
+    
+    clock.now += 30
+    breaker.check('search')
+    breaker.record_success('search')
+    assert breaker.states['search']['state'] == CLOSED
+    breaker.check('search')
+    assert breaker.summary() == "Circuit breaker opened: search x2"
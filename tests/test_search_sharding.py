@@ -0,0 +1,83 @@
+"""
+Tests of SearchShard: query strings and splitting a location search
+into disjoint followers and created-date ranges
+"""
+
+from datetime import date
+
+from collectors.search_sharding import SearchShard, GITHUB_LAUNCH_DATE
+
+
+def covers(shards, followers, created):
+    """Shards containing a user with these followers and creation date"""
+    def contains(shard):
+        if followers < shard.followers_min:
+            return False
+        if shard.followers_max is not None and followers > shard.followers_max:
+            return False
+        created_from = shard.created_from or GITHUB_LAUNCH_DATE
+        created_to = shard.created_to or date.max
+        return created_from <= created <= created_to
+    return [shard for shard in shards if contains(shard)]
+
+
+def test_query_forms():
+    assert SearchShard('Algiers', 10).query() == 'location:Algiers followers:>=10'
+    assert SearchShard('Sidi Bel Abbes', 5, 5).query() == 'location:"Sidi Bel Abbes" followers:5'
+    shard = SearchShard('Oran', 3, 9, created_from=date(2015, 1, 1), created_to=date(2016, 6, 30),
+                        qualifiers='repos:>=1')
+    assert shard.query() == 'location:Oran followers:3..9 created:2015-01-01..2016-06-30 repos:>=1'
+
+
+def test_query_fills_open_created_bound():
+    shard = SearchShard('Oran', 3, 3, created_to=date(2012, 1, 1))
+    assert shard.query() == f'location:Oran followers:3 created:{GITHUB_LAUNCH_DATE.isoformat()}..2012-01-01'
+
+
+def test_params():
+    assert SearchShard('Oran', 2).params(3) == {
+        'q': 'location:Oran followers:>=2', 'per_page': 100, 'page': 3, 'sort': 'followers', 'order': 'desc'
+    }
+
+
+def test_open_followers_range_splits_at_double_the_minimum():
+    high, low = SearchShard('Algiers', 10, qualifiers='repos:>=1').split()
+    assert (high.followers_min, high.followers_max) == (21, None)
+    assert (low.followers_min, low.followers_max) == (10, 20)
+    assert high.qualifiers == low.qualifiers == 'repos:>=1'
+    
+    high, low = SearchShard('Algiers', 0).split()
+    assert (high.followers_min, low.followers_max) == (2, 1)
+
+
+def test_bounded_followers_range_is_halved():
+    high, low = SearchShard('Algiers', 10, 20).split()
+    assert (high.followers_min, high.followers_max) == (16, 20)
+    assert (low.followers_min, low.followers_max) == (10, 15)
+
+
+def test_single_followers_value_splits_created_dates():
+    high, low = SearchShard('Algiers', 7, 7, created_from=date(2020, 1, 1), created_to=date(2020, 1, 31)).split()
+    assert (high.followers_min, high.followers_max) == (low.followers_min, low.followers_max) == (7, 7)
+    assert (high.created_from, high.created_to) == (date(2020, 1, 17), date(2020, 1, 31))
+    assert (low.created_from, low.created_to) == (date(2020, 1, 1), date(2020, 1, 16))
+
+
+def test_single_day_single_value_is_indivisible():
+    day = date(2020, 1, 1)
+    assert SearchShard('Algiers', 7, 7, created_from=day, created_to=day).split() == []
+
+
+def test_repeated_splits_stay_disjoint_and_complete():
+    shards = [SearchShard('Algiers', 5)]
+    # Keep splitting the lowest shard, past a single followers value into dates
+    for _ in range(8):
+        shard = min(shards, key=lambda s: (s.followers_min, s.created_from or GITHUB_LAUNCH_DATE))
+        shards.remove(shard)
+        shards.extend(shard.split())
+    assert any(shard.created_from for shard in shards)
+    
+    for followers in [5, 6, 9, 10, 11, 40, 41, 999, 10 ** 7]:
+        for created in [GITHUB_LAUNCH_DATE, date(2014, 3, 9), date.today()]:
+            assert len(covers(shards, followers, created)) == 1
+    assert covers(shards, 4, date(2014, 3, 9)) == []
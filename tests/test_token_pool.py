@@ -0,0 +1,89 @@
+"""
+Tests of TokenPool rotation and of gathering tokens with load_tokens
+"""
+
+import pytest
+
+from collectors.token_pool import TokenPool, load_tokens
+
+
+def headers(remaining, reset='5000'):
+    return {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': reset, 'X-RateLimit-Limit': '5000'}
+
+
+@pytest.fixture
+def pool(clock):
+    return TokenPool(['t1', 't2', 't3'], clock=clock)
+
+
+def test_selects_token_with_most_remaining_budget(pool):
+    pool.update('t1', 'core', headers(100), 200)
+    pool.update('t2', 'core', headers(300), 200)
+    pool.update('t3', 'core', headers(200), 200)
+    assert pool.select('core') == 't2'
+    assert pool.remaining('core') == 600
+    # Budgets are tracked per resource
+    pool.update('t3', 'search', headers(25), 200)
+    pool.update('t1', 'search', headers(5), 200)
+    pool.update('t2', 'search', headers(1), 200)
+    assert pool.select('search') == 't3'
+
+
+def test_acquire_reserves_on_selected_token(pool):
+    pool.update('t1', 'core', headers(10), 200)
+    pool.update('t2', 'core', headers(2), 200)
+    pool.update('t3', 'core', headers(1), 200)
+    token, wait = pool.acquire('core')
+    assert (token, wait) == ('t1', 0.0)
+    assert pool.limiters['t1'].remaining('core') == 9
+
+
+def test_exhausted_token_rotates_out_until_reset(pool, clock):
+    reset = str(int(clock.now) + 600)
+    pool.update('t1', 'core', headers(4000, reset), 200)
+    pool.update('t2', 'core', headers(10, reset), 200)
+    pool.update('t3', 'core', headers(5, reset), 200)
+    assert pool.update('t1', 'core', headers(0, reset), 403) is True
+    assert pool.select('core') == 't2'
+    
+    # Once every token is exhausted, the one reopening first is used
+    pool.update('t2', 'core', headers(0, str(int(clock.now) + 900)), 403)
+    pool.update('t3', 'core', headers(0, str(int(clock.now) + 300)), 403)
+    assert pool.select('core') == 't3'
+    
+    clock.now += 601
+    pool.update('t1', 'core', headers(5000, str(int(clock.now) + 3600)), 200)
+    assert pool.select('core') == 't1'
+
+
+def test_load_seeds_budgets_from_rate_limit_payload(pool):
+    for token, remaining in [('t1', 120), ('t2', 4999), ('t3', 80)]:
+        pool.load(token, {'core': {'limit': 5000, 'remaining': remaining, 'reset': 5000},
+                          'search': {'limit': 30, 'remaining': 30, 'reset': 5000}})
+    assert pool.limiters['t2'].remaining('core') == 4999
+    assert pool.select('core') == 't2'
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        TokenPool([])
+
+
+def test_load_tokens_sources_in_order(tmp_path, monkeypatch):
+    tokens_file = tmp_path / 'tokens.txt'
+    tokens_file.write_text('# team tokens\nfile1\n\n  file2  # backup\nshared\n', encoding='utf-8')
+    monkeypatch.setenv('GITHUB_TOKENS', 'env1, env2 shared')
+    monkeypatch.setenv('GITHUB_TOKEN', 'single')
+    monkeypatch.delenv('GITHUB_TOKENS_FILE', raising=False)
+    
+    tokens = load_tokens('explicit', str(tokens_file))
+    assert tokens == ['explicit', 'file1', 'file2', 'shared', 'env1', 'env2', 'single']
+
+
+def test_load_tokens_reads_tokens_file_from_environment(tmp_path, monkeypatch):
+    tokens_file = tmp_path / 'tokens.txt'
+    tokens_file.write_text('a\nb\na\n', encoding='utf-8')
+    monkeypatch.setenv('GITHUB_TOKENS_FILE', str(tokens_file))
+    monkeypatch.delenv('GITHUB_TOKENS', raising=False)
+    monkeypatch.delenv('GITHUB_TOKEN', raising=False)
+    assert load_tokens() == ['a', 'b']
@@ -0,0 +1,72 @@
+"""
+Tests of UserIndex: seeding stored users, resolving each login to one
+wilaya and tracking wilayas whose saved output went stale
+"""
+
+import pytest
+
+from collectors.location_matcher import LocationMatcher
+from collectors.user_index import UserIndex
+
+
+@pytest.fixture
+def index(config):
+    return UserIndex(LocationMatcher(config['wilayas']))
+
+
+def user(login, code, location=None, collected_at='2026-01-01T00:00:00'):
+    return {'username': login, 'wilaya_code': code, 'location': location, 'collected_at': collected_at}
+
+
+def test_seed_keeps_latest_record_and_every_wilaya(index):
+    index.seed([
+        user('a', '31', 'Oran', '2026-01-01T00:00:00'),
+        user('a', '16', 'Algiers', '2026-02-01T00:00:00'),
+        user('b', '16', 'Algiers'),
+    ])
+    assert index.users['a']['location'] == 'Algiers'
+    assert index.candidates['a'] == ['31', '16']
+    assert index.resolve('a') == '16'
+    assert [u['username'] for u in index.users_for('16')] == ['a', 'b']
+    assert index.users_for('31') == []
+
+
+def test_seed_deduplicates_search_order(index):
+    index.seed([user('a', '16'), user('b', '16'), user('a', '16'), user('c', '16')])
+    assert list(index.search_order['16']) == ['a', 'b', 'c']
+
+
+def test_resolved_users_lists_each_login_once(index):
+    index.seed([user('a', '31', 'Oran'), user('a', '16', 'Oran'), user('b', '25', 'Constantine')])
+    resolved = {u['username']: u for u in index.resolved_users()}
+    assert set(resolved) == {'a', 'b'}
+    assert resolved['a']['wilaya_code'] == '31'
+    assert resolved['a']['wilaya_name'] == 'Oran'
+
+
+def test_unmatched_location_goes_to_lowest_code(index):
+    index.add_candidates(['a'], '31')
+    index.add_candidates(['a'], '16')
+    index.add(user('a', '31', 'Somewhere'))
+    assert index.resolve('a') == '16'
+
+
+def test_later_wilaya_winning_a_user_marks_earlier_stale(index):
+    index.add_candidates(['a', 'b'], '16')
+    index.add(user('a', '16', 'Oran'))
+    index.add(user('b', '16', 'Algiers'))
+    assert [u['username'] for u in index.users_for('16')] == ['a', 'b']
+    
+    index.add_candidates(['a'], '31')
+    assert index.take_stale_wilayas() == {'16'}
+    assert [u['username'] for u in index.users_for('16')] == ['b']
+    assert [u['username'] for u in index.users_for('31')] == ['a']
+    assert index.take_stale_wilayas() == set()
+
+
+def test_known_and_missing_logins(index):
+    index.add(user('a', '16'))
+    index.mark_missing('gone')
+    assert index.is_known('a') and index.is_known('gone')
+    assert not index.is_known('other')
+    assert index.resolve('gone') is None
@@ -0,0 +1,52 @@
+"""
+Tests of UserStore upserts and wilaya replacement
+"""
+
+import pytest
+
+from storage.user_store import UserStore
+
+
+def user(login, code, followers=5):
+    return {'username': login, 'wilaya_code': code, 'followers': followers,
+            'updated_at': '2026-01-01T00:00:00Z'}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / 'users.sqlite'))
+    yield store
+    store.close()
+
+
+def test_upsert_replaces_record(store):
+    store.upsert([user('a', '16'), user('b', '31')])
+    store.upsert([user('a', '16', followers=40)])
+    assert len(store) == 2
+    assert store.get('a')['followers'] == 40
+    assert store.get('missing') is None
+
+
+def test_replace_wilaya_deletes_only_its_missing_users(store):
+    store.upsert([user('a', '16'), user('b', '16'), user('c', '31')])
+    assert store.replace_wilaya('16', iter([user('b', '16', followers=9), user('d', '16')])) == 2
+    
+    assert store.get('a') is None
+    assert store.get('b')['followers'] == 9
+    assert store.get('c') is not None
+    assert store.counts_by_wilaya() == {'16': 2, '31': 1}
+
+
+def test_replace_wilaya_fills_missing_code(store):
+    store.replace_wilaya('25', [{'username': 'a', 'followers': 5}])
+    assert store.get('a')['wilaya_code'] == '25'
+    assert store.count('25') == 1
+
+
+def test_replace_wilaya_moves_user_from_other_wilaya(store):
+    store.upsert([user('a', '31')])
+    store.replace_wilaya('16', [user('a', '16')])
+    # The user now belongs to the saved wilaya
+    assert store.get('a')['wilaya_code'] == '16'
+    assert store.count('31') == 0
+    assert [u['username'] for u in store.iter_users('16')] == ['a']